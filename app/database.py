@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 from dotenv import load_dotenv
 
@@ -8,16 +10,121 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./propai_scout.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Pool tuning; SQLite ignores the size settings for in-memory databases
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+# Set to false when the schema is created by a separate migration step
+# (python -m app.migrate) so workers skip it at boot
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() == "true"
+
+def async_database_url(url: str) -> str:
+    """
+    Map a plain DATABASE_URL onto its asyncio driver (aiosqlite / asyncpg)
+    """
+    parsed = make_url(url)
+    if parsed.drivername in ("sqlite", "sqlite+pysqlite"):
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif parsed.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+def _engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    options = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        # Compiled SQL cache shared by every connection in the pool
+        "query_cache_size": DB_STATEMENT_CACHE_SIZE,
+    }
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:"):
+            return options
+        options["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        options["pool_recycle"] = DB_POOL_RECYCLE
+        if parsed.get_driver_name() == "asyncpg":
+            # Server-side prepared statements per connection
+            options["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+ASYNC_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+
+engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed during bulk ingestion; busy_timeout waits out short write locks
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+def dialect_insert(conn, table):
+    """
+    INSERT for the connection's dialect, which supports on_conflict_do_update / do_nothing
+    """
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
+
+def _create_schema(conn):
+    Base.metadata.create_all(conn)
+    # create_all skips tables that already exist, so add nullable columns and
+    # indexes introduced since
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+async def init_db():
+    """
+    Create any missing tables and indexes; run once at startup instead of at import time
+
+    Also keys rows stored before properties.address_key existed and fills
+    price-history aggregates for rows stored before those existed.
+    """
+    from . import models  # noqa: F401  registers the tables on Base.metadata
+    from .services.persistence import backfill_address_keys
+    from .services.price_history import backfill_price_stats
+
+    async with engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+        await conn.run_sync(backfill_address_keys)
+        await conn.run_sync(backfill_price_stats)
+
+async def migrate():
+    """
+    The schema step on its own, for python -m app.migrate
+    """
+    try:
+        await init_db()
     finally:
-        db.close()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    # Run as a script this file is a second copy of app.database whose Base
+    # has no tables registered, so hand over to the real module
+    from app.migrate import main
+
+    main()
@@ -1,14 +1,62 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
 import uvicorn
-from datetime import datetime
+
+from .database import engine, init_db, AsyncSessionLocal, DB_INIT_ON_STARTUP
+from .routers import property, jobs, scoring
+from .services.scraper import PropertyScraper, get_user_agent
+from .services.executor import get_executor, shutdown_executor
+from .services.changes import SnapshotStore
+from .services.scheduler import RefreshScheduler, SCHEDULER_ENABLED
+from .services.outreach import OutreachGenerator
+from .services import metrics
+
+logger = logging.getLogger(__name__)
+
+def _log_preload_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        # get_user_agent tries again on the first request that needs it
+        logger.error(f"Preloading the user-agent list failed: {future.exception()!r}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Share one pooled scraper session across requests so TCP/TLS connections
+    # and DNS lookups are reused. Page snapshots let repeat scrapes skip
+    # unchanged pages and listings. The schema step can run separately
+    # (python -m app.migrate), and the user-agent list loads in the
+    # background so the first request is not held up by either.
+    if DB_INIT_ON_STARTUP:
+        await init_db()
+    user_agents = asyncio.get_running_loop().run_in_executor(None, get_user_agent)
+    user_agents.add_done_callback(_log_preload_failure)
+    get_executor()
+    app.state.scraper = await PropertyScraper(snapshots=SnapshotStore(engine)).start()
+    app.state.outreach = await OutreachGenerator(engine).start()
+    # Tracked ZIPs refresh in the background so stored-mode searches stay fresh
+    app.state.scheduler = None
+    if SCHEDULER_ENABLED:
+        app.state.scheduler = await RefreshScheduler(app.state.scraper, engine, AsyncSessionLocal).start()
+    try:
+        yield
+    finally:
+        # Let a preload still running finish; its failure was logged when it happened
+        await asyncio.wait([user_agents])
+        if app.state.scheduler is not None:
+            await app.state.scheduler.stop()
+        await app.state.scraper.close()
+        await app.state.outreach.close()
+        shutdown_executor()
+        await engine.dispose()
 
 app = FastAPI(
     title="PropAI Scout",
     description="Real Estate Lead Generation and Scoring Tool",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Enable CORS
@@ -20,55 +68,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class PropertyFilter(BaseModel):
-    zip_codes: List[str]
-    property_type: Optional[str] = None
-    min_price: Optional[float] = None
-    max_price: Optional[float] = None
-    max_days_on_market: Optional[int] = None
-
-class Property(BaseModel):
-    address: str
-    price: float
-    days_on_market: int
-    price_drops: int
-    owner_status: str
-    tax_assessed_value: float
-    listing_agent: Optional[str] = None
-    motivation_score: float
-    suggested_offer: float
-    estimated_roi: float
-    zip_code: str
-    property_type: str
-    square_feet: float
+app.include_router(property.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+app.include_router(scoring.router, prefix="/api")
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to PropAI Scout API"}
 
-@app.post("/api/search")
-async def search_properties(filters: PropertyFilter):
-    """
-    Search for properties based on given filters and return scored results
-    """
-    # TODO: Implement property search and scoring logic
-    return {"message": "Search endpoint - Implementation pending"}
-
-@app.get("/api/property/{property_id}/outreach")
-async def generate_outreach(property_id: str):
-    """
-    Generate AI-powered outreach message for a specific property
-    """
-    # TODO: Implement AI outreach message generation
-    return {"message": "Message generation - Implementation pending"}
-
-@app.post("/api/export")
-async def export_results():
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
     """
-    Export current search results to CSV
+    Pipeline stage timings, fetch/parse counters and in-flight gauges for Prometheus
     """
-    # TODO: Implement CSV export functionality
-    return {"message": "Export functionality - Implementation pending"}
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
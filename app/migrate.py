@@ -0,0 +1,21 @@
+"""
+Create missing tables and indexes and backfill derived columns, then exit
+
+    python -m app.migrate
+
+Deployments run this once before starting workers with DB_INIT_ON_STARTUP=false.
+"""
+import asyncio
+
+from sqlalchemy.engine import make_url
+
+from .database import SQLALCHEMY_DATABASE_URL, migrate
+
+
+def main():
+    asyncio.run(migrate())
+    print(f"Schema is up to date: {make_url(SQLALCHEMY_DATABASE_URL).render_as_string()}")
+
+
+if __name__ == "__main__":
+    main()
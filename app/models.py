@@ -1,15 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, create_engine
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Text, Boolean, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
-
-Base = declarative_base()
+from .database import Base
 
 class Property(Base):
     __tablename__ = "properties"
 
     id = Column(Integer, primary_key=True, index=True)
-    address = Column(String, unique=True, index=True)
+    address = Column(String, index=True)  # as the merge kept it, for display
+    address_key = Column(String, unique=True, index=True)  # addresses.storage_key; the upsert conflict target
     zip_code = Column(String, index=True)
     property_type = Column(String)
     price = Column(Float)
@@ -22,9 +21,28 @@ class Property(Base):
     motivation_score = Column(Float)
     suggested_offer = Column(Float)
     estimated_roi = Column(Float)
+    content_hash = Column(String)  # fingerprint of the scraped fields, see services/changes.py
+    # Price-history aggregates, kept current as history rows are written (services/price_history.py)
+    first_price = Column(Float)
+    first_price_at = Column(DateTime)
+    drop_count = Column(Integer)
+    drop_pct = Column(Float)  # % below first_price
+    drop_velocity = Column(Float)  # drop_pct per 30 days, first price to last drop
+    last_drop_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Stored-mode search: filter by ZIP/type/price, or walk a ZIP in score order
+        Index('ix_properties_zip_type_price', 'zip_code', 'property_type', 'price'),
+        Index('ix_properties_zip_score', 'zip_code', 'motivation_score', 'id'),
+        # ...or in order of a price-history aggregate
+        Index('ix_properties_zip_drop_count', 'zip_code', 'drop_count', 'id'),
+        Index('ix_properties_zip_drop_pct', 'zip_code', 'drop_pct', 'id'),
+        Index('ix_properties_zip_drop_velocity', 'zip_code', 'drop_velocity', 'id'),
+        Index('ix_properties_zip_last_drop', 'zip_code', 'last_drop_at', 'id'),
+    )
+
 class PriceHistory(Base):
     __tablename__ = "price_history"
 
@@ -32,14 +50,93 @@ class PriceHistory(Base):
     property_id = Column(Integer, ForeignKey("properties.id"))
     price = Column(Float)
     date = Column(DateTime)
-    
+
     property = relationship("Property", back_populates="price_history")
 
+    __table_args__ = (
+        Index('ix_price_history_property_date', 'property_id', 'date'),
+    )
+
 Property.price_history = relationship("PriceHistory", back_populates="property")
 
-# Database URL will be loaded from environment variables
-SQLALCHEMY_DATABASE_URL = "sqlite:///./propai_scout.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+class PropertyFeatures(Base):
+    __tablename__ = "property_features"
+
+    # The signals a listing's scores are computed from (scoring.FEATURE_COLUMNS),
+    # so new weights can rescore every row without re-scraping or re-running comps
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    price = Column(Float)
+    square_feet = Column(Float)
+    days_on_market = Column(Float)
+    price_drops = Column(Float)
+    below_assessed = Column(Boolean)
+    absentee = Column(Boolean)
+    pre_foreclosure = Column(Boolean)
+    comp_count = Column(Float)
+    comp_ppsf_sum = Column(Float)
+    comp_price_sum = Column(Float)
+    updated_at = Column(DateTime)
+
+class ScoringConfig(Base):
+    __tablename__ = "scoring_config"
+
+    key = Column(String, primary_key=True)  # "active": the weights new and rescored listings use
+    weights = Column(Text)  # JSON object of scoring.ScoringWeights fields
+    applied_at = Column(DateTime)
+
+class PageSnapshot(Base):
+    __tablename__ = "page_snapshots"
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+    key = Column(String, primary_key=True)  # "source:zip" for pages, "merged:zip" for merge output
+    etag = Column(String)
+    last_modified = Column(String)
+    content_hash = Column(String)
+    listings = Column(Text)  # JSON list of parsed listings
+    fetched_at = Column(DateTime)
+
+class TrackedZip(Base):
+    __tablename__ = "tracked_zips"
+
+    zip_code = Column(String, primary_key=True)
+    active = Column(Boolean, default=True)  # False: refreshed on demand only, not on a schedule
+    priority = Column(Integer, default=0)
+    interval_seconds = Column(Integer)
+    last_refreshed_at = Column(DateTime)
+    next_refresh_at = Column(DateTime, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RefreshJob(Base):
+    __tablename__ = "refresh_jobs"
+
+    id = Column(Integer, primary_key=True)
+    zip_code = Column(String, nullable=False)
+    priority = Column(Integer, default=0)
+    status = Column(String, default="queued")  # queued, running, done or failed
+    attempts = Column(Integer, default=0)
+    run_after = Column(DateTime)
+    enqueued_at = Column(DateTime)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    listings = Column(Integer)
+    error = Column(Text)
+
+    __table_args__ = (
+        # At most one queued/running job per ZIP, enforced across processes
+        Index(
+            'uq_refresh_jobs_active_zip', 'zip_code', unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        Index('ix_refresh_jobs_claim', 'status', 'priority', 'run_after'),
+        Index('ix_refresh_jobs_finished', 'finished_at'),
+    )
+
+class OutreachMessage(Base):
+    __tablename__ = "outreach_messages"
+
+    prompt_hash = Column(String, primary_key=True)  # hash of model + prompt messages
+    model = Column(String)
+    message = Column(Text)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
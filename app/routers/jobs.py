@@ -0,0 +1,44 @@
+from fastapi import APIRouter, HTTPException, Depends, Request
+from ..schemas import TrackZipsRequest, RefreshRequest
+from ..services.scheduler import RefreshScheduler
+
+router = APIRouter()
+
+def get_scheduler(request: Request) -> RefreshScheduler:
+    scheduler = getattr(request.app.state, 'scheduler', None)
+    if scheduler is None:
+        raise HTTPException(status_code=503, detail="Background refresh is disabled (SCHEDULER_ENABLED=false)")
+    return scheduler
+
+@router.get("/jobs")
+async def job_status(scheduler: RefreshScheduler = Depends(get_scheduler)):
+    """
+    Refresh queue depth, job latency and recent errors
+    """
+    return await scheduler.status()
+
+@router.get("/jobs/tracked")
+async def list_tracked(scheduler: RefreshScheduler = Depends(get_scheduler)):
+    return await scheduler.tracked()
+
+@router.post("/jobs/tracked")
+async def track_zips(body: TrackZipsRequest, scheduler: RefreshScheduler = Depends(get_scheduler)):
+    """
+    Refresh these ZIPs in the background every interval_seconds
+    """
+    await scheduler.track(body.zip_codes, body.interval_seconds, body.priority)
+    return {"tracked": body.zip_codes}
+
+@router.delete("/jobs/tracked/{zip_code}")
+async def untrack_zip(zip_code: str, scheduler: RefreshScheduler = Depends(get_scheduler)):
+    if not await scheduler.untrack(zip_code):
+        raise HTTPException(status_code=404, detail="ZIP code is not tracked")
+    return {"untracked": zip_code}
+
+@router.post("/jobs/refresh")
+async def refresh_zips(body: RefreshRequest, scheduler: RefreshScheduler = Depends(get_scheduler)):
+    """
+    Queue an immediate refresh of these ZIPs
+    """
+    queued = [zip_code for zip_code in dict.fromkeys(body.zip_codes) if await scheduler.queue.enqueue(zip_code, body.priority)]
+    return {"queued": queued}
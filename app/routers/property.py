@@ -1,85 +1,176 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.responses import StreamingResponse
 from typing import List
 from ..models import Property
 from ..services.scraper import PropertyScraper
-from ..services.scoring import PropertyScorer
-from ..services.data_export import DataExporter
-from ..schemas import PropertyFilter
-import os
-from sqlalchemy.orm import Session
-from ..database import get_db
+from ..services.ingest import refresh_listings, stream_refresh
+from ..services.search import search_stored, filter_listings, InvalidCursor
+from ..services.data_export import DataExporter, EXPORT_FORMATS
+from ..services.outreach import OutreachGenerator
+from ..services.listings import json_default
+from ..schemas import PropertyFilter, OutreachRequest
+import json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_db, engine, AsyncSessionLocal
 
 router = APIRouter()
 
+def get_scraper(request: Request) -> PropertyScraper:
+    """
+    Return the app-lifespan scraper whose pooled session is shared across requests
+    """
+    return request.app.state.scraper
+
+def get_outreach(request: Request) -> OutreachGenerator:
+    """
+    Return the app-lifespan outreach generator, whose cache and concurrency limit all requests share
+    """
+    return request.app.state.outreach
+
 @router.post("/search")
-async def search_properties(filters: PropertyFilter, db: Session = get_db()):
+async def search_properties(filters: PropertyFilter, request: Request, scraper: PropertyScraper = Depends(get_scraper), db: AsyncSession = Depends(get_db)):
     """
     Search for properties based on given filters
+
+    mode="stored" answers from previously scraped listings and returns
+    {"items", "next_cursor", "refreshing"} pages instead of re-scraping;
+    "refreshing" lists the ZIPs queued for a background refresh.
     """
+    if filters.mode == 'stored':
+        try:
+            page = await search_stored(db, filters, filters.limit, filters.cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Answer now from what is stored; stale ZIPs refresh in the background
+        scheduler = getattr(request.app.state, 'scheduler', None)
+        if scheduler is not None and not filters.cursor:
+            page['refreshing'] = await scheduler.request_refresh(filters.zip_codes)
+        return page
+
     try:
-        async with PropertyScraper() as scraper:
-            # Scrape properties from all sources
-            properties = await scraper.scrape_all_sources(filters.zip_codes)
-            
-            # Filter properties based on criteria
-            if filters.property_type:
-                properties = [p for p in properties if p['property_type'] == filters.property_type]
-            if filters.min_price:
-                properties = [p for p in properties if p['price'] >= filters.min_price]
-            if filters.max_price:
-                properties = [p for p in properties if p['price'] <= filters.max_price]
-            if filters.max_days_on_market:
-                properties = [p for p in properties if p['days_on_market'] <= filters.max_days_on_market]
-            
-            # Score properties
-            scorer = PropertyScorer(os.getenv('OPENAI_API_KEY'))
-            for property in properties:
-                property['motivation_score'] = scorer.calculate_motivation_score(property)
-                property['suggested_offer'] = scorer.calculate_suggested_offer(property, [])  # TODO: Add comps
-                property['estimated_roi'] = scorer.estimate_roi(property, [])  # TODO: Add comps
-            
-            # Sort by motivation score
-            properties.sort(key=lambda x: x['motivation_score'], reverse=True)
-            
-            return properties
+        # Scrape all sources; only new or changed listings are re-scored and written
+        properties = await refresh_listings(scraper, db, engine, filters.zip_codes)
+        
+        # Filter properties based on criteria
+        properties = filter_listings(properties, filters)
+        
+        # Sort by motivation score
+        properties.sort(key=lambda x: x.motivation_score, reverse=True)
+        
+        return [p.to_dict() for p in properties]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+STREAM_FORMATS = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+def _stream_line(event: dict, stream_format: str) -> str:
+    data = json.dumps(event, default=json_default)
+    if stream_format == 'sse':
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+@router.post("/search/stream")
+async def stream_search(filters: PropertyFilter, request: Request, format: str = None, scraper: PropertyScraper = Depends(get_scraper)):
+    """
+    Live search that streams scored listings per (zip, source) page as they arrive, then a ranked summary
+
+    format is ndjson (default) or sse; an Accept: text/event-stream header also selects sse.
+    """
+    stream_format = format or ('sse' if 'text/event-stream' in request.headers.get('accept', '') else 'ndjson')
+    if stream_format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format: {stream_format}")
+
+    async def events():
+        try:
+            async for event in stream_refresh(scraper, AsyncSessionLocal, engine, filters.zip_codes,
+                                              select=lambda listings: filter_listings(listings, filters)):
+                yield _stream_line(event, stream_format)
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            yield _stream_line({'event': 'error', 'detail': str(e)}, stream_format)
+
+    return StreamingResponse(
+        events(),
+        media_type=STREAM_FORMATS[stream_format],
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@router.get("/sources")
+async def source_health(scraper: PropertyScraper = Depends(get_scraper)):
+    """
+    Enabled listing sources with their circuit breaker state, success rate and page latency
+    """
+    return scraper.source_health()
+
 @router.get("/property/{property_id}/outreach")
-async def generate_outreach(property_id: str, db: Session = get_db()):
+async def generate_outreach(property_id: str, db: AsyncSession = Depends(get_db), outreach: OutreachGenerator = Depends(get_outreach)):
     """
     Generate AI outreach message for a property
     """
     try:
-        property = db.query(Property).filter(Property.id == property_id).first()
+        result = await db.execute(select(Property).where(Property.id == property_id))
+        property = result.scalar_one_or_none()
         if not property:
             raise HTTPException(status_code=404, detail="Property not found")
         
-        scorer = PropertyScorer(os.getenv('OPENAI_API_KEY'))
-        message = await scorer.generate_outreach_message(property.__dict__)
+        message = await outreach.generate(property.__dict__)
         
         return {"message": message}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/outreach")
+async def generate_outreach_bulk(body: OutreachRequest, db: AsyncSession = Depends(get_db), outreach: OutreachGenerator = Depends(get_outreach)):
+    """
+    Generate outreach messages for many properties at once
+
+    Results come back in request order as {property_id, message, cached, error};
+    one failed or unknown property does not fail the rest.
+    """
+    ids = list(dict.fromkeys(body.property_ids))
+    properties = {}
+    for start in range(0, len(ids), 1000):
+        result = await db.execute(select(*Property.__table__.columns).where(Property.id.in_(ids[start:start + 1000])))
+        properties.update((row['id'], dict(row)) for row in result.mappings())
+
+    found = [properties[i] for i in ids if i in properties]
+    generated = {result['property_id']: result for result in await outreach.generate_many(found)}
+    results = [
+        generated.get(i) or {'property_id': i, 'message': None, 'cached': False, 'error': 'Property not found'}
+        for i in body.property_ids
+    ]
+    return {
+        'results': results,
+        'generated': sum(1 for r in results if r['message'] is not None and not r['cached']),
+        'cached': sum(1 for r in results if r['cached']),
+        'failed': sum(1 for r in results if r['error']),
+    }
+
+@router.get("/outreach/stats")
+async def outreach_stats(outreach: OutreachGenerator = Depends(get_outreach)):
+    """
+    Outreach call, token, latency and cache counters since startup
+    """
+    return outreach.report()
+
 @router.post("/export")
-async def export_results(background_tasks: BackgroundTasks, db: Session = get_db()):
+async def export_results(format: str = 'csv'):
     """
-    Export property data to CSV
+    Export property data as CSV, gzip-compressed CSV, Parquet or Arrow IPC
     """
-    try:
-        properties = db.query(Property).all()
-        properties_data = [p.__dict__ for p in properties]
-        
-        # Create CSV file
-        csv_content = DataExporter.export_to_csv(properties_data)
-        
-        # Return streaming response
-        return StreamingResponse(
-            iter([csv_content.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=propai-scout-export.csv"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, choose one of: {', '.join(EXPORT_FORMATS)}")
+    if format in ('parquet', 'arrow') and not DataExporter.columnar_available(format):
+        raise HTTPException(status_code=501, detail=f"pyarrow with {format} support is required for {format} exports")
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    # Rows are paged from the database and encoded chunk by chunk, so memory
+    # stays flat regardless of table size and the first bytes go out immediately
+    return StreamingResponse(
+        DataExporter.stream_export(AsyncSessionLocal, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=propai-scout-export.{extension}"}
+    )
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException
+from ..database import engine
+from ..schemas import ScoringWeightsUpdate, WeightSweepRequest
+from ..services.rescoring import apply_weights, load_weights, sweep_weights
+from ..services.scoring import DEFAULT_WEIGHTS
+
+router = APIRouter()
+
+@router.get("/scoring/weights")
+async def get_weights():
+    """
+    The weights new and rescored listings use, and the configured defaults
+    """
+    async with engine.connect() as conn:
+        active = await load_weights(conn)
+    return {"weights": active._asdict(), "defaults": DEFAULT_WEIGHTS._asdict()}
+
+@router.put("/scoring/weights")
+async def update_weights(body: ScoringWeightsUpdate):
+    """
+    Change scoring weights and rescore every stored property from its stored features, without re-scraping
+    """
+    async with engine.connect() as conn:
+        active = await load_weights(conn)
+    try:
+        weights = active.updated(body.weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await apply_weights(engine, weights)
+
+@router.post("/scoring/sweep")
+async def sweep(body: WeightSweepRequest):
+    """
+    What-if: score every stored property under several weight sets at once and compare, writing nothing
+    """
+    async with engine.connect() as conn:
+        active = await load_weights(conn)
+    try:
+        weight_sets = [active.updated(changes) for changes in body.weight_sets]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await sweep_weights(engine, weight_sets, body.top)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 class PropertyFilter(BaseModel):
@@ -8,6 +8,37 @@ class PropertyFilter(BaseModel):
     min_price: Optional[float] = None
     max_price: Optional[float] = None
     max_days_on_market: Optional[int] = None
+    # Price-history aggregates; stored mode only
+    min_drop_count: Optional[int] = Field(None, ge=0)
+    min_drop_pct: Optional[float] = None
+    min_drop_velocity: Optional[float] = None
+    max_days_since_last_drop: Optional[float] = Field(None, ge=0)
+    sort: Literal['motivation_score', 'drop_count', 'drop_pct', 'drop_velocity', 'last_drop'] = 'motivation_score'
+    # live re-scrapes the ZIPs; stored pages through the properties table
+    mode: Literal['live', 'stored'] = 'live'
+    limit: Optional[int] = Field(None, ge=1)
+    cursor: Optional[str] = None
+
+class TrackZipsRequest(BaseModel):
+    zip_codes: List[str]
+    interval_seconds: Optional[int] = Field(None, ge=60)
+    priority: int = 0
+
+class RefreshRequest(BaseModel):
+    zip_codes: List[str]
+    priority: int = 10
+
+class OutreachRequest(BaseModel):
+    property_ids: List[int] = Field(..., min_length=1)
+
+class ScoringWeightsUpdate(BaseModel):
+    # Fields of scoring.ScoringWeights to change; the rest keep their active values
+    weights: Dict[str, float]
+
+class WeightSweepRequest(BaseModel):
+    # Each set overrides the active weights, like ScoringWeightsUpdate.weights
+    weight_sets: List[Dict[str, float]] = Field(..., min_length=1, max_length=50)
+    top: int = Field(20, ge=1, le=1000)
 
 class PropertyBase(BaseModel):
     address: str
@@ -0,0 +1,178 @@
+import os
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Sites format the same address differently ("660 Grand St Unit 4B, Hoboken,
+# NJ 07030" vs "660 Grand Street #4B, Hoboken, NJ 07030" vs "660 Grand St Apt
+# 4B, Hoboken"), so listings are matched on a parsed key instead of the raw
+# string. Matching is blocked by ZIP code: an exact key is a dict lookup, and
+# a near-duplicate (typo, missing suffix or directional) is only compared
+# against listings with the same ZIP, house number and unit, so a merge stays
+# linear in the number of listings.
+STREET_SIMILARITY = float(os.getenv("DEDUP_STREET_SIMILARITY", "0.85"))
+
+STREET_SUFFIXES = {
+    'alley': 'aly', 'aly': 'aly',
+    'avenue': 'ave', 'ave': 'ave', 'av': 'ave', 'avn': 'ave',
+    'boulevard': 'blvd', 'blvd': 'blvd', 'boul': 'blvd',
+    'circle': 'cir', 'cir': 'cir',
+    'court': 'ct', 'ct': 'ct',
+    'drive': 'dr', 'dr': 'dr', 'drv': 'dr',
+    'expressway': 'expy', 'expy': 'expy',
+    'highway': 'hwy', 'hwy': 'hwy',
+    'lane': 'ln', 'ln': 'ln',
+    'parkway': 'pkwy', 'pkwy': 'pkwy', 'pky': 'pkwy',
+    'place': 'pl', 'pl': 'pl',
+    'plaza': 'plz', 'plz': 'plz',
+    'road': 'rd', 'rd': 'rd',
+    'square': 'sq', 'sq': 'sq',
+    'street': 'st', 'st': 'st', 'str': 'st',
+    'terrace': 'ter', 'ter': 'ter', 'terr': 'ter',
+    'trail': 'trl', 'trl': 'trl',
+    'way': 'way', 'wy': 'way',
+}
+
+DIRECTIONALS = {
+    'north': 'n', 'n': 'n', 'south': 's', 's': 's', 'east': 'e', 'e': 'e', 'west': 'w', 'w': 'w',
+    'northeast': 'ne', 'ne': 'ne', 'northwest': 'nw', 'nw': 'nw',
+    'southeast': 'se', 'se': 'se', 'southwest': 'sw', 'sw': 'sw',
+}
+
+ORDINALS = {
+    'first': '1st', 'second': '2nd', 'third': '3rd', 'fourth': '4th', 'fifth': '5th',
+    'sixth': '6th', 'seventh': '7th', 'eighth': '8th', 'ninth': '9th', 'tenth': '10th',
+}
+
+UNIT_DESIGNATORS = {'#', 'unit', 'apt', 'apartment', 'ste', 'suite', 'fl', 'floor', 'rm', 'room', 'lot', 'ph'}
+
+# Words (keeping "12-14", "1/2" and "4-B" whole) and "#"; other punctuation separates words
+_TOKENS = re.compile(r"[^\W_]+(?:[/-][^\W_]+)*|#")
+_UNIT_AFTER_COMMA = re.compile(r"\s*(?:#|(?:%s)\b)" % '|'.join(sorted(UNIT_DESIGNATORS - {'#'})))
+_UNIT_CHARS = re.compile(r"[^0-9a-z]+")
+
+
+class AddressKey(NamedTuple):
+    """
+    Parsed street line of an address; city, state and ZIP are left to the ZIP block
+    """
+    number: str
+    street: str
+    suffix: str = ''
+    directional: str = ''
+    unit: str = ''
+
+    def canonical(self) -> str:
+        number, street, suffix, directional, unit = self
+        line = f"{number} {directional} {street}" if directional else f"{number} {street}"
+        if suffix:
+            line = f"{line} {suffix}"
+        return f"{line} #{unit}" if unit else line
+
+
+@lru_cache(maxsize=65536)
+def normalize_address(address: str) -> Optional[AddressKey]:
+    """
+    Parse the street line of address into an AddressKey, or None when it has no house number
+    """
+    line, _, rest = (address or '').lower().replace("'", '').partition(',')
+    while rest and _UNIT_AFTER_COMMA.match(rest):
+        # "660 Grand St, Apt 4B, Hoboken": the unit can come after a comma too
+        part, _, rest = rest.partition(',')
+        line = f"{line} {part}"
+    tokens = _TOKENS.findall(line)
+    if not tokens or not tokens[0][0].isdigit():
+        return None
+    number = tokens[0]
+
+    street: List[str] = []
+    unit = ''
+    for i in range(1, len(tokens)):
+        token = tokens[i]
+        if token in UNIT_DESIGNATORS:
+            unit = _UNIT_CHARS.sub('', ''.join(tokens[i + 1:]))
+            break
+        if (token[0].isdigit() or token[-1].isdigit()) and street and street[-1] in STREET_SUFFIXES:
+            # "351 Grand St 5C": a bare unit after the suffix
+            unit = _UNIT_CHARS.sub('', ''.join(tokens[i:]))
+            break
+        street.append(ORDINALS.get(token, token))
+
+    directional = ''
+    if len(street) > 1 and street[0] in DIRECTIONALS:
+        directional = DIRECTIONALS[street.pop(0)]
+    if len(street) > 1 and street[-1] in DIRECTIONALS:
+        post = DIRECTIONALS[street.pop()]
+        directional = f"{directional} {post}" if directional else post
+    suffix = ''
+    if len(street) > 1 and street[-1] in STREET_SUFFIXES:
+        suffix = STREET_SUFFIXES[street.pop()]
+    return AddressKey(number, ' '.join(street), suffix, directional, unit)
+
+
+def address_key(address: str) -> str:
+    """
+    Canonical form of address for exact matching; the lowercased text if it cannot be parsed
+    """
+    key = normalize_address(address)
+    return key.canonical() if key is not None else ' '.join((address or '').lower().split())
+
+
+def storage_key(zip_code: Optional[str], address: str) -> str:
+    """
+    Key a property is stored under (properties.address_key): its ZIP and address_key, as AddressIndex matches exactly
+
+    Every spelling that normalizes the same updates one row, whichever
+    source's spelling the merge kept.
+    """
+    return f"{zip_code or ''}|{address_key(address)}"
+
+
+def similar_streets(a: AddressKey, b: AddressKey, threshold: float = None) -> bool:
+    """
+    True if two keys with the same number and unit name the same street
+
+    A missing suffix or directional matches anything, but two different ones
+    (Park Ave / Park Pl, N Main / S Main) never do.
+    """
+    if a.suffix and b.suffix and a.suffix != b.suffix:
+        return False
+    if a.directional and b.directional and a.directional != b.directional:
+        return False
+    if a.street == b.street:
+        return True
+    threshold = STREET_SIMILARITY if threshold is None else threshold
+    return SequenceMatcher(None, a.street, b.street).ratio() >= threshold
+
+
+class AddressIndex:
+    """
+    Blocking index that maps addresses to the property they belong to, per ZIP code
+    """
+
+    def __init__(self, threshold: float = None):
+        self.threshold = STREET_SIMILARITY if threshold is None else threshold
+        self._exact: Dict[Tuple[str, str], Any] = {}
+        self._blocks: Dict[Tuple[str, str, str], List[Tuple[AddressKey, Any]]] = {}
+
+    def assign(self, zip_code: str, address: str, value: Any) -> Tuple[Any, str]:
+        """
+        Return (value, 'exact' or 'fuzzy') for a property already registered, or register value and return (value, 'new')
+        """
+        key = normalize_address(address)
+        exact = (zip_code or '', key.canonical() if key is not None else address_key(address))
+        found = self._exact.get(exact)
+        if found is not None:
+            return found, 'exact'
+
+        if key is not None:
+            block = self._blocks.setdefault((exact[0], key.number, key.unit), [])
+            for candidate, candidate_value in block:
+                if similar_streets(key, candidate, self.threshold):
+                    # Later spellings of the same property go straight to the exact lookup
+                    self._exact[exact] = candidate_value
+                    return candidate_value, 'fuzzy'
+            block.append((key, value))
+        self._exact[exact] = value
+        return value, 'new'
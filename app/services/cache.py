@@ -0,0 +1,263 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Any
+import logging
+
+from . import metrics
+from .coordination import LEASE_POLL_INTERVAL, LEASE_TTL, SharedState
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("SCRAPER_CACHE_BACKEND", "memory")  # memory or sqlite
+CACHE_TTL = float(os.getenv("SCRAPER_CACHE_TTL", "300"))  # seconds, 0 disables caching
+CACHE_MAX_ENTRIES = int(os.getenv("SCRAPER_CACHE_MAX_ENTRIES", "512"))
+CACHE_PATH = os.getenv("SCRAPER_CACHE_PATH", "./propai_cache.db")
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store of (value, stored_at) pairs
+    """
+    blocking = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: str, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    On-disk LRU store so cached pages survive restarts
+    """
+    blocking = True
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS page_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_page_cache_accessed_at ON page_cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM page_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE page_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return row
+
+    def set(self, key: str, value: str, stored_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, stored_at, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM page_cache WHERE key NOT IN "
+                "(SELECT key FROM page_cache ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM page_cache WHERE key = ?", (key,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM page_cache").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class PageCache:
+    """
+    TTL cache for fetched pages with single-flight coalescing of concurrent misses
+
+    With a SharedState (and a backend other processes can read), a miss also
+    takes a fetch lease on the key, so concurrent misses in other worker
+    processes wait for this one's result instead of fetching it again.
+    """
+
+    def __init__(self, backend=None, ttl: float = CACHE_TTL, shared: SharedState = None):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.shared_waits = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _call(self, method: str, *args):
+        fn = getattr(self.backend, method)
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = await self._call('get', key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if time.time() - stored_at > self.ttl:
+            await self._call('delete', key)
+            return None
+        return value
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]], store: Callable[[Any], Optional[str]] = None) -> Any:
+        """
+        Return the cached value for key, or run fetch once no matter how many callers are waiting
+
+        When fetch returns more than the page text, store picks the text to
+        cache out of its result; cache hits then return that text alone.
+        """
+        if self.ttl <= 0:
+            return await fetch()
+
+        value = await self.get(key)
+        if value is not None:
+            self.hits += 1
+            metrics.CACHE_LOOKUPS.inc('hit')
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            metrics.CACHE_LOOKUPS.inc('coalesced')
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        metrics.CACHE_LOOKUPS.inc('miss')
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        metrics.CACHE_IN_FLIGHT.inc()
+        try:
+            if self.shared is not None:
+                value = await self._fetch_leased(key, fetch, store)
+            else:
+                value = await self._fetch_and_store(key, fetch, store)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited isn't logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+            metrics.CACHE_IN_FLIGHT.dec()
+
+    async def refresh(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                      store: Callable[[Any], Optional[str]] = None) -> Any:
+        """
+        Run fetch without reading the cache, and cache its result as get_or_fetch would
+        """
+        if self.ttl <= 0:
+            return await fetch()
+        self.misses += 1
+        metrics.CACHE_LOOKUPS.inc('miss')
+        return await self._fetch_and_store(key, fetch, store)
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                               store: Callable[[Any], Optional[str]] = None) -> Any:
+        value = await fetch()
+        text = store(value) if store is not None else value
+        # Failed fetches (None) are not cached so the next search retries
+        if text is not None:
+            await self._call('set', key, text, time.time())
+        return value
+
+    async def _fetch_leased(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                            store: Callable[[Any], Optional[str]] = None) -> Any:
+        """
+        Fetch under the key's shared lease, or wait for the process holding it and read its result from the cache
+        """
+        waited = False
+        while True:
+            if await asyncio.to_thread(self.shared.try_lease, key, LEASE_TTL):
+                renewal = asyncio.ensure_future(self._renew_lease(key))
+                try:
+                    return await self._fetch_and_store(key, fetch, store)
+                finally:
+                    renewal.cancel()
+                    await asyncio.to_thread(self.shared.release, key)
+            if not waited:
+                waited = True
+                self.shared_waits += 1
+                metrics.CACHE_SHARED_WAITS.inc()
+            while await asyncio.to_thread(self.shared.lease_held, key):
+                await asyncio.sleep(LEASE_POLL_INTERVAL)
+            value = await self.get(key)
+            if value is not None:
+                return value
+            # The other fetch failed or had nothing to cache, so try for the lease again
+
+    async def _renew_lease(self, key: str):
+        """
+        Keep key's lease from lapsing while a fetch that outlasts LEASE_TTL is still running
+        """
+        while True:
+            await asyncio.sleep(LEASE_TTL / 3)
+            if not await asyncio.to_thread(self.shared.renew, key, LEASE_TTL):
+                logger.warning(f"Lost the fetch lease on {key}; another worker may fetch it too")
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        This cache's counters since it was created; /metrics has the same counts per process
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'shared_waits': self.shared_waits,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'in_flight': len(self._inflight),
+        }
+
+
+def create_page_cache(shared: SharedState = None) -> PageCache:
+    """
+    Build the page cache configured by the SCRAPER_CACHE_* environment variables
+
+    With shared state the cache is always the SQLite backend, since worker
+    processes can only wait on each other's fetches through a cache they all read.
+    """
+    if CACHE_BACKEND == 'sqlite' or shared is not None:
+        backend = SQLiteCacheBackend(CACHE_PATH, CACHE_MAX_ENTRIES)
+    else:
+        if CACHE_BACKEND != 'memory':
+            logger.error(f"Unknown cache backend {CACHE_BACKEND!r}, falling back to memory")
+        backend = MemoryCacheBackend(CACHE_MAX_ENTRIES)
+    return PageCache(backend, CACHE_TTL, shared)
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..database import dialect_insert
+from ..models import PageSnapshot, Property
+from .addresses import storage_key
+from .listings import PARSED_FIELDS, Listing, ListingBatch
+from .scoring import DEFAULT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Change detection works at two levels. A page whose ETag/Last-Modified gets a
+# 304, or whose body hashes the same as last time, reuses its stored parsed
+# listings; a ZIP where no page changed reuses its stored merge output. Each
+# merged listing then carries a fingerprint of its normalized fields, and
+# listings whose fingerprint matches the stored row skip scoring and writes.
+#
+# days_on_market is left out of the fingerprint: every source bumps it daily,
+# which would make every listing look changed on every refresh. It only
+# affects the score when it crosses ScoringWeights.long_listing_days, so that
+# crossing counts as a change; otherwise the new count is written in bulk
+# (persistence.update_days_on_market) without rescoring.
+
+# Parsed fields that define a listing's content; scores are derived from these
+FINGERPRINT_FIELDS = tuple(field for field in PARSED_FIELDS if field != 'days_on_market')
+
+SCORED_FIELDS = ('motivation_score', 'suggested_offer', 'estimated_roi')
+
+
+class PageState(NamedTuple):
+    """
+    What we last saw for a page (or a ZIP's merged result): validators, body hash and parsed listings
+    """
+    content_hash: str
+    listings: List[Listing]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def page_hash(html: str) -> str:
+    return hashlib.blake2b(html.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def combined_hash(hashes: Iterable[str]) -> str:
+    return hashlib.blake2b('|'.join(hashes).encode(), digest_size=16).hexdigest()
+
+
+def listing_fingerprint(listing: Listing) -> str:
+    """
+    Stable hash of a listing's normalized content fields
+    """
+    normalized = []
+    for field in FINGERPRINT_FIELDS:
+        value = getattr(listing, field)
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+            if field == 'address':
+                value = value.lower()
+        elif isinstance(value, float):
+            # Sub-cent / sub-square-foot noise between scrapes is not a change
+            value = round(value, 2)
+        normalized.append(value)
+    return hashlib.blake2b(repr(normalized).encode(), digest_size=16).hexdigest()
+
+
+def add_fingerprints(properties: Iterable[Listing]):
+    for p in properties:
+        p.content_hash = listing_fingerprint(p)
+
+
+def _is_long_listing(days_on_market: Any, long_listing_days: float) -> bool:
+    return (days_on_market or 0) > long_listing_days
+
+
+async def split_changed(db, properties: Sequence[Listing], long_listing_days: float = None
+                        ) -> Tuple[List[Listing], List[Listing], List[Listing]]:
+    """
+    Split merged listings into (changed, unchanged, aged) against the stored properties
+
+    Every listing gets its content_hash set (the scraper already fingerprints
+    at merge time). Unchanged listings also get their stored scores copied in,
+    so they can be returned without re-scoring. aged holds the unchanged
+    listings whose days_on_market moved without crossing long_listing_days
+    (the active weights' threshold); a crossing makes a listing changed.
+    """
+    if long_listing_days is None:
+        long_listing_days = DEFAULT_WEIGHTS.long_listing_days
+    add_fingerprints(p for p in properties if p.content_hash is None)
+
+    keys = [storage_key(p.zip_code, p.address) for p in properties if p.address]
+    stored: Dict[str, Any] = {}
+    for start in range(0, len(keys), 1000):
+        result = await db.execute(
+            select(Property.address_key, Property.content_hash, Property.days_on_market,
+                   *[getattr(Property, f) for f in SCORED_FIELDS])
+            .where(Property.address_key.in_(keys[start:start + 1000]))
+        )
+        stored.update((row.address_key, row) for row in result)
+
+    changed, unchanged, aged = [], [], []
+    for p in properties:
+        row = stored.get(storage_key(p.zip_code, p.address)) if p.address else None
+        if (row is not None and row.content_hash == p.content_hash and row.motivation_score is not None
+                and _is_long_listing(row.days_on_market, long_listing_days)
+                == _is_long_listing(p.days_on_market, long_listing_days)):
+            for field in SCORED_FIELDS:
+                setattr(p, field, getattr(row, field))
+            unchanged.append(p)
+            if row.days_on_market != p.days_on_market:
+                aged.append(p)
+        else:
+            changed.append(p)
+    return changed, unchanged, aged
+
+
+def _load_listings(text: str) -> List[Listing]:
+    # Stored as {field: [values]}; snapshots written before that are a list of listing dicts
+    data = json.loads(text)
+    if isinstance(data, dict):
+        return ListingBatch.from_columns(data).to_listings()
+    return [Listing.from_dict(listing) for listing in data]
+
+
+class SnapshotStore:
+    """
+    page_snapshots table access: load the last known state of pages, save new ones
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def load(self, keys: Sequence[str]) -> Dict[str, PageState]:
+        states: Dict[str, PageState] = {}
+        keys = list(keys)
+        async with self.engine.connect() as conn:
+            for start in range(0, len(keys), 1000):
+                result = await conn.execute(
+                    select(PageSnapshot).where(PageSnapshot.key.in_(keys[start:start + 1000]))
+                )
+                for row in result.mappings():
+                    states[row['key']] = PageState(
+                        content_hash=row['content_hash'],
+                        listings=_load_listings(row['listings']),
+                        etag=row['etag'],
+                        last_modified=row['last_modified'],
+                    )
+        return states
+
+    async def save(self, states: Dict[str, PageState]):
+        if not states:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                'key': key,
+                'etag': state.etag,
+                'last_modified': state.last_modified,
+                'content_hash': state.content_hash,
+                'listings': json.dumps(ListingBatch.from_listings(state.listings).to_columns(), separators=(',', ':')),
+                'fetched_at': now,
+            }
+            for key, state in states.items()
+        ]
+        async with self.engine.begin() as conn:
+            stmt = dialect_insert(conn, PageSnapshot.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['key'],
+                set_={column: stmt.excluded[column] for column in rows[0] if column != 'key'}
+            )
+            await conn.execute(stmt, rows)
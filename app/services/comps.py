@@ -0,0 +1,191 @@
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .addresses import storage_key
+
+# Comparable sales are the nearest listings by square footage within the same
+# ZIP code and property type. Listings are stored once, sorted by
+# (zip/type group, square feet), so each lookup is a binary search plus a
+# window of at most 2k+2 candidates. A listing is never its own comp: rows are
+# matched on their storage key, so "12 Main Street" and "12 Main St" are one
+# property here just as they are one row in the properties table.
+COMPS_K = int(os.getenv("COMPS_K", "5"))
+COMPS_MIN = int(os.getenv("COMPS_MIN", "3"))  # fewer comps than this falls back to list-price rules
+COMPS_MAX_SQFT_DIFF = float(os.getenv("COMPS_MAX_SQFT_DIFF", "0.25"))  # max relative size difference
+
+
+def normalize_property_type(property_type: Optional[str]) -> str:
+    return (property_type or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+class CompsIndex:
+    """
+    Nearest-neighbour comps lookup grouped by (zip_code, property_type)
+    """
+
+    def __init__(self, zip_codes: Sequence[str], property_types: Sequence[str], square_feet: Sequence[float],
+                 prices: Sequence[float], addresses: Sequence[str], keys: Sequence[str] = None):
+        """
+        keys are the rows' storage keys when already known (properties.address_key); otherwise they are computed
+        """
+        if keys is None:
+            keys = [storage_key(z, a) for z, a in zip(zip_codes, addresses)]
+        zips = np.asarray(zip_codes, dtype=str)
+        normalized: Dict[Optional[str], str] = {}
+        types = np.asarray([
+            normalized[t] if t in normalized else normalized.setdefault(t, normalize_property_type(t))
+            for t in property_types
+        ], dtype=str)
+        sqft = np.asarray(square_feet, dtype=float)
+        price = np.asarray(prices, dtype=float)
+        address = np.asarray(addresses, dtype=object)
+        key = np.asarray(keys, dtype=object)
+
+        # Only listings with a usable price per square foot can serve as comps
+        usable = (sqft > 0) & (price > 0)
+        zips, types, sqft, price = zips[usable], types[usable], sqft[usable], price[usable]
+        address, key = address[usable], key[usable]
+
+        zip_values, zip_codes_idx = np.unique(zips, return_inverse=True)
+        type_values, type_codes_idx = np.unique(types, return_inverse=True)
+        group = zip_codes_idx.astype(np.int64) * max(1, len(type_values)) + type_codes_idx
+        order = np.lexsort((sqft, group))
+
+        self.square_feet = sqft[order]
+        self.price = price[order]
+        self.price_per_sqft = self.price / self.square_feet
+        self.address = address[order]
+        self.key = key[order]
+
+        sorted_group = group[order]
+        starts = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]]) if len(order) else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(order)] if len(order) else np.array([], dtype=int)
+        self._groups: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            code = int(sorted_group[start])
+            key = (str(zip_values[code // max(1, len(type_values))]), str(type_values[code % max(1, len(type_values))]))
+            self._groups[key] = (start, end)
+
+    def __len__(self) -> int:
+        return len(self.square_feet)
+
+    @classmethod
+    def from_properties(cls, properties: Sequence[Dict[Any, Any]]) -> "CompsIndex":
+        return cls(
+            [p.get('zip_code') or '' for p in properties],
+            [p.get('property_type') for p in properties],
+            [p.get('square_feet') or 0 for p in properties],
+            [p.get('price') or 0 for p in properties],
+            [p.get('address') for p in properties],
+        )
+
+    @classmethod
+    async def from_db(cls, db, zip_codes: Sequence[str] = None, extra: Sequence[Dict[Any, Any]] = ()) -> "CompsIndex":
+        """
+        Build an index from stored properties (optionally limited to some ZIPs) plus extra fresh listings
+        """
+        from sqlalchemy import select
+        from ..models import Property
+
+        stmt = select(Property.zip_code, Property.property_type, Property.square_feet, Property.price, Property.address,
+                      Property.address_key)
+        if zip_codes:
+            stmt = stmt.where(Property.zip_code.in_(list(zip_codes)))
+        fresh_keys = {storage_key(p.get('zip_code'), p.get('address')) for p in extra}
+
+        # Fresh listings take precedence over stored rows for the same property, however it is spelled
+        columns = [[], [], [], [], [], []]
+        result = await db.stream(stmt)
+        async for partition in result.partitions(10000):
+            for row in partition:
+                key = row.address_key or storage_key(row.zip_code, row.address)
+                if key in fresh_keys:
+                    continue
+                columns[0].append(row.zip_code or '')
+                columns[1].append(row.property_type)
+                columns[2].append(row.square_feet or 0)
+                columns[3].append(row.price or 0)
+                columns[4].append(row.address)
+                columns[5].append(key)
+        for p in extra:
+            columns[0].append(p.get('zip_code') or '')
+            columns[1].append(p.get('property_type'))
+            columns[2].append(p.get('square_feet') or 0)
+            columns[3].append(p.get('price') or 0)
+            columns[4].append(p.get('address'))
+            columns[5].append(storage_key(p.get('zip_code'), p.get('address')))
+        return cls(*columns)
+
+    def _window(self, start: int, end: int, square_feet: np.ndarray, k: int) -> np.ndarray:
+        # k nearest neighbours (k + 1 when the subject itself is indexed) lie
+        # within k + 1 positions either side of the insertion point
+        positions = np.searchsorted(self.square_feet[start:end], square_feet) + start
+        offsets = np.arange(-(k + 1), k + 1)
+        return positions[:, None] + offsets[None, :]
+
+    def _nearest(self, start: int, end: int, square_feet: np.ndarray, keys: np.ndarray, k: int,
+                 max_sqft_diff: float) -> Tuple[np.ndarray, np.ndarray]:
+        candidates = self._window(start, end, square_feet, k)
+        valid = (candidates >= start) & (candidates < end)
+        candidates = np.clip(candidates, start, end - 1)
+
+        distance = np.abs(self.square_feet[candidates] - square_feet[:, None])
+        valid &= distance <= square_feet[:, None] * max_sqft_diff
+        valid &= self.key[candidates] != keys[:, None]
+        distance = np.where(valid, distance, np.inf)
+
+        take = np.argsort(distance, axis=1, kind='stable')[:, :k]
+        chosen = np.take_along_axis(candidates, take, axis=1)
+        found = np.isfinite(np.take_along_axis(distance, take, axis=1))
+        return chosen, found
+
+    def top_k(self, zip_code: str, property_type: str, square_feet: float, k: int = COMPS_K,
+              exclude_address: str = None, max_sqft_diff: float = COMPS_MAX_SQFT_DIFF) -> List[Dict[str, Any]]:
+        """
+        Return up to k comps as dicts usable by PropertyScorer.calculate_suggested_offer
+        """
+        bounds = self._groups.get((zip_code, normalize_property_type(property_type)))
+        if bounds is None or not square_feet or square_feet <= 0:
+            return []
+        chosen, found = self._nearest(
+            bounds[0], bounds[1], np.array([float(square_feet)]),
+            np.array([storage_key(zip_code, exclude_address)], dtype=object), k, max_sqft_diff
+        )
+        return [
+            {'address': self.address[i], 'square_feet': float(self.square_feet[i]), 'price': float(self.price[i])}
+            for i in chosen[0][found[0]].tolist()
+        ]
+
+    def comp_stats(self, properties: Sequence[Dict[Any, Any]], k: int = COMPS_K, min_comps: int = COMPS_MIN,
+                   max_sqft_diff: float = COMPS_MAX_SQFT_DIFF) -> Dict[str, np.ndarray]:
+        """
+        Bulk comps lookup returning the per-row sums PropertyScorer.score_batch expects
+        """
+        n = len(properties)
+        count = np.zeros(n)
+        ppsf_sum = np.zeros(n)
+        price_sum = np.zeros(n)
+
+        by_group: Dict[Tuple[str, str], List[int]] = {}
+        for i, p in enumerate(properties):
+            if (p.get('square_feet') or 0) > 0:
+                key = (p.get('zip_code') or '', normalize_property_type(p.get('property_type')))
+                if key in self._groups:
+                    by_group.setdefault(key, []).append(i)
+
+        for key, rows in by_group.items():
+            start, end = self._groups[key]
+            rows = np.asarray(rows)
+            square_feet = np.asarray([properties[i]['square_feet'] for i in rows], dtype=float)
+            keys = np.asarray([storage_key(key[0], properties[i].get('address')) for i in rows], dtype=object)
+            chosen, found = self._nearest(start, end, square_feet, keys, k, max_sqft_diff)
+
+            found_count = found.sum(axis=1)
+            enough = found_count >= max(1, min_comps)
+            count[rows] = np.where(enough, found_count, 0)
+            ppsf_sum[rows] = np.where(enough, np.where(found, self.price_per_sqft[chosen], 0.0).sum(axis=1), 0.0)
+            price_sum[rows] = np.where(enough, np.where(found, self.price[chosen], 0.0).sum(axis=1), 0.0)
+
+        return {'comp_count': count, 'comp_ppsf_sum': ppsf_sum, 'comp_price_sum': price_sum}
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# With several worker processes on one machine (uvicorn --workers N), each
+# has its own scraper. SCRAPER_COORDINATION=sqlite makes them share one
+# SQLite file in WAL mode: per-host token buckets, so the configured rate is
+# the total across workers, and fetch leases, so a page another worker is
+# already fetching is read from the shared page cache instead of fetched
+# again. "local" keeps all of it per process.
+COORDINATION_BACKEND = os.getenv("SCRAPER_COORDINATION", "local")  # local or sqlite
+COORDINATION_PATH = os.getenv("SCRAPER_COORDINATION_PATH", "./propai_coordination.db")
+# Seconds a fetch lease lasts unless renewed. The holder renews it every
+# LEASE_TTL / 3 for as long as the fetch runs (queueing for a token, 429
+# backoff and retries included), so it only lapses when the worker is gone.
+LEASE_TTL = float(os.getenv("SCRAPER_LEASE_TTL", "60"))
+LEASE_POLL_INTERVAL = float(os.getenv("SCRAPER_LEASE_POLL_INTERVAL", "0.05"))
+
+
+class SharedState:
+    """
+    Token buckets and fetch leases in a SQLite file that every worker process opens
+
+    Methods block on SQLite and are meant to be called through
+    asyncio.to_thread. Each bucket operation is one BEGIN IMMEDIATE
+    transaction, which SQLite serializes across processes.
+    """
+
+    def __init__(self, path: str = COORDINATION_PATH):
+        self.path = path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fetch_leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _update_bucket(self, key: str, rate: float, capacity: float, take: float, ceiling: float = None) -> float:
+        """
+        Refill key's bucket, cap it at ceiling, take `take` tokens and return the balance left (may be negative)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                if ceiling is not None:
+                    tokens = min(tokens, ceiling)
+                tokens -= take
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return tokens
+
+    def take_token(self, key: str, rate: float, capacity: float) -> float:
+        """
+        Reserve one token from key's bucket; returns the seconds to wait before using it
+
+        A reservation drives the balance negative, so later callers in any
+        process queue behind it without polling.
+        """
+        tokens = self._update_bucket(key, rate, capacity, 1)
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def backoff(self, key: str, rate: float, capacity: float, seconds: float):
+        """
+        Hold back key's next token for at least `seconds`, for every process
+        """
+        self._update_bucket(key, rate, capacity, 0, ceiling=1 - seconds * rate)
+
+    def try_lease(self, key: str, ttl: float = LEASE_TTL) -> bool:
+        """
+        Claim key for this process unless another holds an unexpired lease on it
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO fetch_leases (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE fetch_leases.expires_at < ?",
+                (key, self.owner, now + ttl, now)
+            )
+            return cursor.rowcount > 0
+
+    def renew(self, key: str, ttl: float = LEASE_TTL) -> bool:
+        """
+        Extend this process's lease on key; False if it no longer holds it
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE fetch_leases SET expires_at = ? WHERE key = ? AND owner = ?", (time.time() + ttl, key, self.owner)
+            )
+            return cursor.rowcount > 0
+
+    def release(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM fetch_leases WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def lease_held(self, key: str) -> bool:
+        """
+        Whether some process holds an unexpired lease on key
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM fetch_leases WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def close(self):
+        self._conn.close()
+
+
+class SharedTokenBucket:
+    """
+    TokenBucket whose tokens live in SharedState, so every process drawing on key shares `rate`
+    """
+
+    def __init__(self, state: SharedState, key: str, rate: float, capacity: float):
+        self.state = state
+        self.key = key
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+
+    async def acquire(self):
+        wait = await asyncio.to_thread(self.state.take_token, self.key, self.rate, self.capacity)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def backoff(self, seconds: float):
+        await asyncio.to_thread(self.state.backoff, self.key, self.rate, self.capacity, seconds)
+
+
+def create_shared_state() -> Optional[SharedState]:
+    """
+    The SharedState configured by SCRAPER_COORDINATION, or None to keep limits and in-flight fetches per process
+    """
+    if COORDINATION_BACKEND == 'sqlite':
+        return SharedState(COORDINATION_PATH)
+    if COORDINATION_BACKEND != 'local':
+        logger.error(f"Unknown coordination backend {COORDINATION_BACKEND!r}, falling back to local")
+    return None
@@ -1,34 +1,127 @@
-import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterable, Mapping
 import csv
+import os
+import zlib
 from datetime import datetime
 import io
 
+from . import metrics
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+# Column order and headers shared by the in-memory and streaming exports
+EXPORT_COLUMNS = {
+    'address': 'Address',
+    'zip_code': 'ZIP Code',
+    'price': 'List Price',
+    'suggested_offer': 'Suggested Offer',
+    'motivation_score': 'Motivation Score',
+    'estimated_roi': 'Estimated ROI %',
+    'days_on_market': 'Days on Market',
+    'price_drops': 'Price Drops',
+    'owner_status': 'Owner Status',
+    'tax_assessed_value': 'Tax Assessed Value',
+    'square_feet': 'Square Feet',
+    'property_type': 'Property Type',
+    'listing_agent': 'Listing Agent'
+}
+
+def _money(x):
+    return f"${x:,.2f}"
+
+def _percent(x):
+    return f"{x:.1f}%"
+
+def _score(x):
+    return f"{x:.1f}"
+
+EXPORT_FORMATTERS = {
+    'price': _money,
+    'suggested_offer': _money,
+    'estimated_roi': _percent,
+    'tax_assessed_value': _money,
+    'motivation_score': _score,
+}
+
+# Export formats: media type and file extension
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+
+# Raw, typed columns for the columnar formats (no currency/percent formatting)
+COLUMNAR_COLUMNS = (
+    'id', 'address', 'zip_code', 'property_type', 'price', 'square_feet', 'days_on_market', 'price_drops',
+    'owner_status', 'tax_assessed_value', 'listing_agent', 'motivation_score', 'suggested_offer',
+    'estimated_roi', 'created_at', 'updated_at',
+)
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    string, double, integer = pa.string(), pa.float64(), pa.int64()
+    timestamp = pa.timestamp('us')
+    types = {
+        'id': integer, 'address': string, 'zip_code': string, 'property_type': string,
+        'price': double, 'square_feet': double, 'days_on_market': integer, 'price_drops': integer,
+        'owner_status': string, 'tax_assessed_value': double, 'listing_agent': string,
+        'motivation_score': double, 'suggested_offer': double, 'estimated_roi': double,
+        'created_at': timestamp, 'updated_at': timestamp,
+    }
+    return pa.schema([(column, types[column]) for column in COLUMNAR_COLUMNS])
+
+class _ChunkSink:
+    """
+    Write-only file object that collects pyarrow writer output for streaming
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
 class DataExporter:
     @staticmethod
     def export_to_csv(properties: List[Dict[Any, Any]]) -> io.StringIO:
         """
         Export property data to CSV format
         """
+        # pandas is only needed here, so it is not loaded at startup
+        import pandas as pd
+
         # Convert properties to DataFrame
         df = pd.DataFrame(properties)
         
         # Reorder and rename columns for better readability
-        columns = {
-            'address': 'Address',
-            'zip_code': 'ZIP Code',
-            'price': 'List Price',
-            'suggested_offer': 'Suggested Offer',
-            'motivation_score': 'Motivation Score',
-            'estimated_roi': 'Estimated ROI %',
-            'days_on_market': 'Days on Market',
-            'price_drops': 'Price Drops',
-            'owner_status': 'Owner Status',
-            'tax_assessed_value': 'Tax Assessed Value',
-            'square_feet': 'Square Feet',
-            'property_type': 'Property Type',
-            'listing_agent': 'Listing Agent'
-        }
+        columns = EXPORT_COLUMNS
         
         # Select and rename columns
         df = df[[col for col in columns.keys() if col in df.columns]]
@@ -52,3 +145,126 @@ class DataExporter:
         output.seek(0)
         
         return output
+
+    @staticmethod
+    def format_csv_chunk(rows: Iterable[Mapping[str, Any]], header: bool = False) -> str:
+        """
+        Render a chunk of property rows as CSV text with the export formatting
+        """
+        output = io.StringIO()
+        writer = csv.writer(output, quoting=csv.QUOTE_NONNUMERIC, lineterminator='\n')
+        if header:
+            writer.writerow(EXPORT_COLUMNS.values())
+        formatters = [(column, EXPORT_FORMATTERS.get(column)) for column in EXPORT_COLUMNS]
+        writer.writerows(
+            [
+                '' if row[column] is None else (fmt(row[column]) if fmt else row[column])
+                for column, fmt in formatters
+            ]
+            for row in rows
+        )
+        return output.getvalue()
+
+    @staticmethod
+    async def iter_csv_chunks(session_factory: Callable, chunk_size: int = None) -> AsyncIterator[str]:
+        """
+        Yield the properties table as CSV chunks, reading it in pages from a server-side cursor
+        """
+        from sqlalchemy import select
+        from ..models import Property
+
+        chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+        yield DataExporter.format_csv_chunk((), header=True)
+
+        async with session_factory() as db:
+            stmt = select(*[getattr(Property, column) for column in EXPORT_COLUMNS]).order_by(Property.id)
+            result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+            async for partition in result.mappings().partitions():
+                yield DataExporter.format_csv_chunk(partition)
+
+    @staticmethod
+    async def iter_csv_gzip_chunks(session_factory: Callable, chunk_size: int = None) -> AsyncIterator[bytes]:
+        """
+        Gzip-compressed variant of iter_csv_chunks
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+        async for chunk in DataExporter.iter_csv_chunks(session_factory, chunk_size):
+            data = compressor.compress(chunk.encode('utf-8'))
+            if data:
+                yield data
+        yield compressor.flush()
+
+    @staticmethod
+    async def iter_record_batches(session_factory: Callable, chunk_size: int = None) -> AsyncIterator[Any]:
+        """
+        Yield the properties table as typed pyarrow RecordBatches, one per database page
+        """
+        import pyarrow as pa
+        from sqlalchemy import select
+        from ..models import Property
+
+        chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+        schema = _arrow_schema()
+        async with session_factory() as db:
+            stmt = select(*[getattr(Property, column) for column in COLUMNAR_COLUMNS]).order_by(Property.id)
+            result = await db.stream(stmt.execution_options(yield_per=chunk_size))
+            async for partition in result.partitions():
+                columns = list(zip(*partition))
+                yield pa.record_batch(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                )
+
+    @staticmethod
+    async def iter_columnar_chunks(session_factory: Callable, export_format: str, chunk_size: int = None) -> AsyncIterator[bytes]:
+        """
+        Yield a Parquet file or Arrow IPC stream in pieces, one row group / batch per database page
+        """
+        import pyarrow as pa
+
+        schema = _arrow_schema()
+        sink = _ChunkSink()
+        if export_format == 'parquet':
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        else:
+            writer = pa.ipc.new_stream(sink, schema)
+        try:
+            async for batch in DataExporter.iter_record_batches(session_factory, chunk_size):
+                writer.write_batch(batch)
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def columnar_available(export_format: str = 'arrow') -> bool:
+        """
+        Whether pyarrow can write export_format here, checked before a response starts streaming
+
+        Parquet support is a separate pyarrow module that some builds leave out.
+        """
+        try:
+            import pyarrow  # noqa: F401
+            if export_format == 'parquet':
+                import pyarrow.parquet  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @staticmethod
+    def stream_export(session_factory: Callable, export_format: str = 'csv', chunk_size: int = None) -> AsyncIterator:
+        """
+        Async byte/text stream of the properties table in the requested export format
+        """
+        if export_format == 'csv':
+            chunks = DataExporter.iter_csv_chunks(session_factory, chunk_size)
+        elif export_format == 'csv.gz':
+            chunks = DataExporter.iter_csv_gzip_chunks(session_factory, chunk_size)
+        elif export_format in ('parquet', 'arrow'):
+            chunks = DataExporter.iter_columnar_chunks(session_factory, export_format, chunk_size)
+        else:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        return metrics.track_iter('export', chunks)
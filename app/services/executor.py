@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# CPU-bound work (page parsing, scoring) runs off the event loop so one heavy
+# search doesn't stall every other request on the same uvicorn worker.
+EXECUTOR_KIND = os.getenv("PROPAI_EXECUTOR", "process")  # process, thread or inline
+EXECUTOR_WORKERS = int(os.getenv("PROPAI_EXECUTOR_WORKERS", "0")) or None
+EXECUTOR_BATCH_SIZE = int(os.getenv("PROPAI_EXECUTOR_BATCH_SIZE", "500"))
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Optional[Executor]:
+    """
+    Return the shared executor, creating it on first use; None means run inline
+    """
+    global _executor
+    if _executor is None and EXECUTOR_KIND != 'inline':
+        if EXECUTOR_KIND == 'process':
+            try:
+                # spawn avoids forking a process that already runs threads and an event loop
+                _executor = ProcessPoolExecutor(
+                    max_workers=EXECUTOR_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            except (OSError, NotImplementedError, ValueError) as e:
+                logger.error(f"Process pool unavailable, falling back to threads: {str(e)}")
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS)
+    return _executor
+
+
+def uses_processes() -> bool:
+    """
+    Whether run_cpu hands work to other processes, so arguments and results are pickled
+    """
+    return isinstance(get_executor(), ProcessPoolExecutor)
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _replace_broken(executor: Executor, error: BrokenProcessPool):
+    """
+    Drop a process pool that lost a worker so the next get_executor() builds a fresh one
+    """
+    global _executor
+    # Every task still queued on the pool fails with it; only the first to notice replaces it
+    if _executor is executor:
+        logger.error(f"Process pool broke, starting a new one: {str(error)}")
+        executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_cpu(fn: Callable, *args) -> Any:
+    """
+    Run fn(*args) on the CPU executor; fn must be a picklable module-level function
+
+    A worker that dies (killed for memory, a crash in a C extension) breaks
+    the whole process pool, so the pool is replaced and fn retried once.
+    """
+    executor = get_executor()
+    if executor is None:
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(executor, fn, *args)
+    except BrokenProcessPool as e:
+        _replace_broken(executor, e)
+    executor = get_executor()
+    try:
+        return await loop.run_in_executor(executor, fn, *args)
+    except BrokenProcessPool as e:
+        # Most likely fn itself kills its worker; leave a working pool for other callers
+        _replace_broken(executor, e)
+        raise
+
+
+def _slice(value: Any, start: int, end: int) -> Any:
+    if isinstance(value, Mapping):
+        return {key: column[start:end] for key, column in value.items()}
+    return value[start:end]
+
+
+async def map_batched(fn: Callable[..., List[Any]], items: List[Any], *columns: Any, batch_size: int = None) -> List[Any]:
+    """
+    Apply a list -> list function to items in batches on the executor and concatenate the results
+
+    Extra positional columns (sequences, or mappings of sequences) are aligned
+    with items and sliced the same way for each batch.
+    """
+    batch_size = batch_size or EXECUTOR_BATCH_SIZE
+    if not items:
+        return []
+    if len(items) <= batch_size:
+        return await run_cpu(fn, items, *columns)
+    # One task per batch keeps pickling/IPC overhead proportional to batches, not items
+    bounds = [(i, min(i + batch_size, len(items))) for i in range(0, len(items), batch_size)]
+    results = await asyncio.gather(*(
+        run_cpu(fn, items[start:end], *(_slice(column, start, end) for column in columns))
+        for start, end in bounds
+    ))
+    return [item for batch in results for item in batch]
@@ -0,0 +1,64 @@
+import json
+import re
+from typing import Any, Optional
+
+# Listing pages are several megabytes of markup around a single JSON blob.
+# Rather than building a full DOM, jump straight to a marker string that only
+# occurs inside the wanted <script> and slice out that one element.
+
+_TYPE_ATTR = re.compile(r'''\btype\s*=\s*["']?([^"'\s>]+)''', re.IGNORECASE)
+_decoder = json.JSONDecoder()
+
+
+def _script_type(attrs: str) -> Optional[str]:
+    match = _TYPE_ATTR.search(attrs)
+    return match.group(1).lower() if match else None
+
+
+def find_script(html: str, marker: str, script_type: str = None) -> Optional[str]:
+    """
+    Return the body of the first <script> containing marker, optionally restricted to a type attribute
+    """
+    start = 0
+    while True:
+        idx = html.find(marker, start)
+        if idx < 0:
+            return None
+
+        open_idx = html.rfind('<script', 0, idx)
+        tag_end = html.find('>', open_idx) if open_idx >= 0 else -1
+        close_idx = html.find('</script', tag_end) if tag_end >= 0 else -1
+
+        # The marker must sit inside the body of the nearest preceding script tag
+        if open_idx < 0 or tag_end < 0 or tag_end > idx or close_idx < idx:
+            start = idx + len(marker)
+            continue
+
+        if script_type is None or _script_type(html[open_idx + 7:tag_end]) == script_type:
+            return html[tag_end + 1:close_idx]
+
+        start = close_idx
+
+
+def decode_json_after(text: str, prefix: str) -> Optional[Any]:
+    """
+    Decode the JSON value that immediately follows prefix, stopping at the end of that value
+    """
+    idx = text.find(prefix)
+    if idx < 0:
+        return None
+    idx += len(prefix)
+    while idx < len(text) and text[idx].isspace():
+        idx += 1
+    value, _ = _decoder.raw_decode(text, idx)
+    return value
+
+
+def extract_script_json(html: str, marker: str, script_type: str = None) -> Optional[Any]:
+    """
+    Decode the JSON body of the first <script> containing marker
+    """
+    body = find_script(html, marker, script_type)
+    if body is None:
+        return None
+    return json.loads(body)
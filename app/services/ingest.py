@@ -0,0 +1,117 @@
+import functools
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+from .changes import split_changed
+from .comps import CompsIndex
+from .executor import map_batched
+from .listings import Listing, ListingBatch
+from . import metrics
+from .persistence import remove_duplicates, update_days_on_market, upsert_properties
+from .rescoring import load_weights
+from .scoring import SCORE_INPUTS, ScoringWeights, apply_scores, listing_features, score_listing_batch
+
+logger = logging.getLogger(__name__)
+
+
+async def score_listings(listings: List[Listing], comp_stats: Dict[str, Any], weights: ScoringWeights) -> List[Listing]:
+    """
+    Score listings in batches off the event loop; workers get only the scoring columns, and send back scores
+    """
+    with metrics.track('score'):
+        batch = ListingBatch.from_listings(listings, [name for name, _ in SCORE_INPUTS])
+        score = functools.partial(score_listing_batch, weights=weights)
+        apply_scores(listings, await map_batched(score, batch, comp_stats))
+    return listings
+
+
+async def score_and_persist(db, engine, zip_codes: List[str], properties: List[Listing]) -> List[Listing]:
+    """
+    Score and persist the new or changed listings among properties; returns them all scored
+    """
+    await remove_duplicates(engine, properties)
+    weights = await load_weights(db)
+    changed, unchanged, aged = await split_changed(db, properties, weights.long_listing_days)
+    if aged:
+        # Only the day count moved: write it without rescoring or rewriting the rows
+        await update_days_on_market(engine, aged)
+    if not changed:
+        logger.info(f"Refreshed {len(zip_codes)} ZIPs: no new or changed listings")
+        return unchanged
+
+    # Comps come from stored listings in the searched ZIPs plus everything just scraped
+    comps_index = await CompsIndex.from_db(db, zip_codes, extra=changed)
+    comp_stats = comps_index.comp_stats(changed)
+
+    # Score in batches off the event loop, then persist so /export and /outreach can read them.
+    # The features behind the scores are stored too, so new weights can rescore without a scrape.
+    changed = await score_listings(changed, comp_stats, weights)
+    await upsert_properties(engine, changed, features=listing_features(changed, comp_stats))
+
+    logger.info(f"Refreshed {len(zip_codes)} ZIPs: {len(changed)} new or changed, {len(unchanged)} unchanged listings")
+    return changed + unchanged
+
+
+async def refresh_listings(scraper, db, engine, zip_codes: List[str]) -> List[Listing]:
+    """
+    Scrape zip_codes, score and persist new or changed listings, and return every current listing scored
+
+    Listings whose content matches the stored row keep their stored scores and
+    are not written again.
+    """
+    properties = await scraper.scrape_all_sources(zip_codes)
+    return await score_and_persist(db, engine, zip_codes, properties)
+
+
+async def stream_refresh(scraper, session_factory: Callable, engine, zip_codes: List[str],
+                         select: Callable[[List[Listing]], List[Listing]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    refresh_listings that reports progress: one "listings" event per (zip, source) page, then a "summary"
+
+    Page events carry the ZIP's merged listings touched by that page, scored
+    against stored comps only; they are provisional. The summary carries every
+    listing ranked by its final score, after the usual merge, change detection
+    and persist. select (e.g. the search filters) is applied to both.
+    """
+    select = select or (lambda listings: listings)
+    zip_codes = list(dict.fromkeys(zip_codes))
+    started = time.perf_counter()
+    async with session_factory() as db:
+        previous = await scraper.load_previous(zip_codes)
+        stored_comps = await CompsIndex.from_db(db, zip_codes)
+        weights = await load_weights(db)
+
+        zip_pages: Dict[str, Dict[str, Any]] = {zip_code: {} for zip_code in zip_codes}
+        async for zip_code, source, page in scraper.iter_pages(zip_codes, previous):
+            zip_pages[zip_code][source] = page
+            if not page.listings:
+                continue
+            # Re-merge what this ZIP has so far so a listing seen on two sites is sent as one
+            sources = [s for s in scraper.sources() if s in zip_pages[zip_code]]
+            merged = scraper._merge_property_data(
+                [p for s in sources for p in zip_pages[zip_code][s].listings],
+                [s for s in sources for _ in zip_pages[zip_code][s].listings]
+            )
+            # The listings this page added to or updated
+            batch = [p for p in merged if any(entry['source'] == source for entry in p.provenance)]
+            batch = await score_listings(batch, stored_comps.comp_stats(batch), weights)
+            yield {
+                'event': 'listings',
+                'zip_code': zip_code,
+                'source': source,
+                'elapsed_seconds': round(time.perf_counter() - started, 3),
+                'listings': select(batch),
+            }
+
+        properties = await scraper.finish_pages(zip_pages, previous)
+        properties = await score_and_persist(db, engine, zip_codes, properties)
+
+    ranked = sorted(select(properties), key=lambda p: p.motivation_score, reverse=True)
+    yield {
+        'event': 'summary',
+        'zip_codes': zip_codes,
+        'count': len(ranked),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'listings': ranked,
+    }
@@ -0,0 +1,200 @@
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..models import RefreshJob
+from .metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_ATTEMPTS = int(os.getenv("SCHEDULER_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE = float(os.getenv("SCHEDULER_RETRY_BASE", "30"))  # seconds, doubled per failed attempt
+JOB_RETRY_MAX = float(os.getenv("SCHEDULER_RETRY_MAX", "3600"))
+JOB_TIMEOUT = float(os.getenv("SCHEDULER_JOB_TIMEOUT", "600"))
+JOB_RETENTION = float(os.getenv("SCHEDULER_JOB_RETENTION", str(7 * 86400)))  # seconds finished jobs are kept
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    zip_code: str
+    attempt: int
+
+
+class JobQueue:
+    """
+    Persistent ZIP refresh queue in the refresh_jobs table
+
+    Jobs are claimed highest priority first, then by run_after. A partial
+    unique index allows one queued-or-running job per ZIP, so duplicate
+    requests collapse even across processes. Failed jobs go back in the queue
+    with exponential backoff until max_attempts.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_attempts: int = None, retry_base: float = None, retry_max: float = None):
+        self.engine = engine
+        self.max_attempts = max_attempts or JOB_MAX_ATTEMPTS
+        self.retry_base = JOB_RETRY_BASE if retry_base is None else retry_base
+        self.retry_max = JOB_RETRY_MAX if retry_max is None else retry_max
+
+    async def enqueue(self, zip_code: str, priority: int = 0, run_after: datetime = None) -> bool:
+        """
+        Queue a refresh of zip_code; returns False if one is already queued or running
+
+        A duplicate with a higher priority raises the queued job's priority instead.
+        """
+        now = datetime.utcnow()
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(
+                    update(RefreshJob)
+                    .where(RefreshJob.zip_code == zip_code, RefreshJob.status == 'queued', RefreshJob.priority < priority)
+                    .values(priority=priority)
+                )
+                existing = await conn.scalar(
+                    select(RefreshJob.id).where(RefreshJob.zip_code == zip_code, RefreshJob.status.in_(ACTIVE_STATUSES))
+                )
+                if existing is not None:
+                    return False
+                await conn.execute(insert(RefreshJob).values(
+                    zip_code=zip_code, priority=priority, status='queued', attempts=0,
+                    run_after=run_after or now, enqueued_at=now,
+                ))
+            return True
+        except IntegrityError:
+            # Another process queued the same ZIP between our check and insert
+            return False
+
+    async def claim(self) -> Optional[ClaimedJob]:
+        """
+        Mark the next runnable job as running and return it, or None if nothing is due
+        """
+        while True:
+            now = datetime.utcnow()
+            async with self.engine.begin() as conn:
+                row = (await conn.execute(
+                    select(RefreshJob.id, RefreshJob.zip_code, RefreshJob.attempts)
+                    .where(RefreshJob.status == 'queued', RefreshJob.run_after <= now)
+                    .order_by(RefreshJob.priority.desc(), RefreshJob.run_after, RefreshJob.id)
+                    .limit(1)
+                )).first()
+                if row is None:
+                    return None
+                claimed = await conn.execute(
+                    update(RefreshJob)
+                    .where(RefreshJob.id == row.id, RefreshJob.status == 'queued')
+                    .values(status='running', started_at=now, attempts=RefreshJob.attempts + 1)
+                )
+            if claimed.rowcount == 1:
+                return ClaimedJob(row.id, row.zip_code, row.attempts + 1)
+            # Another worker claimed it first; try the next due job rather than idling until the next poll
+
+    async def complete(self, job: ClaimedJob, listings: int):
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(RefreshJob).where(RefreshJob.id == job.id)
+                .values(status='done', finished_at=datetime.utcnow(), listings=listings, error=None)
+            )
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempt - 1))
+        # Jitter keeps ZIPs that failed together (e.g. a site outage) from retrying in lockstep
+        return delay * random.uniform(0.8, 1.2)
+
+    async def fail(self, job: ClaimedJob, error: str):
+        """
+        Requeue a failed job with backoff, or mark it failed once it is out of attempts
+        """
+        now = datetime.utcnow()
+        if job.attempt >= self.max_attempts:
+            values = {'status': 'failed', 'finished_at': now, 'error': error}
+        else:
+            values = {'status': 'queued', 'run_after': now + timedelta(seconds=self.backoff(job.attempt)), 'error': error}
+        async with self.engine.begin() as conn:
+            await conn.execute(update(RefreshJob).where(RefreshJob.id == job.id).values(**values))
+
+    async def release(self, job: ClaimedJob):
+        """
+        Put an interrupted job (e.g. on shutdown) back in the queue without using up an attempt
+        """
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                update(RefreshJob).where(RefreshJob.id == job.id, RefreshJob.status == 'running')
+                .values(status='queued', started_at=None, attempts=RefreshJob.attempts - 1)
+            )
+
+    async def recover_stale(self, timeout: float = None) -> int:
+        """
+        Requeue jobs left running by a process that died; returns how many
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=2 * (timeout or JOB_TIMEOUT))
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(RefreshJob)
+                .where(RefreshJob.status == 'running', RefreshJob.started_at < cutoff)
+                .values(status='queued', run_after=datetime.utcnow())
+            )
+        if result.rowcount:
+            logger.warning(f"Requeued {result.rowcount} stale refresh jobs")
+        return result.rowcount
+
+    async def purge(self, retention: float = None) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=retention or JOB_RETENTION)
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                delete(RefreshJob).where(RefreshJob.status.in_(('done', 'failed')), RefreshJob.finished_at < cutoff)
+            )
+        return result.rowcount
+
+    async def stats(self, recent: int = 500) -> Dict[str, Any]:
+        """
+        Queue depth by status and latency percentiles over the most recently finished jobs
+
+        wait is enqueue to (last) start, so it includes retry backoff; run is
+        the duration of the final attempt.
+        """
+        now = datetime.utcnow()
+        async with self.engine.connect() as conn:
+            depth = dict((await conn.execute(
+                select(RefreshJob.status, func.count()).group_by(RefreshJob.status)
+            )).all())
+            ready, oldest_ready = (await conn.execute(
+                select(func.count(), func.min(RefreshJob.run_after))
+                .where(RefreshJob.status == 'queued', RefreshJob.run_after <= now)
+            )).one()
+            finished = (await conn.execute(
+                select(RefreshJob.enqueued_at, RefreshJob.started_at, RefreshJob.finished_at)
+                .where(RefreshJob.status == 'done')
+                .order_by(RefreshJob.finished_at.desc())
+                .limit(recent)
+            )).all()
+            failures = (await conn.execute(
+                select(RefreshJob.zip_code, RefreshJob.attempts, RefreshJob.error, RefreshJob.status)
+                .where(RefreshJob.error.isnot(None), RefreshJob.status.in_(('queued', 'failed')))
+                .order_by(RefreshJob.id.desc())
+                .limit(10)
+            )).all()
+
+        wait = [(row.started_at - row.enqueued_at).total_seconds() for row in finished]
+        run = [(row.finished_at - row.started_at).total_seconds() for row in finished]
+        return {
+            'depth': {status: depth.get(status, 0) for status in ('queued', 'running', 'done', 'failed')},
+            'ready': ready,
+            'oldest_ready_seconds': round((now - oldest_ready).total_seconds(), 3) if oldest_ready else None,
+            'latency': {
+                'jobs': len(finished),
+                'wait_p50': percentile(wait, 50),
+                'wait_p95': percentile(wait, 95),
+                'run_p50': percentile(run, 50),
+                'run_p95': percentile(run, 95),
+                'total_p95': percentile([w + r for w, r in zip(wait, run)], 95),
+            },
+            'recent_errors': [dict(row._mapping) for row in failures],
+        }
@@ -0,0 +1,188 @@
+from array import array
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# Listings travel the pipeline as Listing records (fixed __slots__, no
+# per-listing dict) and cross process and storage boundaries as ListingBatch
+# columns, where numeric fields pack into typed arrays. Listing still answers
+# listing['price'] and listing.get('price') so code written against the old
+# dicts keeps working; to_dict() is for the API boundary.
+
+# What the parsers read from a listing page
+PARSED_FIELDS = (
+    'address', 'zip_code', 'price', 'square_feet', 'days_on_market', 'price_drops', 'property_type',
+    'listing_agent', 'tax_assessed_value', 'owner_status', 'pre_foreclosure',
+)
+
+# Added by the merge, change detection and scoring
+DERIVED_FIELDS = ('provenance', 'content_hash', 'motivation_score', 'suggested_offer', 'estimated_roi')
+
+LISTING_FIELDS = PARSED_FIELDS + DERIVED_FIELDS
+
+# Tuples of field values, in field order
+parsed_values = attrgetter(*PARSED_FIELDS)
+listing_values = attrgetter(*LISTING_FIELDS)
+
+
+class Listing:
+    """
+    One listing: the parsed fields plus whatever the merge and scoring have added (None until then)
+    """
+    __slots__ = LISTING_FIELDS
+
+    def __init__(self, address: str = None, zip_code: str = None, price: Any = None, square_feet: Any = None,
+                 days_on_market: Any = None, price_drops: Any = None, property_type: str = None,
+                 listing_agent: str = None, tax_assessed_value: Any = None, owner_status: str = None,
+                 pre_foreclosure: Any = None, provenance: List[Dict[str, Any]] = None, content_hash: str = None,
+                 motivation_score: float = None, suggested_offer: float = None, estimated_roi: float = None):
+        self.address = address
+        self.zip_code = zip_code
+        self.price = price
+        self.square_feet = square_feet
+        self.days_on_market = days_on_market
+        self.price_drops = price_drops
+        self.property_type = property_type
+        self.listing_agent = listing_agent
+        self.tax_assessed_value = tax_assessed_value
+        self.owner_status = owner_status
+        self.pre_foreclosure = pre_foreclosure
+        self.provenance = provenance
+        self.content_hash = content_hash
+        self.motivation_score = motivation_score
+        self.suggested_offer = suggested_offer
+        self.estimated_roi = estimated_roi
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Listing":
+        return cls(**{field: data[field] for field in LISTING_FIELDS if field in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Parsed fields always, derived fields once they are set, as the listing dicts used to be
+        """
+        data = {field: getattr(self, field) for field in PARSED_FIELDS}
+        for field in DERIVED_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    def copy(self) -> "Listing":
+        return Listing(*listing_values(self))
+
+    def __reduce__(self):
+        # Positional values pickle smaller than the default slot-state dict
+        return Listing, listing_values(self)
+
+    # Mapping-style access for callers that still treat listings as dicts
+
+    def __getitem__(self, field: str) -> Any:
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __setitem__(self, field: str, value: Any):
+        try:
+            setattr(self, field, value)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def get(self, field: str, default: Any = None) -> Any:
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+    def __contains__(self, field: str) -> bool:
+        return getattr(self, field, None) is not None
+
+    def keys(self) -> Iterable[str]:
+        return self.to_dict().keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __repr__(self) -> str:
+        return f"Listing({self.address!r}, {self.zip_code!r}, price={self.price!r})"
+
+
+def _pack(values: List[Any]):
+    """
+    A typed array for all-int or all-float columns, which pickle and store as raw bytes; a list otherwise
+    """
+    kinds = {type(value) for value in values}
+    if kinds == {int}:
+        try:
+            return array('q', values)
+        except OverflowError:
+            return values
+    if kinds == {float}:
+        return array('d', values)
+    return values
+
+
+class ListingBatch:
+    """
+    Many listings as one column per field, for shipping to worker processes and storing snapshots
+
+    Numeric columns are typed arrays, so a batch pickles as a few buffers
+    instead of one object per value. Slicing a batch slices every column,
+    which is what executor.map_batched needs.
+    """
+    __slots__ = ('columns', 'length')
+
+    def __init__(self, columns: Dict[str, Sequence[Any]], length: int = None):
+        self.columns = columns
+        self.length = length if length is not None else len(next(iter(columns.values()), ()))
+
+    @classmethod
+    def from_listings(cls, listings: Sequence[Listing], fields: Sequence[str] = LISTING_FIELDS) -> "ListingBatch":
+        # Columns that are None throughout (e.g. scores before scoring) are left out
+        columns = {}
+        for field in fields:
+            values = list(map(attrgetter(field), listings))
+            if any(value is not None for value in values):
+                columns[field] = _pack(values)
+        return cls(columns, len(listings))
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, List[Any]]) -> "ListingBatch":
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        return cls({field: values for field, values in columns.items() if field in LISTING_FIELDS},
+                   lengths.pop() if lengths else 0)
+
+    def to_listings(self) -> List[Listing]:
+        fields = list(self.columns)
+        rows = zip(*(self.columns[field] for field in fields)) if fields else ((),) * self.length
+        return [Listing(**dict(zip(fields, row))) for row in rows]
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """
+        Plain lists per column, for JSON
+        """
+        return {field: list(values) for field, values in self.columns.items()}
+
+    def column(self, field: str, default: Any = None) -> Sequence[Any]:
+        values = self.columns.get(field)
+        if values is None:
+            return [default] * self.length
+        return values
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: slice) -> "ListingBatch":
+        if not isinstance(index, slice):
+            raise TypeError("ListingBatch only supports slicing")
+        columns = {field: values[index] for field, values in self.columns.items()}
+        return ListingBatch(columns, len(range(*index.indices(self.length))))
+
+
+def json_default(value: Any) -> Any:
+    """
+    json.dumps default= hook for responses that carry listings
+    """
+    if isinstance(value, Listing):
+        return value.to_dict()
+    return str(value)
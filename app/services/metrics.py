@@ -0,0 +1,223 @@
+import asyncio
+import functools
+import os
+import time
+from bisect import bisect_left
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+# In-process metrics in the Prometheus text format, served at /metrics. With
+# METRICS_ENABLED=false the timing hooks return a shared no-op and decorated
+# functions are left unwrapped, so instrumented code pays almost nothing.
+# Work done in executor worker processes is timed from the calling side.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6)
+
+_REGISTRY: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of values, rounded for status reports; None when there are none
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 3)
+
+
+class Metric:
+    """
+    A named metric with one series per combination of label values, given positionally
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.enabled = METRICS_ENABLED
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        _REGISTRY.append(self)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                for key, value in self._series.items()]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1):
+        if self.enabled:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels: str, amount: float = 1):
+        if self.enabled:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        if not self.enabled:
+            return
+        series = self._series.get(labels)
+        if series is None:
+            # Per-bucket (not yet cumulative) counts with the +Inf bucket last, then the sum
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="{}"'.format('+Inf' if bound == float('inf') else _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'propai_stage_duration_seconds', 'Time spent per pipeline stage call', ('stage', 'source'))
+STAGE_IN_FLIGHT = Gauge(
+    'propai_stage_in_flight', 'Pipeline stage calls currently running', ('stage', 'source'))
+PAGE_BYTES = Histogram(
+    'propai_page_size_bytes', 'Size of fetched listing pages', ('source',), buckets=SIZE_BUCKETS)
+FETCH_RETRIES = Counter(
+    'propai_fetch_retries_total', 'Page requests retried after a 429 or a connection error', ('source',))
+FETCH_THROTTLED = Counter(
+    'propai_fetch_throttled_total', 'Page requests answered with 429 Too Many Requests', ('source',))
+FETCH_ERRORS = Counter(
+    'propai_fetch_errors_total', 'Failed page requests by HTTP status or exception type', ('source', 'reason'))
+PARSE_FAILURES = Counter(
+    'propai_parse_failures_total', 'Fetched pages that raised in the parser or yielded no listings', ('source', 'reason'))
+CACHE_LOOKUPS = Counter(
+    'propai_page_cache_lookups_total', 'Page cache lookups by result: hit, miss, or coalesced onto a fetch in flight',
+    ('result',))
+CACHE_SHARED_WAITS = Counter(
+    'propai_page_cache_shared_waits_total', 'Page cache misses that waited for another worker process to fetch the page')
+CACHE_IN_FLIGHT = Gauge(
+    'propai_page_cache_in_flight', 'Page fetches in flight through the page cache')
+
+
+class _Timer:
+    __slots__ = ('stage', 'source', 'start')
+
+    def __init__(self, stage: str, source: str):
+        self.stage = stage
+        self.source = source
+
+    def __enter__(self):
+        STAGE_IN_FLIGHT.inc(self.stage, self.source)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, self.stage, self.source)
+        STAGE_IN_FLIGHT.dec(self.stage, self.source)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def track(stage: str, source: str = ''):
+    """
+    Context manager timing one call of a pipeline stage and counting it as in flight meanwhile
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _Timer(stage, source or '')
+
+
+def timed(stage: str) -> Callable:
+    """
+    Decorator form of track for a whole function, sync or async
+    """
+    def decorate(fn: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return fn
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed_async(*args, **kwargs):
+                with _Timer(stage, ''):
+                    return await fn(*args, **kwargs)
+            return timed_async
+
+        @functools.wraps(fn)
+        def timed_sync(*args, **kwargs):
+            with _Timer(stage, ''):
+                return fn(*args, **kwargs)
+        return timed_sync
+    return decorate
+
+
+def track_iter(stage: str, chunks: AsyncIterator, source: str = '') -> AsyncIterator:
+    """
+    track for a stream: timed from the first item until it is exhausted or closed
+    """
+    if not METRICS_ENABLED:
+        return chunks
+    return _tracked_iter(stage, chunks, source or '')
+
+
+async def _tracked_iter(stage: str, chunks: AsyncIterator, source: str) -> AsyncIterator:
+    with _Timer(stage, source):
+        async for chunk in chunks:
+            yield chunk
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
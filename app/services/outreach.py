@@ -0,0 +1,233 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..database import dialect_insert
+from ..models import OutreachMessage
+from .metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+OUTREACH_MODEL = os.getenv("OUTREACH_MODEL", "gpt-4")
+OUTREACH_CONCURRENCY = int(os.getenv("OUTREACH_CONCURRENCY", "8"))  # simultaneous LLM calls per process
+OUTREACH_TIMEOUT = float(os.getenv("OUTREACH_TIMEOUT", "60"))  # seconds per call
+OUTREACH_MAX_RETRIES = int(os.getenv("OUTREACH_MAX_RETRIES", "2"))
+OUTREACH_RETRY_BASE = float(os.getenv("OUTREACH_RETRY_BASE", "1"))  # seconds, doubled per retry
+
+SYSTEM_PROMPT = "You are a professional real estate investor crafting an outreach message."
+
+
+def retryable_errors() -> Tuple[type, ...]:
+    """
+    Rate limits, timeouts and server-side failures are worth another try; bad requests and auth errors are not
+    """
+    # openai is imported on the first call rather than when the app starts
+    import openai
+
+    return (
+        asyncio.TimeoutError, openai.error.Timeout, openai.error.RateLimitError, openai.error.APIError,
+        openai.error.ServiceUnavailableError, openai.error.APIConnectionError, openai.error.TryAgain,
+    )
+
+
+def outreach_prompt(property_data: Dict[Any, Any]) -> List[Dict[str, str]]:
+    """
+    Chat messages asking for an outreach message about property_data
+    """
+    prompt = f"""
+        Generate a professional and empathetic outreach message for a property owner.
+
+        Property Details:
+        - Address: {property_data.get('address')}
+        - Days on Market: {property_data.get('days_on_market')}
+        - Current Price: ${property_data.get('price') or 0:,.2f}
+        - Price Drops: {property_data.get('price_drops')}
+
+        The message should be friendly, professional, and highlight our ability to provide a quick, cash transaction.
+        """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def prompt_hash(model: str, messages: List[Dict[str, str]]) -> str:
+    return hashlib.blake2b(json.dumps([model, messages], sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+class OutreachGenerator:
+    """
+    Outreach messages from the chat completions API with bounded concurrency, retries and a persistent cache
+
+    Messages are cached in the outreach_messages table by a hash of the
+    model and prompt, so a property whose details have not changed is never
+    sent twice, and identical prompts in flight at the same time share one
+    call. One generator is shared by all requests, so the concurrency bound
+    holds for the whole process.
+    """
+
+    def __init__(self, engine: AsyncEngine, api_key: str = None, model: str = None, concurrency: int = None,
+                 timeout: float = None, max_retries: int = None):
+        self.engine = engine
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.model = model or OUTREACH_MODEL
+        self.concurrency = concurrency or OUTREACH_CONCURRENCY
+        self.timeout = timeout or OUTREACH_TIMEOUT
+        self.max_retries = OUTREACH_MAX_RETRIES if max_retries is None else max_retries
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {
+            'requested': 0, 'cache_hits': 0, 'deduplicated': 0, 'api_calls': 0, 'retries': 0,
+            'timeouts': 0, 'failures': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+        }
+        self._latencies: deque = deque(maxlen=1000)
+
+    async def start(self):
+        # One pooled session for every call instead of a new one per request
+        self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.concurrency))
+        return self
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def generate(self, property_data: Dict[Any, Any]) -> str:
+        result = (await self.generate_many([property_data]))[0]
+        if result['error']:
+            raise RuntimeError(result['error'])
+        return result['message']
+
+    async def generate_many(self, properties: Sequence[Dict[Any, Any]]) -> List[Dict[str, Any]]:
+        """
+        Outreach messages for properties, in order: {property_id, message, cached, error} each
+
+        A failed property gets its error instead of a message; the others are unaffected.
+        """
+        keyed: List[Tuple[str, List[Dict[str, str]]]] = []
+        for p in properties:
+            messages = outreach_prompt(p)
+            keyed.append((prompt_hash(self.model, messages), messages))
+        unique = dict(keyed)
+        self.stats['requested'] += len(keyed)
+
+        cached = await self._load(list(unique))
+        self.stats['cache_hits'] += sum(1 for key, _ in keyed if key in cached)
+        missing = [key for key in unique if key not in cached]
+        self.stats['deduplicated'] += sum(1 for key, _ in keyed if key not in cached) - len(missing)
+
+        outcomes = await asyncio.gather(*(self._complete(key, unique[key]) for key in missing), return_exceptions=True)
+        generated = dict(zip(missing, outcomes))
+
+        results = []
+        for p, (key, _) in zip(properties, keyed):
+            outcome = cached.get(key, generated.get(key))
+            error = f"{type(outcome).__name__}: {outcome}" if isinstance(outcome, BaseException) else None
+            results.append({
+                'property_id': p.get('id'),
+                'message': None if error else outcome,
+                'cached': key in cached,
+                'error': error,
+            })
+        return results
+
+    async def _complete(self, key: str, messages: List[Dict[str, str]]) -> str:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call_and_store(key, messages))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            # Another request is already generating this exact prompt
+            self.stats['deduplicated'] += 1
+        # A caller that goes away does not cancel the call other callers share
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats['failures'] += 1
+
+    async def _call_and_store(self, key: str, messages: List[Dict[str, str]]) -> str:
+        message, usage = await self._call(messages)
+        await self._save(key, message, usage)
+        return message
+
+    async def _call(self, messages: List[Dict[str, str]]) -> Tuple[str, Dict[str, int]]:
+        import openai
+
+        retryable = retryable_errors()
+        if self._session is not None:
+            openai.aiosession.set(self._session)
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                start = time.perf_counter()
+                self.stats['api_calls'] += 1
+                try:
+                    response = await asyncio.wait_for(
+                        openai.ChatCompletion.acreate(
+                            model=self.model, messages=messages, api_key=self.api_key, request_timeout=self.timeout
+                        ),
+                        self.timeout,
+                    )
+                except retryable as e:
+                    if isinstance(e, (asyncio.TimeoutError, openai.error.Timeout)):
+                        self.stats['timeouts'] += 1
+                    if attempt == self.max_retries:
+                        raise
+                    logger.warning(f"Outreach call failed (attempt {attempt + 1}), retrying: {type(e).__name__}: {e}")
+                else:
+                    self._latencies.append(time.perf_counter() - start)
+                    usage = response.get('usage') or {}
+                    self.stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+                    self.stats['completion_tokens'] += usage.get('completion_tokens', 0)
+                    return response.choices[0].message.content, usage
+            # Back off outside the semaphore so other calls can use the slot
+            self.stats['retries'] += 1
+            await asyncio.sleep(OUTREACH_RETRY_BASE * 2 ** attempt * random.uniform(0.8, 1.2))
+
+    async def _load(self, keys: Sequence[str]) -> Dict[str, str]:
+        messages: Dict[str, str] = {}
+        async with self.engine.connect() as conn:
+            for start in range(0, len(keys), 1000):
+                result = await conn.execute(
+                    select(OutreachMessage.prompt_hash, OutreachMessage.message)
+                    .where(OutreachMessage.prompt_hash.in_(keys[start:start + 1000]))
+                )
+                messages.update(result.all())
+        return messages
+
+    async def _save(self, key: str, message: str, usage: Dict[str, int]):
+        async with self.engine.begin() as conn:
+            stmt = dialect_insert(conn, OutreachMessage.__table__)
+            await conn.execute(stmt.values(
+                prompt_hash=key, model=self.model, message=message, created_at=datetime.utcnow(),
+                prompt_tokens=usage.get('prompt_tokens'), completion_tokens=usage.get('completion_tokens'),
+            ).on_conflict_do_nothing(index_elements=['prompt_hash']))
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Counters since startup plus call latency percentiles over the last 1000 calls
+        """
+        latencies = list(self._latencies)
+        requested = self.stats['requested']
+        return {
+            **self.stats,
+            'cache_hit_rate': round(self.stats['cache_hits'] / requested, 3) if requested else None,
+            'in_flight': len(self._inflight),
+            'concurrency': self.concurrency,
+            'latency_p50': percentile(latencies, 50),
+            'latency_p95': percentile(latencies, 95),
+        }
@@ -0,0 +1,114 @@
+from typing import List
+import logging
+from .extractor import extract_script_json, find_script, decode_json_after
+from .listings import Listing
+
+# Parsers are plain module-level functions so they can be shipped to a
+# process pool; they take page HTML and return Listing records.
+
+logger = logging.getLogger(__name__)
+
+def parse_zillow(html: str, zip_code: str) -> List[Listing]:
+    """
+    Parse listings from a Zillow search page
+    """
+    properties = []
+
+    try:
+        data = extract_script_json(html, 'searchPageState', 'application/json')
+        if data and 'cat1' in data and 'searchResults' in data['cat1']:
+            for property in data['cat1']['searchResults']['listResults']:
+                try:
+                    price_history = property.get('priceHistory', [])
+                    price_drops = sum(1 for ph in price_history if ph['event'] == 'Price reduction')
+                    
+                    prop_data = Listing(
+                        address=property['address'],
+                        zip_code=zip_code,
+                        price=property['price'],
+                        square_feet=property.get('livingArea', 0),
+                        days_on_market=property.get('daysOnZillow', 0),
+                        price_drops=price_drops,
+                        property_type=property.get('homeType', '').lower(),
+                        listing_agent=property.get('brokerName', ''),
+                        tax_assessed_value=property.get('taxAssessedValue', 0),
+                        owner_status='absentee' if property.get('isNonOwnerOccupied') else 'owner-occupied',
+                        pre_foreclosure=property.get('isPreforeclosureAuction', False),
+                    )
+                    properties.append(prop_data)
+                except Exception as e:
+                    logger.error(f"Error parsing property data: {str(e)}")
+                    continue
+    except Exception as e:
+        logger.error(f"Error scraping Zillow: {str(e)}")
+    
+    return properties
+
+def parse_redfin(html: str, zip_code: str) -> List[Listing]:
+    """
+    Parse listings from a Redfin search page
+    """
+    properties = []
+
+    try:
+        script = find_script(html, 'RF.reactBootstrap')
+        # Decode exactly one JSON object after the prefix instead of a greedy regex
+        data = decode_json_after(script, 'JSONData:') if script else None
+        if data and 'homes' in data:
+            for property in data['homes']:
+                try:
+                    prop_data = Listing(
+                        address=property['address'],
+                        zip_code=zip_code,
+                        price=property['price'],
+                        square_feet=property.get('sqFt', 0),
+                        days_on_market=property.get('daysOnMarket', 0),
+                        price_drops=property.get('priceDrops', 0),
+                        property_type=property.get('propertyType', '').lower(),
+                        listing_agent=property.get('listingAgent', ''),
+                        tax_assessed_value=property.get('taxAssessedValue', 0),
+                        owner_status='unknown',
+                        pre_foreclosure=False,
+                    )
+                    properties.append(prop_data)
+                except Exception as e:
+                    logger.error(f"Error parsing Redfin property data: {str(e)}")
+                    continue
+    except Exception as e:
+        logger.error(f"Error scraping Redfin: {str(e)}")
+    
+    return properties
+
+def parse_realtor(html: str, zip_code: str) -> List[Listing]:
+    """
+    Parse listings from a Realtor.com search page
+    """
+    properties = []
+
+    try:
+        data = extract_script_json(html, '"props":', 'application/json')
+        if data and 'props' in data and 'pageProps' in data['props']:
+            properties_data = data['props']['pageProps'].get('properties', [])
+            for property in properties_data:
+                try:
+                    prop_data = Listing(
+                        address=property['location']['address']['line'] + ', ' + property['location']['address']['city'],
+                        zip_code=zip_code,
+                        price=property['list_price'],
+                        square_feet=property.get('description', {}).get('sqft', 0),
+                        days_on_market=property.get('list_date_days', 0),
+                        price_drops=len(property.get('price_history', [])) - 1,
+                        property_type=property.get('type', '').lower(),
+                        listing_agent=property.get('listing', {}).get('agent', {}).get('name', ''),
+                        tax_assessed_value=property.get('tax_history', [{}])[0].get('assessment', {}).get('total', 0),
+                        owner_status='unknown',
+                        pre_foreclosure=property.get('flags', {}).get('is_foreclosure', False),
+                    )
+                    properties.append(prop_data)
+                except Exception as e:
+                    logger.error(f"Error parsing Realtor.com property data: {str(e)}")
+                    continue
+    except Exception as e:
+        logger.error(f"Error scraping Realtor.com: {str(e)}")
+    
+    return properties
@@ -0,0 +1,294 @@
+import os
+import logging
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Dict, List, Mapping, Sequence
+
+from sqlalchemy import bindparam, delete, inspect, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..database import dialect_insert
+from ..models import Property, PriceHistory, PropertyFeatures
+from . import metrics
+from .addresses import storage_key
+from .listings import Listing
+from .price_history import (
+    PREVIOUS_COLUMNS, PRICE_STAT_COLUMNS, next_price_stats, recompute_price_stats, record_prices,
+)
+from .scoring import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "1000"))
+
+PROPERTY_COLUMNS = (
+    'address', 'zip_code', 'property_type', 'price', 'square_feet', 'days_on_market', 'price_drops',
+    'owner_status', 'tax_assessed_value', 'listing_agent', 'motivation_score', 'suggested_offer', 'estimated_roi',
+    'content_hash',
+)
+_column_values = attrgetter(*PROPERTY_COLUMNS)
+_NO_PRICE_STATS = dict.fromkeys(PRICE_STAT_COLUMNS)
+
+
+def _upsert_statement(conn: Connection):
+    """
+    INSERT ... ON CONFLICT (address_key) DO UPDATE for the connection's dialect
+
+    The display address is updated like any other column, so a listing
+    spelled differently this time still lands on its row.
+    """
+    stmt = dialect_insert(conn, Property.__table__)
+    values = {column: stmt.excluded[column] for column in PROPERTY_COLUMNS}
+    values['updated_at'] = stmt.excluded.updated_at
+    return stmt.on_conflict_do_update(index_elements=['address_key'], set_=values)
+
+
+def _upsert_features(conn: Connection, rows: List[Dict[str, Any]]):
+    stmt = dialect_insert(conn, PropertyFeatures.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['property_id'],
+        set_={column: stmt.excluded[column] for column in rows[0] if column != 'property_id'}
+    )
+    conn.execute(stmt, rows)
+
+
+def _upsert_batch(conn: Connection, rows: List[Dict[str, Any]], now: datetime,
+                  features: Dict[str, Dict[str, Any]] = None) -> int:
+    keys = [row['address_key'] for row in rows]
+    previous = {
+        row['address_key']: row
+        for row in conn.execute(select(*PREVIOUS_COLUMNS).where(Property.address_key.in_(keys))).mappings()
+    }
+
+    for row in rows:
+        row['created_at'] = now
+        row['updated_at'] = now
+        # New listings get their price-history aggregates with the insert; the
+        # upsert leaves them alone on existing rows, which record_prices updates
+        row.update(_NO_PRICE_STATS if row['address_key'] in previous else next_price_stats(None, row['price'], now))
+    conn.execute(_upsert_statement(conn), rows)
+
+    # Price history only grows when a listing is new or its price moved
+    changed = {
+        row['address_key']: row['price'] for row in rows
+        if row['address_key'] not in previous or previous[row['address_key']]['price'] != row['price']
+    }
+    if features:
+        # Every row's id is needed for its features, so look them all up once
+        ids = conn.execute(select(Property.address_key, Property.id).where(Property.address_key.in_(keys))).all()
+        _upsert_features(conn, [
+            {'property_id': property_id, **features[key], 'updated_at': now}
+            for key, property_id in ids if key in features
+        ])
+        ids = [(key, property_id) for key, property_id in ids if key in changed]
+    else:
+        # Only new listings need their id looked up
+        new = [key for key in changed if key not in previous]
+        ids = [(key, previous[key]['id']) for key in changed if key in previous]
+        if new:
+            ids += conn.execute(select(Property.address_key, Property.id).where(Property.address_key.in_(new))).all()
+    return record_prices(conn, [
+        (property_id, changed[key], previous.get(key)) for key, property_id in ids
+    ], now)
+
+
+def property_rows(properties: Sequence[Listing]) -> List[Dict[str, Any]]:
+    """
+    One properties-table row per storage key; the last listing wins when a property appears twice
+    """
+    rows = {}
+    for p in properties:
+        if p.address:
+            key = storage_key(p.zip_code, p.address)
+            rows[key] = {**dict(zip(PROPERTY_COLUMNS, _column_values(p))), 'address_key': key}
+    return list(rows.values())
+
+
+def feature_rows(properties: Sequence[Listing], features: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    property_features values by storage key, from feature columns aligned with properties
+    """
+    columns = [(name, features[name].tolist()) for name in FEATURE_COLUMNS]
+    return {
+        storage_key(p.zip_code, p.address): {name: values[i] for name, values in columns}
+        for i, p in enumerate(properties) if p.address
+    }
+
+
+@metrics.timed('db_write')
+async def upsert_properties(engine: AsyncEngine, properties: Sequence[Listing], batch_size: int = None,
+                            features: Mapping[str, Any] = None) -> int:
+    """
+    Bulk upsert scored properties on their storage key, one transaction per batch; returns price-history rows added
+
+    features, when given, are the scoring.FEATURE_COLUMNS of properties and
+    are upserted into property_features in the same transactions.
+    """
+    batch_size = batch_size or PERSIST_BATCH_SIZE
+    now = datetime.utcnow()
+
+    rows = property_rows(properties)
+    features = feature_rows(properties, features) if features is not None else None
+
+    history_rows = 0
+    for start in range(0, len(rows), batch_size):
+        async with engine.begin() as conn:
+            history_rows += await conn.run_sync(_upsert_batch, rows[start:start + batch_size], now, features)
+    return history_rows
+
+
+def _update_days_on_market(conn: Connection, rows: List[Dict[str, Any]]):
+    table = Property.__table__
+    conn.execute(
+        update(table).where(table.c.address_key == bindparam('key')).values(days_on_market=bindparam('days')),
+        rows
+    )
+    # The stored features follow, so a weight sweep sees the same day count
+    features = PropertyFeatures.__table__
+    property_id = select(table.c.id).where(table.c.address_key == bindparam('key')).scalar_subquery()
+    conn.execute(
+        update(features).where(features.c.property_id == property_id).values(days_on_market=bindparam('days')),
+        rows
+    )
+
+
+@metrics.timed('db_write')
+async def update_days_on_market(engine: AsyncEngine, properties: Sequence[Listing], batch_size: int = None) -> int:
+    """
+    Bulk-write only days_on_market for stored properties, one transaction per batch; returns the rows written
+
+    For listings whose content is unchanged apart from their day count, which
+    would otherwise be rescored and rewritten on every refresh.
+    """
+    batch_size = batch_size or PERSIST_BATCH_SIZE
+    days = {storage_key(p.zip_code, p.address): p.days_on_market for p in properties if p.address}
+    rows = [{'key': key, 'days': value} for key, value in days.items()]
+    for start in range(0, len(rows), batch_size):
+        async with engine.begin() as conn:
+            await conn.run_sync(_update_days_on_market, rows[start:start + batch_size])
+    return len(rows)
+
+
+def _fold_rows(conn: Connection, primary_id: int, duplicate_ids: Sequence[int]):
+    """
+    Move the price history of duplicate_ids onto primary_id and delete the duplicates
+
+    The primary's aggregates are rebuilt from the combined history.
+    """
+    conn.execute(
+        update(PriceHistory).where(PriceHistory.property_id.in_(duplicate_ids)).values(property_id=primary_id)
+    )
+    conn.execute(delete(PropertyFeatures).where(PropertyFeatures.property_id.in_(duplicate_ids)))
+    conn.execute(delete(Property).where(Property.id.in_(duplicate_ids)))
+    recompute_price_stats(conn, [primary_id])
+
+
+def _fold_aliases(conn: Connection, aliases: Mapping[str, str], primary: Mapping[str, str]) -> int:
+    """
+    Fold rows stored under alias keys ({alias key: primary key}) into their primary's row; returns rows folded
+
+    An alias with no primary row yet is rekeyed in place, keeping its id.
+    """
+    found = dict(conn.execute(
+        select(Property.address_key, Property.id)
+        .where(Property.address_key.in_(list(aliases) + list(set(aliases.values()))))
+    ).all())
+    folded = 0
+    for alias, key in aliases.items():
+        alias_id = found.get(alias)
+        if alias_id is None:
+            continue
+        if key in found:
+            _fold_rows(conn, found[key], [alias_id])
+        else:
+            conn.execute(update(Property).where(Property.id == alias_id).values(address_key=key, address=primary[key]))
+            found[key] = alias_id
+        folded += 1
+    return folded
+
+
+async def remove_duplicates(engine: AsyncEngine, properties: Sequence[Listing]) -> int:
+    """
+    Fold stored rows saved under another source's spelling of a merged listing into the listing's row
+
+    The merge matches some spellings only approximately (a typo, a missing
+    suffix), and those keep their own storage key; the merged listing's
+    provenance names them. Their price history moves to the merged listing's
+    row instead of being lost. Returns the number of rows folded.
+    """
+    primary = {storage_key(p.zip_code, p.address): p.address for p in properties if p.address}
+    aliases = {}
+    for p in properties:
+        if not p.address:
+            continue
+        key = storage_key(p.zip_code, p.address)
+        for entry in p.provenance or ():
+            if entry.get('address'):
+                alias = storage_key(p.zip_code, entry['address'])
+                if alias not in primary:
+                    aliases[alias] = key
+
+    folded = 0
+    items = list(aliases.items())
+    for start in range(0, len(items), PERSIST_BATCH_SIZE):
+        async with engine.begin() as conn:
+            folded += await conn.run_sync(_fold_aliases, dict(items[start:start + PERSIST_BATCH_SIZE]), primary)
+    if folded:
+        logger.info(f"Folded {folded} listings stored under another address spelling into their merged row")
+    return folded
+
+
+def backfill_address_keys(conn: Connection, batch_size: int = 5000) -> int:
+    """
+    Key properties stored before properties.address_key existed; returns how many rows were keyed
+
+    Those rows were kept once per raw address, so spellings that now share a
+    key are folded into one row (the most recently updated), keeping all of
+    their price history. Runs with the schema step (database.init_db) before
+    the price-history backfill.
+    """
+    inspector = inspect(conn)
+    for index in inspector.get_indexes('properties'):
+        # The raw address was the unique conflict target; it is display data now
+        if index['column_names'] == ['address'] and index['unique']:
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+            for model_index in Property.__table__.indexes:
+                if list(model_index.columns.keys()) == ['address']:
+                    model_index.create(conn, checkfirst=True)
+
+    rows = conn.execute(
+        select(Property.id, Property.zip_code, Property.address)
+        .where(Property.address_key.is_(None))
+        .order_by(Property.updated_at.desc(), Property.id.desc())
+    ).all()
+    if not rows:
+        return 0
+    taken = dict(conn.execute(
+        select(Property.address_key, Property.id).where(Property.address_key.isnot(None))
+    ).all())
+
+    keyed: Dict[str, int] = {}
+    duplicates: Dict[int, List[int]] = {}
+    for property_id, zip_code, address in rows:
+        key = storage_key(zip_code, address)
+        primary_id = taken.get(key, keyed.get(key))
+        if primary_id is None:
+            keyed[key] = property_id
+        else:
+            duplicates.setdefault(primary_id, []).append(property_id)
+    for primary_id, duplicate_ids in duplicates.items():
+        _fold_rows(conn, primary_id, duplicate_ids)
+
+    items = [{'property_id': property_id, 'new_address_key': key} for key, property_id in keyed.items()]
+    table = Property.__table__
+    for start in range(0, len(items), batch_size):
+        conn.execute(
+            update(table).where(table.c.id == bindparam('property_id')).values(address_key=bindparam('new_address_key')),
+            items[start:start + batch_size]
+        )
+    logger.info(
+        f"Keyed {len(keyed)} stored properties by normalized address, folding "
+        f"{sum(map(len, duplicates.values()))} duplicate spellings"
+    )
+    return len(keyed)
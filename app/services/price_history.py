@@ -0,0 +1,171 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.engine import Connection
+
+from ..models import Property, PriceHistory
+
+logger = logging.getLogger(__name__)
+
+# A price-history row is written whenever a listing is first stored or its
+# price moves, and the aggregates search filters and sorts on are updated on
+# the properties row in the same transaction, so a query never reads history.
+# Rows stored before the aggregates existed are filled from their history by
+# the schema step (backfill_price_stats).
+
+PRICE_STAT_COLUMNS = ('first_price', 'first_price_at', 'drop_count', 'drop_pct', 'drop_velocity', 'last_drop_at')
+
+# What the next step needs from the stored row, before it is overwritten
+PREVIOUS_COLUMNS = (
+    Property.id, Property.address_key, Property.price, Property.created_at, Property.first_price,
+    Property.first_price_at, Property.drop_count, Property.last_drop_at,
+)
+
+VELOCITY_DAYS = 30
+
+
+def price_stats(price: Optional[float], first_price: Optional[float], first_price_at: datetime, drop_count: int,
+                last_drop_at: Optional[datetime]) -> Dict[str, Any]:
+    """
+    The stored aggregates for a listing now at price
+
+    drop_pct is how far price is below the first recorded price (0 when it is
+    not); drop_velocity is drop_pct per VELOCITY_DAYS between the first price
+    and the latest drop, counting at least one day.
+    """
+    drop_pct = 0.0
+    if first_price and price is not None and price < first_price:
+        drop_pct = (first_price - price) / first_price * 100
+    drop_velocity = 0.0
+    if drop_pct and last_drop_at is not None and first_price_at is not None:
+        days = max((last_drop_at - first_price_at).total_seconds() / 86400, 1.0)
+        drop_velocity = drop_pct / days * VELOCITY_DAYS
+    return {
+        'first_price': first_price,
+        'first_price_at': first_price_at,
+        'drop_count': drop_count,
+        'drop_pct': drop_pct,
+        'drop_velocity': drop_velocity,
+        'last_drop_at': last_drop_at,
+    }
+
+
+def next_price_stats(previous: Optional[Mapping[str, Any]], price: Optional[float], now: datetime) -> Dict[str, Any]:
+    """
+    Aggregates after a listing's price changes to price, from its stored row (None for a new listing)
+    """
+    if previous is None:
+        return price_stats(price, price, now, 0, None)
+    # A row stored before the aggregates existed and never backfilled starts from its stored price
+    first_price = previous['first_price'] if previous['first_price'] is not None else previous['price']
+    first_price_at = previous['first_price_at'] or previous['created_at'] or now
+    drop_count, last_drop_at = previous['drop_count'] or 0, previous['last_drop_at']
+    if price is not None and previous['price'] is not None and price < previous['price']:
+        drop_count, last_drop_at = drop_count + 1, now
+    return price_stats(price, first_price, first_price_at, drop_count, last_drop_at)
+
+
+def _stats_update():
+    table = Property.__table__
+    return (
+        update(table)
+        .where(table.c.id == bindparam('property_id'))
+        .values({column: bindparam(f"new_{column}") for column in PRICE_STAT_COLUMNS})
+    )
+
+
+def record_prices(conn: Connection, changes: Sequence[Tuple[int, float, Optional[Mapping[str, Any]]]],
+                  now: datetime) -> int:
+    """
+    Write a history row for each (property_id, new price, previous row or None) and update existing rows' aggregates
+
+    New listings (previous None) are expected to have been inserted with
+    next_price_stats(None, price, now) already.
+    """
+    if not changes:
+        return 0
+    conn.execute(insert(PriceHistory.__table__), [
+        {'property_id': property_id, 'price': price, 'date': now} for property_id, price, _ in changes
+    ])
+    updates = [
+        {'property_id': property_id,
+         **{f"new_{column}": value for column, value in next_price_stats(previous, price, now).items()}}
+        for property_id, price, previous in changes if previous is not None
+    ]
+    if updates:
+        conn.execute(_stats_update(), updates)
+    return len(changes)
+
+
+def _history_aggregates(property_ids: Optional[List[int]] = None):
+    """
+    Per property: first price and date, drop count and last drop date, over its history in date order
+    """
+    order = (PriceHistory.date, PriceHistory.id)
+    window = {'partition_by': PriceHistory.property_id, 'order_by': order}
+    steps = select(
+        PriceHistory.property_id,
+        PriceHistory.date,
+        PriceHistory.price,
+        func.lag(PriceHistory.price).over(**window).label('previous'),
+        func.first_value(PriceHistory.price).over(**window).label('first_price'),
+    )
+    if property_ids is not None:
+        steps = steps.where(PriceHistory.property_id.in_(property_ids))
+    steps = steps.subquery()
+    dropped = steps.c.price < steps.c.previous
+    return (
+        select(
+            steps.c.property_id,
+            func.min(steps.c.first_price).label('first_price'),
+            func.min(steps.c.date).label('first_price_at'),
+            func.sum(case((dropped, 1), else_=0)).label('drop_count'),
+            func.max(case((dropped, steps.c.date), else_=None)).label('last_drop_at'),
+        )
+        .group_by(steps.c.property_id)
+    )
+
+
+def _fill_price_stats(conn: Connection, prices: Mapping[int, Optional[float]]) -> int:
+    """
+    Set the aggregates of the properties in prices (id: current price) from their history
+    """
+    rows = conn.execute(_history_aggregates(list(prices))).mappings().all()
+    if rows:
+        conn.execute(_stats_update(), [
+            {'property_id': row['property_id'],
+             **{f"new_{column}": value for column, value in price_stats(
+                 prices[row['property_id']], row['first_price'], row['first_price_at'], row['drop_count'],
+                 row['last_drop_at']).items()}}
+            for row in rows
+        ])
+    return len(rows)
+
+
+def recompute_price_stats(conn: Connection, property_ids: Sequence[int]) -> int:
+    """
+    Rebuild the aggregates of property_ids from their history, e.g. after another row's history was moved to them
+    """
+    prices = dict(conn.execute(select(Property.id, Property.price).where(Property.id.in_(list(property_ids)))).all())
+    return _fill_price_stats(conn, prices) if prices else 0
+
+
+def backfill_price_stats(conn: Connection, batch_size: int = 5000) -> int:
+    """
+    Fill the aggregates of stored properties that have history but none yet; returns how many were filled
+
+    Runs with the schema step (database.init_db), where each call after the
+    first finds nothing to do.
+    """
+    missing = conn.execute(
+        select(Property.id, Property.price)
+        .where(Property.first_price.is_(None), Property.id.in_(select(PriceHistory.property_id)))
+    ).all()
+    filled = 0
+    for start in range(0, len(missing), batch_size):
+        filled += _fill_price_stats(conn, dict(missing[start:start + batch_size]))
+    if filled:
+        logger.info(f"Backfilled price-history aggregates for {filled} properties")
+    return filled
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from .coordination import SharedState, SharedTokenBucket
+
+# Default politeness settings per source host. Each host gets its own
+# concurrency cap and token bucket so one slow site never throttles the others.
+DEFAULT_MAX_CONCURRENCY_PER_HOST = int(os.getenv("SCRAPER_MAX_CONCURRENCY_PER_HOST", "4"))
+DEFAULT_RATE_PER_HOST = float(os.getenv("SCRAPER_RATE_PER_HOST", "2.0"))  # requests per second
+DEFAULT_BURST_PER_HOST = float(os.getenv("SCRAPER_BURST_PER_HOST", "4"))
+
+
+def _host_setting(host: str, name: str, default: float) -> float:
+    """
+    Read a per-host override such as SCRAPER_RATE_ZILLOW for www.zillow.com
+    """
+    parts = host.split('.')
+    label = parts[-2] if len(parts) >= 2 else host
+    value = os.getenv(f"SCRAPER_{name}_{label.upper()}")
+    return float(value) if value else default
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter allowing `rate` acquisitions per second with bursts up to `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    async def backoff(self, seconds: float):
+        """
+        Hold back the next token for at least `seconds`, e.g. after the host answers 429
+        """
+        self._refill()
+        self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class HostStats:
+    """
+    Request counters used to report per-host throughput
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.bytes = 0
+        self.busy_seconds = 0.0
+        self.in_flight = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = 0.0
+        if self.started_at is not None and self.finished_at is not None:
+            elapsed = self.finished_at - self.started_at
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'bytes': self.bytes,
+            'in_flight': self.in_flight,
+            'elapsed_seconds': round(elapsed, 3),
+            'requests_per_second': round(self.requests / elapsed, 3) if elapsed > 0 else 0.0,
+            'avg_latency_seconds': round(self.busy_seconds / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+class HostLimiter:
+    """
+    Bounded concurrency plus token-bucket pacing for a single host
+
+    With a SharedState the token bucket is shared by every process using it;
+    the concurrency cap stays per process.
+    """
+
+    def __init__(self, host: str, max_concurrency: int = None, rate: float = None, burst: float = None,
+                 shared: SharedState = None):
+        self.host = host
+        self.max_concurrency = int(max_concurrency or _host_setting(host, 'MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY_PER_HOST))
+        self.rate = rate or _host_setting(host, 'RATE', DEFAULT_RATE_PER_HOST)
+        self.burst = burst or _host_setting(host, 'BURST', DEFAULT_BURST_PER_HOST)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if shared is not None:
+            self.bucket = SharedTokenBucket(shared, host, self.rate, self.burst)
+        else:
+            self.bucket = TokenBucket(self.rate, self.burst)
+        self.stats = HostStats()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one of the host's concurrency slots for the duration of a request
+        """
+        async with self._semaphore:
+            await self.bucket.acquire()
+            start = time.monotonic()
+            if self.stats.started_at is None:
+                self.stats.started_at = start
+            self.stats.in_flight += 1
+            try:
+                yield self.stats
+            finally:
+                end = time.monotonic()
+                self.stats.in_flight -= 1
+                self.stats.requests += 1
+                self.stats.busy_seconds += end - start
+                self.stats.finished_at = end
+
+
+class HostLimiterRegistry:
+    """
+    Lazily creates one HostLimiter per host
+    """
+
+    def __init__(self, max_concurrency: int = None, rate: float = None, burst: float = None,
+                 shared: SharedState = None):
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.shared = shared
+        self._limiters: Dict[str, HostLimiter] = {}
+
+    def get(self, host: str) -> HostLimiter:
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = HostLimiter(host, self.max_concurrency, self.rate, self.burst, self.shared)
+            self._limiters[host] = limiter
+        return limiter
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {host: limiter.stats.to_dict() for host, limiter in self._limiters.items()}
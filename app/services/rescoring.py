@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..database import dialect_insert
+from ..models import Property, PropertyFeatures, ScoringConfig
+from .comps import CompsIndex
+from .scoring import DEFAULT_WEIGHTS, FEATURE_COLUMNS, SCORE_COLUMNS, ScoringWeights, feature_columns, score_features
+
+logger = logging.getLogger(__name__)
+
+# Scores are a pure function of the stored features and the weights, so new
+# weights are applied by one keyset walk over property_features, and what-if
+# sweeps score the whole table in memory without writing anything.
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "5000"))
+
+_BOOLEAN_FEATURES = ('below_assessed', 'absentee', 'pre_foreclosure')
+
+
+async def load_weights(db) -> ScoringWeights:
+    """
+    The active weights: the last set applied, else DEFAULT_WEIGHTS (db is a session or connection)
+    """
+    stored = await db.scalar(select(ScoringConfig.weights).where(ScoringConfig.key == 'active'))
+    if not stored:
+        return DEFAULT_WEIGHTS
+    # Ignore fields a later version no longer has
+    return DEFAULT_WEIGHTS.updated({k: v for k, v in json.loads(stored).items() if k in ScoringWeights._fields})
+
+
+async def _save_weights(conn, weights: ScoringWeights):
+    stmt = dialect_insert(conn, ScoringConfig.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['key'], set_={'weights': stmt.excluded.weights, 'applied_at': stmt.excluded.applied_at}
+    )
+    await conn.execute(stmt, {'key': 'active', 'weights': json.dumps(weights._asdict()), 'applied_at': datetime.utcnow()})
+
+
+def _feature_arrays(rows: Sequence[Tuple]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    (property ids, feature columns) from (property_id, *FEATURE_COLUMNS) rows
+    """
+    columns = list(zip(*rows)) if rows else [()] * (len(FEATURE_COLUMNS) + 1)
+    ids = np.asarray(columns[0], dtype=np.int64)
+    features = {}
+    for name, values in zip(FEATURE_COLUMNS, columns[1:]):
+        if name in _BOOLEAN_FEATURES:
+            features[name] = np.asarray([bool(v) for v in values], dtype=bool)
+        else:
+            features[name] = np.asarray([v or 0.0 for v in values], dtype=float)
+    return ids, features
+
+
+async def missing_features(engine: AsyncEngine) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    (property ids, feature columns) for stored properties that have no property_features row, computed but not stored
+
+    Rows scored before property_features existed get comps from the stored
+    listings in their ZIPs, and pre_foreclosure = False since it was never
+    stored.
+    """
+    stmt = (
+        select(Property.id, Property.address, Property.zip_code, Property.property_type, Property.price,
+               Property.square_feet, Property.days_on_market, Property.price_drops, Property.tax_assessed_value,
+               Property.owner_status)
+        .outerjoin(PropertyFeatures, PropertyFeatures.property_id == Property.id)
+        .where(PropertyFeatures.property_id.is_(None))
+    )
+    async with engine.connect() as conn:
+        rows = [dict(row) for row in (await conn.execute(stmt)).mappings()]
+        if not rows:
+            return _feature_arrays([])
+        comps = await CompsIndex.from_db(conn, list({row['zip_code'] for row in rows if row['zip_code']}))
+
+    columns = {
+        name: [row[name] if row[name] is not None else default for row in rows]
+        for name, default in (('price', 0), ('square_feet', 0), ('days_on_market', 0), ('price_drops', 0),
+                              ('tax_assessed_value', 0), ('owner_status', ''))
+    }
+    features = feature_columns(columns, comps.comp_stats(rows))
+    return np.asarray([row['id'] for row in rows], dtype=np.int64), features
+
+
+async def backfill_features(engine: AsyncEngine) -> int:
+    """
+    Store features for stored properties that have none (see missing_features); returns how many rows were added
+    """
+    ids, features = await missing_features(engine)
+    if not len(ids):
+        return 0
+    values = {name: features[name].tolist() for name in FEATURE_COLUMNS}
+    now = datetime.utcnow()
+    feature_rows = [
+        {'property_id': property_id, **{name: values[name][i] for name in FEATURE_COLUMNS}, 'updated_at': now}
+        for i, property_id in enumerate(ids.tolist())
+    ]
+    for start in range(0, len(feature_rows), RESCORE_BATCH_SIZE):
+        async with engine.begin() as conn:
+            stmt = dialect_insert(conn, PropertyFeatures.__table__).on_conflict_do_nothing(index_elements=['property_id'])
+            await conn.execute(stmt, feature_rows[start:start + RESCORE_BATCH_SIZE])
+    logger.info(f"Backfilled scoring features for {len(feature_rows)} properties")
+    return len(feature_rows)
+
+
+async def apply_weights(engine: AsyncEngine, weights: ScoringWeights, batch_size: int = None) -> Dict[str, Any]:
+    """
+    Make weights the active set and rescore every stored property from its features
+
+    The weights are saved first, so refreshes that start meanwhile already
+    score with them. Each batch of rows is read and updated in its own
+    transaction.
+    """
+    batch_size = batch_size or RESCORE_BATCH_SIZE
+    started = time.perf_counter()
+    backfilled = await backfill_features(engine)
+    async with engine.begin() as conn:
+        await _save_weights(conn, weights)
+
+    table = Property.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam('property_id'))
+        .values({name: bindparam(f"new_{name}") for name in SCORE_COLUMNS})
+    )
+    feature_select = select(PropertyFeatures.property_id, *[getattr(PropertyFeatures, name) for name in FEATURE_COLUMNS])
+    rescored, last_id = 0, None
+    while True:
+        async with engine.begin() as conn:
+            query = feature_select.order_by(PropertyFeatures.property_id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(PropertyFeatures.property_id > last_id)
+            rows = (await conn.execute(query)).all()
+            if not rows:
+                break
+            ids, features = _feature_arrays(rows)
+            scores = {name: values.tolist() for name, values in score_features(features, weights).items()}
+            await conn.execute(stmt, [
+                {'property_id': property_id, **{f"new_{name}": scores[name][i] for name in SCORE_COLUMNS}}
+                for i, property_id in enumerate(ids.tolist())
+            ])
+        rescored += len(rows)
+        last_id = int(ids[-1])
+
+    seconds = time.perf_counter() - started
+    logger.info(f"Applied scoring weights: {rescored} properties rescored in {seconds:.2f}s")
+    return {'weights': weights._asdict(), 'rescored': rescored, 'backfilled': backfilled, 'seconds': round(seconds, 3)}
+
+
+async def load_features(engine: AsyncEngine) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Every stored property's id and features, as columns
+    """
+    rows = []
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            select(PropertyFeatures.property_id, *[getattr(PropertyFeatures, name) for name in FEATURE_COLUMNS])
+        )
+        async for partition in result.partitions(10000):
+            rows.extend(partition)
+    return _feature_arrays(rows)
+
+
+def _ranking(ids: np.ndarray, scores: Dict[str, np.ndarray], top: int) -> np.ndarray:
+    # Best motivation score first, then best ROI, then lowest id, as row positions
+    return np.lexsort((ids, -scores['estimated_roi'], -scores['motivation_score']))[:top]
+
+
+def _summary(ids: np.ndarray, scores: Dict[str, np.ndarray], order: np.ndarray) -> Dict[str, Any]:
+    motivation = scores['motivation_score']
+    if not len(ids):
+        return {'motivation_score': None, 'estimated_roi_mean': None, 'top': []}
+    return {
+        'motivation_score': {
+            'mean': round(float(motivation.mean()), 3),
+            **{f"p{p}": round(float(np.percentile(motivation, p)), 3) for p in (50, 90, 99)},
+            **{f"at_least_{threshold}": int((motivation >= threshold).sum()) for threshold in (50, 75)},
+        },
+        'estimated_roi_mean': round(float(scores['estimated_roi'].mean()), 3),
+        'top': [
+            {'property_id': int(ids[i]), **{name: round(float(scores[name][i]), 3) for name in SCORE_COLUMNS}}
+            for i in order
+        ],
+    }
+
+
+async def sweep_weights(engine: AsyncEngine, weight_sets: Sequence[ScoringWeights], top: int = 20) -> Dict[str, Any]:
+    """
+    Score every stored property under each weight set, writing nothing
+
+    Features are read once and each set is a vectorized pass over them. Each
+    result has the score distribution, the top properties and how many of
+    them are also in the top under the active weights. Properties without
+    stored features are included with features computed in memory.
+    """
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        active = await load_weights(conn)
+    ids, features = await load_features(engine)
+    missing_ids, missing = await missing_features(engine)
+    if len(missing_ids):
+        ids = np.concatenate([ids, missing_ids])
+        features = {name: np.concatenate([features[name], missing[name].astype(features[name].dtype)])
+                    for name in FEATURE_COLUMNS}
+    active_order = _ranking(ids, score_features(features, active), top)
+    active_top = set(ids[active_order].tolist())
+
+    results: List[Dict[str, Any]] = []
+    for weights in weight_sets:
+        scores = score_features(features, weights)
+        order = _ranking(ids, scores, top)
+        results.append({
+            'weights': weights._asdict(),
+            **_summary(ids, scores, order),
+            'top_overlap_with_active': len(active_top & set(ids[order].tolist())),
+        })
+    return {
+        'properties': len(ids),
+        'active_weights': active._asdict(),
+        'results': results,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
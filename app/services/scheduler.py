@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..database import dialect_insert
+from ..models import TrackedZip
+from .ingest import refresh_listings
+from .jobs import JOB_TIMEOUT, ClaimedJob, JobQueue
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "2"))
+SCHEDULER_POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", "5"))
+SCHEDULER_REFRESH_INTERVAL = int(os.getenv("SCHEDULER_REFRESH_INTERVAL", "3600"))  # default per tracked ZIP
+# Stored-mode searches queue ZIPs whose last refresh is older than this
+SCHEDULER_STALE_AFTER = float(os.getenv("SCHEDULER_STALE_AFTER", str(SCHEDULER_REFRESH_INTERVAL)))
+
+PRIORITY_SCHEDULED = 0
+PRIORITY_ON_DEMAND = 10  # a user is waiting on a stored-mode search
+
+
+class RefreshScheduler:
+    """
+    Keeps tracked ZIPs fresh in the background through the persistent job queue
+
+    A ticker queues tracked ZIPs as they come due; workers claim jobs and run
+    the same scrape/score/persist path as a live search, so /search in stored
+    mode can answer straight from the database.
+    """
+
+    def __init__(self, scraper, engine: AsyncEngine, session_factory: Callable, queue: JobQueue = None,
+                 workers: int = None, poll_interval: float = None, job_timeout: float = None):
+        self.scraper = scraper
+        self.engine = engine
+        self.session_factory = session_factory
+        self.queue = queue or JobQueue(engine)
+        self.workers = workers or SCHEDULER_WORKERS
+        self.poll_interval = poll_interval or SCHEDULER_POLL_INTERVAL
+        self.job_timeout = job_timeout or JOB_TIMEOUT
+        self.running: Dict[int, ClaimedJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    async def start(self):
+        await self.queue.recover_stale(self.job_timeout)
+        self._tasks = [asyncio.create_task(self._ticker(), name='refresh-ticker')]
+        self._tasks += [asyncio.create_task(self._worker(), name=f'refresh-worker-{i}') for i in range(self.workers)]
+        return self
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def track(self, zip_codes: Sequence[str], interval_seconds: int = None, priority: int = PRIORITY_SCHEDULED):
+        """
+        Add ZIPs to the refresh schedule (or update their interval/priority); they are due immediately
+        """
+        now = datetime.utcnow()
+        rows = [
+            {'zip_code': zip_code, 'active': True, 'priority': priority,
+             'interval_seconds': interval_seconds or SCHEDULER_REFRESH_INTERVAL, 'next_refresh_at': now, 'created_at': now}
+            for zip_code in dict.fromkeys(zip_codes)
+        ]
+        if not rows:
+            return
+        async with self.engine.begin() as conn:
+            stmt = dialect_insert(conn, TrackedZip.__table__)
+            await conn.execute(stmt.on_conflict_do_update(
+                index_elements=['zip_code'],
+                set_={column: stmt.excluded[column] for column in ('active', 'priority', 'interval_seconds', 'next_refresh_at')}
+            ), rows)
+        self._wakeup.set()
+
+    async def untrack(self, zip_code: str) -> bool:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(TrackedZip).where(TrackedZip.zip_code == zip_code, TrackedZip.active.is_(True)).values(active=False)
+            )
+        return result.rowcount > 0
+
+    async def tracked(self) -> List[Dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(TrackedZip).where(TrackedZip.active.is_(True)).order_by(TrackedZip.zip_code)
+            )
+            return [dict(row) for row in result.mappings()]
+
+    async def request_refresh(self, zip_codes: Sequence[str], priority: int = PRIORITY_ON_DEMAND, max_age: float = None) -> List[str]:
+        """
+        Queue ZIPs not refreshed within max_age seconds; returns the ones that need a refresh
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=SCHEDULER_STALE_AFTER if max_age is None else max_age)
+        zip_codes = list(dict.fromkeys(zip_codes))
+        async with self.engine.connect() as conn:
+            fresh = set((await conn.scalars(
+                select(TrackedZip.zip_code)
+                .where(TrackedZip.zip_code.in_(zip_codes), TrackedZip.last_refreshed_at >= cutoff)
+            )).all())
+        stale = [zip_code for zip_code in zip_codes if zip_code not in fresh]
+        for zip_code in stale:
+            await self.queue.enqueue(zip_code, priority)
+        if stale:
+            self._wakeup.set()
+        return stale
+
+    async def enqueue_due(self) -> int:
+        """
+        Queue every tracked ZIP whose next refresh time has passed
+        """
+        now = datetime.utcnow()
+        async with self.engine.begin() as conn:
+            due = (await conn.execute(
+                select(TrackedZip.zip_code, TrackedZip.priority, TrackedZip.interval_seconds)
+                .where(TrackedZip.active.is_(True), TrackedZip.next_refresh_at <= now)
+            )).all()
+            for row in due:
+                interval = row.interval_seconds or SCHEDULER_REFRESH_INTERVAL
+                await conn.execute(
+                    update(TrackedZip).where(TrackedZip.zip_code == row.zip_code)
+                    .values(next_refresh_at=now + timedelta(seconds=interval))
+                )
+        queued = 0
+        for row in due:
+            queued += await self.queue.enqueue(row.zip_code, row.priority or PRIORITY_SCHEDULED)
+        if queued:
+            self._wakeup.set()
+        return queued
+
+    async def _mark_refreshed(self, zip_code: str):
+        now = datetime.utcnow()
+        async with self.engine.begin() as conn:
+            stmt = dialect_insert(conn, TrackedZip.__table__)
+            # On-demand ZIPs get an inactive row so their freshness is known too
+            await conn.execute(stmt.values(zip_code=zip_code, active=False, priority=0, last_refreshed_at=now, created_at=now)
+                               .on_conflict_do_update(index_elements=['zip_code'], set_={'last_refreshed_at': now}))
+
+    async def run_job(self, job: ClaimedJob):
+        self.running[job.id] = job
+        try:
+            async with self.session_factory() as db:
+                listings = await asyncio.wait_for(
+                    refresh_listings(self.scraper, db, self.engine, [job.zip_code]), self.job_timeout
+                )
+            # Every source failing looks like an empty ZIP; retry rather than record it as fresh
+            if not listings:
+                raise RuntimeError(f"No listings scraped for {job.zip_code}")
+        except asyncio.CancelledError:
+            await self.queue.release(job)
+            raise
+        except Exception as e:
+            logger.error(f"Refresh of {job.zip_code} failed (attempt {job.attempt}): {str(e)}")
+            await self.queue.fail(job, f"{type(e).__name__}: {e}")
+        else:
+            await self.queue.complete(job, len(listings))
+            await self._mark_refreshed(job.zip_code)
+        finally:
+            self.running.pop(job.id, None)
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self.queue.claim()
+            except Exception as e:
+                logger.error(f"Claiming a refresh job failed: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+
+    async def _ticker(self):
+        ticks = 0
+        while True:
+            try:
+                await self.enqueue_due()
+                # Housekeeping about once a minute
+                if ticks % max(1, int(60 / self.poll_interval)) == 0:
+                    await self.queue.recover_stale(self.job_timeout)
+                    await self.queue.purge()
+            except Exception as e:
+                logger.error(f"Refresh scheduling failed: {str(e)}")
+            ticks += 1
+            await asyncio.sleep(self.poll_interval)
+
+    async def status(self) -> Dict[str, Any]:
+        stats = await self.queue.stats()
+        stats['workers'] = self.workers
+        stats['in_progress'] = sorted(job.zip_code for job in self.running.values())
+        return stats
@@ -1,46 +1,166 @@
-from typing import Dict, Any
-import openai
+import json
+from typing import Dict, Any, List, Mapping, NamedTuple, Sequence, Tuple
+import numpy as np
+import os
 from datetime import datetime
+from .listings import Listing, ListingBatch
+
+SCORE_COLUMNS = ('motivation_score', 'suggested_offer', 'estimated_roi')
+
+class ScoringWeights(NamedTuple):
+    """
+    The points and constants behind the motivation score, suggested offer and ROI
+    """
+    long_listing_days: float = 90.0  # days on market beyond which a listing counts as stale
+    long_listing_points: float = 20.0
+    price_drop_points: float = 10.0  # per price drop, up to price_drop_max_points
+    price_drop_max_points: float = 20.0
+    below_assessed_points: float = 15.0  # listed below the tax assessed value
+    absentee_points: float = 25.0
+    pre_foreclosure_points: float = 30.0
+    max_score: float = 100.0
+    offer_ratio: float = 0.85  # offer as a share of comp value, or of list price without comps
+    resale_ratio: float = 1.3  # resale as a multiple of list price without comps
+    repair_cost_per_sqft: float = 20.0
+
+    def updated(self, changes: Mapping[str, float]) -> "ScoringWeights":
+        unknown = set(changes) - set(self._fields)
+        if unknown:
+            raise ValueError(f"Unknown scoring weights: {', '.join(sorted(unknown))}")
+        return self._replace(**{name: float(value) for name, value in changes.items()})
+
+# SCORING_WEIGHTS='{"absentee_points": 30}' changes the defaults; weights applied
+# through the API are stored and take precedence (see rescoring.py)
+DEFAULT_WEIGHTS = ScoringWeights().updated(json.loads(os.getenv("SCORING_WEIGHTS") or "{}"))
+
+# The per-listing signals scores are computed from, stored in property_features
+# so new weights can be applied without re-scraping or recomputing comps
+FEATURE_COLUMNS = (
+    'price', 'square_feet', 'days_on_market', 'price_drops', 'below_assessed', 'absentee', 'pre_foreclosure',
+    'comp_count', 'comp_ppsf_sum', 'comp_price_sum',
+)
+
+def feature_columns(batch: Mapping[str, Sequence], comp_stats: Mapping[str, Sequence] = None) -> Dict[str, np.ndarray]:
+    """
+    FEATURE_COLUMNS for a columnar batch of listings (a DataFrame or a mapping of column name to array)
+
+    comp_stats, when given, holds per-row comp_count, comp_ppsf_sum and
+    comp_price_sum (see comp_stats_from_lists).
+    """
+    n = len(next(iter(batch.values()))) if isinstance(batch, dict) else len(batch)
+
+    def column(name, default, dtype=float):
+        if name not in batch:
+            return np.full(n, default, dtype=dtype)
+        values = np.asarray(batch[name], dtype=dtype)
+        if dtype is float:
+            # None (NaN here) counts as the default, as in the scalar methods
+            missing = np.isnan(values)
+            if missing.any():
+                values = np.where(missing, default, values)
+        return values
+
+    price = column('price', 0.0)
+    owner_status = column('owner_status', '', dtype=object)
+    if comp_stats is not None:
+        comps = {name: np.asarray(comp_stats[name], dtype=float) for name in ('comp_count', 'comp_ppsf_sum', 'comp_price_sum')}
+    else:
+        comps = {name: np.zeros(n) for name in ('comp_count', 'comp_ppsf_sum', 'comp_price_sum')}
+    return {
+        'price': price,
+        'square_feet': column('square_feet', 0.0),
+        'days_on_market': column('days_on_market', 0.0),
+        'price_drops': column('price_drops', 0.0),
+        'below_assessed': price < column('tax_assessed_value', 0.0),
+        'absentee': np.fromiter((str(status).lower() == 'absentee' for status in owner_status), dtype=bool, count=n),
+        'pre_foreclosure': column('pre_foreclosure', False, dtype=object).astype(bool),
+        **comps,
+    }
+
+def score_features(features: Mapping[str, np.ndarray], weights: ScoringWeights = DEFAULT_WEIGHTS) -> Dict[str, np.ndarray]:
+    """
+    Motivation score, suggested offer and ROI from feature columns; matches the scalar methods exactly
+    """
+    w = weights
+    price = features['price']
+    square_feet = features['square_feet']
+    price_drops = features['price_drops']
+
+    # Motivation score; terms are added in the same order as the scalar version
+    score = np.zeros(len(price))
+    score += np.where(features['days_on_market'] > w.long_listing_days, w.long_listing_points, 0.0)
+    score += np.where(price_drops > 0, np.minimum(w.price_drop_max_points, price_drops * w.price_drop_points), 0.0)
+    score += np.where(features['below_assessed'], w.below_assessed_points, 0.0)
+    score += np.where(features['absentee'], w.absentee_points, 0.0)
+    score += np.where(features['pre_foreclosure'], w.pre_foreclosure_points, 0.0)
+    score = np.minimum(w.max_score, score)
+
+    # Suggested offer and resale price, from comps where available
+    comp_count = features['comp_count']
+    has_comps = comp_count > 0
+    safe_count = np.where(has_comps, comp_count, 1.0)
+
+    offer = np.where(has_comps, features['comp_ppsf_sum'] / safe_count * w.offer_ratio * square_feet, price * w.offer_ratio)
+    resale = np.where(has_comps, features['comp_price_sum'] / safe_count, price * w.resale_ratio)
+
+    total_investment = offer + square_feet * w.repair_cost_per_sqft
+    nonzero = total_investment != 0
+    roi = np.where(nonzero, (resale - total_investment) / np.where(nonzero, total_investment, 1.0) * 100, 0.0)
+
+    return {
+        'motivation_score': score,
+        'suggested_offer': offer,
+        'estimated_roi': roi,
+    }
+
+def _value(data: Mapping[str, Any], name: str, default: Any) -> Any:
+    """
+    data[name], or default when it is missing or None
+    """
+    value = data.get(name)
+    return default if value is None else value
 
 class PropertyScorer:
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, weights: ScoringWeights = None):
+        # Passed per call rather than set on the openai module, which every request would share
         self.openai_api_key = openai_api_key
-        openai.api_key = openai_api_key
+        self.weights = weights or DEFAULT_WEIGHTS
 
     def calculate_motivation_score(self, property_data: Dict[Any, Any]) -> float:
         """
         Calculate motivation score based on property attributes
         """
+        w = self.weights
         score = 0.0
         
         # Days on market scoring
-        if property_data.get('days_on_market', 0) > 90:
-            score += 20.0
+        if _value(property_data, 'days_on_market', 0) > w.long_listing_days:
+            score += w.long_listing_points
             
         # Price drops scoring
-        if property_data.get('price_drops', 0) > 0:
-            score += min(20.0, property_data['price_drops'] * 10.0)
+        if _value(property_data, 'price_drops', 0) > 0:
+            score += min(w.price_drop_max_points, property_data['price_drops'] * w.price_drop_points)
             
         # Below assessed value scoring
-        if property_data.get('price', 0) < property_data.get('tax_assessed_value', 0):
-            score += 15.0
+        if _value(property_data, 'price', 0) < _value(property_data, 'tax_assessed_value', 0):
+            score += w.below_assessed_points
             
         # Absentee owner scoring
-        if property_data.get('owner_status', '').lower() == 'absentee':
-            score += 25.0
+        if str(_value(property_data, 'owner_status', '')).lower() == 'absentee':
+            score += w.absentee_points
             
         # Pre-foreclosure scoring
-        if property_data.get('pre_foreclosure', False):
-            score += 30.0
+        if _value(property_data, 'pre_foreclosure', False):
+            score += w.pre_foreclosure_points
             
-        return min(100.0, score)
+        return min(w.max_score, score)
 
     def calculate_suggested_offer(self, property_data: Dict[Any, Any], comps: list) -> float:
         """
         Calculate suggested offer based on comps
         """
         if not comps:
-            return property_data.get('price', 0) * 0.85  # Default to 85% of listing price
+            return _value(property_data, 'price', 0) * self.weights.offer_ratio  # Default to a share (85%) of listing price
             
         # Calculate average price per sqft from comps
         total_price_per_sqft = 0
@@ -51,10 +171,10 @@ class PropertyScorer:
                 
         avg_price_per_sqft = total_price_per_sqft / len(comps)
         
-        # Apply 15% discount
-        discounted_price_per_sqft = avg_price_per_sqft * 0.85
+        # Apply the offer discount (15%)
+        discounted_price_per_sqft = avg_price_per_sqft * self.weights.offer_ratio
         
-        return discounted_price_per_sqft * property_data.get('square_feet', 0)
+        return discounted_price_per_sqft * _value(property_data, 'square_feet', 0)
 
     def estimate_roi(self, property_data: Dict[Any, Any], comps: list) -> float:
         """
@@ -63,42 +183,107 @@ class PropertyScorer:
         offer_price = self.calculate_suggested_offer(property_data, comps)
         
         # Estimate repair costs (simplified version)
-        estimated_repairs = property_data.get('square_feet', 0) * 20  # $20 per sqft
+        estimated_repairs = _value(property_data, 'square_feet', 0) * self.weights.repair_cost_per_sqft  # $20 per sqft by default
         
         # Estimate resale price (average of comps)
         if comps:
             resale_price = sum(comp.get('price', 0) for comp in comps) / len(comps)
         else:
-            resale_price = property_data.get('price', 0) * 1.3  # 30% markup
+            resale_price = _value(property_data, 'price', 0) * self.weights.resale_ratio  # 30% markup by default
             
         # Calculate ROI
         total_investment = offer_price + estimated_repairs
+        if total_investment == 0:
+            return 0.0
         roi = (resale_price - total_investment) / total_investment * 100
         
         return roi
 
+    def score_batch(self, batch: Mapping[str, Sequence], comp_stats: Mapping[str, Sequence] = None) -> Dict[str, np.ndarray]:
+        """
+        Vectorized motivation score, suggested offer and ROI over a columnar batch
+
+        batch is a DataFrame or a mapping of column name to array. comp_stats, when
+        given, holds per-row comp_count, comp_ppsf_sum and comp_price_sum (see
+        comp_stats_from_lists). Results match the scalar methods exactly.
+        """
+        return score_features(feature_columns(batch, comp_stats), self.weights)
+
     async def generate_outreach_message(self, property_data: Dict[Any, Any]) -> str:
         """
         Generate AI-powered outreach message for the property
+
+        One uncached call; bulk and repeated generation should go through
+        outreach.OutreachGenerator.
         """
-        prompt = f"""
-        Generate a professional and empathetic outreach message for a property owner.
-        
-        Property Details:
-        - Address: {property_data.get('address')}
-        - Days on Market: {property_data.get('days_on_market')}
-        - Current Price: ${property_data.get('price'):,.2f}
-        - Price Drops: {property_data.get('price_drops')}
-        
-        The message should be friendly, professional, and highlight our ability to provide a quick, cash transaction.
-        """
-        
-        response = await openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a professional real estate investor crafting an outreach message."},
-                {"role": "user", "content": prompt}
-            ]
+        # Imported here so scoring worker processes do not load the database layer or openai
+        import openai
+        from .outreach import OUTREACH_MODEL, OUTREACH_TIMEOUT, outreach_prompt
+
+        response = await openai.ChatCompletion.acreate(
+            model=OUTREACH_MODEL,
+            messages=outreach_prompt(property_data),
+            api_key=self.openai_api_key,
+            request_timeout=OUTREACH_TIMEOUT,
         )
         
         return response.choices[0].message.content
+
+def comp_stats_from_lists(comps_per_row: Sequence[list]) -> Dict[str, np.ndarray]:
+    """
+    Reduce per-row comp lists to the sums score_batch needs, accumulated like the scalar methods
+    """
+    count = np.zeros(len(comps_per_row))
+    ppsf_sum = np.zeros(len(comps_per_row))
+    price_sum = np.zeros(len(comps_per_row))
+    for i, comps in enumerate(comps_per_row):
+        if not comps:
+            continue
+        total_price_per_sqft = 0
+        for comp in comps:
+            if comp.get('square_feet', 0) > 0:
+                total_price_per_sqft += comp.get('price', 0) / comp.get('square_feet', 1)
+        count[i] = len(comps)
+        ppsf_sum[i] = total_price_per_sqft
+        price_sum[i] = sum(comp.get('price', 0) for comp in comps)
+    return {'comp_count': count, 'comp_ppsf_sum': ppsf_sum, 'comp_price_sum': price_sum}
+
+# Listing fields score_batch reads, with the value used when a listing lacks one
+SCORE_INPUTS = (
+    ('price', 0), ('square_feet', 0), ('days_on_market', 0), ('price_drops', 0),
+    ('tax_assessed_value', 0), ('owner_status', ''), ('pre_foreclosure', False),
+)
+
+def _input_columns(batch: ListingBatch) -> Dict[str, Sequence]:
+    return {name: batch.column(name, default) for name, default in SCORE_INPUTS}
+
+def score_listing_batch(batch: ListingBatch, comp_stats: Mapping[str, Sequence] = None,
+                        weights: ScoringWeights = None) -> List[Tuple[float, float, float]]:
+    """
+    (motivation_score, suggested_offer, estimated_roi) for each row of a ListingBatch
+    """
+    # Module-level so batches can be scored in the CPU executor's worker processes
+    scores = PropertyScorer(os.getenv('OPENAI_API_KEY'), weights).score_batch(_input_columns(batch), comp_stats)
+    return list(zip(*(scores[name].tolist() for name in SCORE_COLUMNS)))
+
+def listing_features(listings: Sequence[Listing], comp_stats: Mapping[str, Sequence] = None) -> Dict[str, np.ndarray]:
+    """
+    FEATURE_COLUMNS for listings, to store alongside their scores
+    """
+    return feature_columns(_input_columns(ListingBatch.from_listings(listings, [name for name, _ in SCORE_INPUTS])), comp_stats)
+
+def apply_scores(properties: Sequence[Listing], scores: Sequence[Tuple[float, float, float]]):
+    for property, values in zip(properties, scores):
+        for name, value in zip(SCORE_COLUMNS, values):
+            setattr(property, name, value)
+
+def score_properties(properties: List[Listing], comp_stats: Mapping[str, Sequence] = None,
+                     weights: ScoringWeights = None) -> List[Listing]:
+    """
+    Add motivation score, suggested offer and ROI to a batch of properties
+    """
+    if not properties:
+        return properties
+    batch = ListingBatch.from_listings(properties, [name for name, _ in SCORE_INPUTS])
+    apply_scores(properties, score_listing_batch(batch, comp_stats, weights))
+    return properties
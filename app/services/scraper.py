@@ -1,256 +1,430 @@
 import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, NamedTuple, Optional, Sequence, Tuple
 import logging
-import json
-import re
+import os
+import time
 from datetime import datetime, timedelta
-import random
+from urllib.parse import urlparse
+from .rate_limiter import HostLimiterRegistry
+from .cache import PageCache, create_page_cache
+from .coordination import create_shared_state
+from .executor import run_cpu
+from . import metrics
+from .sources import SourceAdapter, SourceMonitor, enabled_sources
+from .addresses import AddressIndex
+from .changes import PageState, SnapshotStore, page_hash, combined_hash, add_fingerprints
+from .listings import PARSED_FIELDS, Listing, parsed_values
+
+if TYPE_CHECKING:
+    from fake_useragent import UserAgent
 
 logger = logging.getLogger(__name__)
 
+# Connection pool tuning for the shared scraper session
+HTTP_POOL_LIMIT = int(os.getenv("SCRAPER_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("SCRAPER_POOL_LIMIT_PER_HOST", "8"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("SCRAPER_KEEPALIVE_TIMEOUT", "60"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("SCRAPER_DNS_CACHE_TTL", "300"))
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Connection': 'keep-alive',
+    'DNT': '1',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Bump when _merge_property_data changes so stored merge output is not reused
+MERGE_VERSION = 'address-v1'
+
+class FetchedPage(NamedTuple):
+    html: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
+
+class PageResult(NamedTuple):
+    listings: List[Listing]
+    content_hash: Optional[str] = None  # None when the page could not be fetched
+    state: Optional[PageState] = None  # new state to save, if anything about the page changed
+
+_user_agent = None
+
+def get_user_agent() -> "UserAgent":
+    """
+    Return the process-wide UserAgent, importing it and loading its data file on first use
+    """
+    global _user_agent
+    if _user_agent is None:
+        from fake_useragent import UserAgent
+        _user_agent = UserAgent()
+    return _user_agent
+
+def create_session() -> aiohttp.ClientSession:
+    """
+    Create a ClientSession with a pooled, keep-alive connector and DNS cache
+    """
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+    )
+    return aiohttp.ClientSession(headers=DEFAULT_HEADERS, connector=connector)
+
 class PropertyScraper:
-    def __init__(self):
-        self.user_agent = UserAgent()
-        self.session = None
-        self.headers = {
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-            'DNT': '1',
-            'Upgrade-Insecure-Requests': '1',
+    def __init__(self, session: aiohttp.ClientSession = None, max_concurrency_per_host: int = None, rate_per_host: float = None, cache: PageCache = None, snapshots: SnapshotStore = None, sources: Sequence[SourceAdapter] = None):
+        # Rate limits, in-flight fetches and the page cache shared with other
+        # worker processes when SCRAPER_COORDINATION=sqlite
+        self.shared = create_shared_state()
+        self._owns_cache = cache is None
+        self.cache = cache if cache is not None else create_page_cache(self.shared)
+        self.session = session
+        # Sessions passed in are shared (e.g. app-lifespan managed) and closed by their owner
+        self._owns_session = session is None
+        self.limiters = HostLimiterRegistry(max_concurrency=max_concurrency_per_host, rate=rate_per_host,
+                                            shared=self.shared)
+        self.headers = DEFAULT_HEADERS
+        # With a snapshot store, unchanged pages and ZIPs reuse their last parse/merge
+        self.snapshots = snapshots
+        self.change_stats = {'pages_not_modified': 0, 'pages_unchanged': 0, 'pages_parsed': 0, 'merges_skipped': 0}
+        # Enabled source adapters in merge order, each with its own circuit breaker and health stats
+        self.monitors: Dict[str, SourceMonitor] = {
+            adapter.name: SourceMonitor(adapter) for adapter in (sources if sources is not None else enabled_sources())
         }
 
-    async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers=self.headers)
+    async def start(self):
+        if self.session is None:
+            self.session = create_session()
         return self
 
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+    async def close(self):
+        if self.session and self._owns_session:
             await self.session.close()
+            self.session = None
+        if self._owns_cache and hasattr(self.cache.backend, 'close'):
+            self.cache.backend.close()
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+    async def __aenter__(self):
+        return await self.start()
 
-    def _rotate_user_agent(self):
-        self.session.headers.update({'User-Agent': self.user_agent.random})
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _rotate_user_agent(self) -> Dict[str, str]:
+        # Per-request header so concurrent searches sharing a session don't race
+        return {'User-Agent': get_user_agent().random}
 
-    async def _fetch_with_retry(self, url: str, max_retries: int = 3) -> str:
+    async def _fetch_with_retry(self, url: str, max_retries: int = 3, source: str = None) -> str:
+        return (await self._fetch_response(url, max_retries, source=source)).html
+
+    async def _fetch_response(self, url: str, max_retries: int = 3, validators: Dict[str, str] = None, source: str = None) -> FetchedPage:
+        limiter = self.limiters.get(urlparse(url).netloc)
+        monitor = self.monitors.get(source)
+        timeout = monitor.adapter.timeout if monitor else 30
+        label = source or ''
         for attempt in range(max_retries):
             try:
-                self._rotate_user_agent()
-                async with self.session.get(url, timeout=30) as response:
-                    if response.status == 200:
-                        return await response.text()
-                    elif response.status == 429:  # Too Many Requests
-                        wait_time = 2 ** attempt
-                        await asyncio.sleep(wait_time)
-                        continue
-                    else:
-                        logger.error(f"Failed to fetch {url}, status: {response.status}")
-                        return None
+                queued = time.perf_counter()
+                # Only the request itself holds a host slot; backoff sleeps happen outside it
+                async with limiter.slot() as stats:
+                    metrics.STAGE_SECONDS.observe(time.perf_counter() - queued, 'fetch_wait', label)
+                    if monitor is not None and monitor.breaker.state == 'open':
+                        # Other requests tripped the breaker while this one waited or backed off
+                        return FetchedPage(None)
+                    headers = self._rotate_user_agent()
+                    if validators:
+                        headers.update(validators)
+                    with metrics.track('fetch', label):
+                        async with self.session.get(url, headers=headers, timeout=timeout) as response:
+                            status = response.status
+                            if status == 200:
+                                body = await response.text()
+                                stats.bytes += len(body)
+                                metrics.PAGE_BYTES.observe(len(body), label)
+                                self._record_outcome(monitor, None)
+                                return FetchedPage(body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                            if status == 304 and validators:
+                                self._record_outcome(monitor, None)
+                                return FetchedPage(None, not_modified=True)
+                            if status == 429:  # Too Many Requests
+                                stats.throttled += 1
+                                metrics.FETCH_THROTTLED.inc(label)
+                            else:
+                                stats.errors += 1
+                                metrics.FETCH_ERRORS.inc(label, str(status))
+                if status in (403, 429) or status >= 500:
+                    # Blocked, throttled or down: counts towards opening the source's breaker
+                    self._record_outcome(monitor, f"HTTP {status}")
+                if status != 429:
+                    logger.error(f"Failed to fetch {url}, status: {status}")
+                    return FetchedPage(None)
+                metrics.FETCH_RETRIES.inc(label)
+                # Slow the whole host down, not just this request (every worker, with shared state)
+                await limiter.bucket.backoff(2 ** attempt)
+                await asyncio.sleep(2 ** attempt)
             except Exception as e:
-                logger.error(f"Error fetching {url}: {str(e)}")
+                limiter.stats.errors += 1
+                metrics.FETCH_ERRORS.inc(label, type(e).__name__)
+                self._record_outcome(monitor, repr(e))
+                logger.error(f"Error fetching {url}: {repr(e)}")
                 if attempt == max_retries - 1:
-                    return None
+                    return FetchedPage(None)
+                metrics.FETCH_RETRIES.inc(label)
                 await asyncio.sleep(2 ** attempt)
+        return FetchedPage(None)
+
+    @staticmethod
+    def _record_outcome(monitor: Optional[SourceMonitor], error: Optional[str]):
+        if monitor is None:
+            return
+        if error is None:
+            monitor.breaker.record_success()
+        else:
+            monitor.last_error = error
+            monitor.breaker.record_failure()
 
-    async def scrape_zillow(self, zip_code: str) -> List[Dict[Any, Any]]:
+    async def _fetch_page(self, source: str, zip_code: str, url: str, trial: bool = False) -> str:
         """
-        Scrape property data from Zillow
+        Fetch a listing page through the page cache, keyed by (source, zip)
+
+        A circuit breaker's trial request skips the cache lookup: a cached page
+        would neither close the breaker nor reopen it.
         """
-        properties = []
-        url = f"https://www.zillow.com/homes/{zip_code}_rb/"
-        html = await self._fetch_with_retry(url)
-        
-        if not html:
-            return properties
+        lookup = self.cache.refresh if trial else self.cache.get_or_fetch
+        return await lookup(f"{source}:{zip_code}", lambda: self._fetch_with_retry(url, source=source))
 
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            script_tags = soup.find_all('script', type='application/json')
-            
-            for script in script_tags:
-                if 'searchPageState' in script.string:
-                    data = json.loads(script.string)
-                    if 'cat1' in data and 'searchResults' in data['cat1']:
-                        for property in data['cat1']['searchResults']['listResults']:
-                            try:
-                                price_history = property.get('priceHistory', [])
-                                price_drops = sum(1 for ph in price_history if ph['event'] == 'Price reduction')
-                                
-                                prop_data = {
-                                    'address': property['address'],
-                                    'zip_code': zip_code,
-                                    'price': property['price'],
-                                    'square_feet': property.get('livingArea', 0),
-                                    'days_on_market': property.get('daysOnZillow', 0),
-                                    'price_drops': price_drops,
-                                    'property_type': property.get('homeType', '').lower(),
-                                    'listing_agent': property.get('brokerName', ''),
-                                    'tax_assessed_value': property.get('taxAssessedValue', 0),
-                                    'owner_status': 'absentee' if property.get('isNonOwnerOccupied') else 'owner-occupied',
-                                    'pre_foreclosure': property.get('isPreforeclosureAuction', False),
-                                }
-                                properties.append(prop_data)
-                            except Exception as e:
-                                logger.error(f"Error parsing property data: {str(e)}")
-                                continue
-                    break
-        except Exception as e:
-            logger.error(f"Error scraping Zillow: {str(e)}")
-        
-        return properties
+    async def _fetch_page_conditional(self, source: str, zip_code: str, url: str, previous: Optional[PageState],
+                                      trial: bool = False) -> FetchedPage:
+        """
+        Like _fetch_page, but revalidates with the previous ETag/Last-Modified and keeps the new ones
+        """
+        validators = previous.validators() if previous else {}
+        lookup = self.cache.refresh if trial else self.cache.get_or_fetch
+        page = await lookup(
+            f"{source}:{zip_code}",
+            lambda: self._fetch_response(url, validators=validators, source=source),
+            store=lambda fetched: fetched.html
+        )
+        return FetchedPage(page) if isinstance(page, str) else page
 
-    async def scrape_redfin(self, zip_code: str) -> List[Dict[Any, Any]]:
+    async def _scrape_page(self, source: str, zip_code: str, previous: Optional[PageState] = None) -> PageResult:
         """
-        Scrape property data from Redfin
+        Fetch and parse one (source, zip) page, reusing previous' listings when the page is unchanged
+
+        A source whose circuit breaker is open is skipped without a request.
         """
-        properties = []
-        url = f"https://www.redfin.com/zipcode/{zip_code}"
-        html = await self._fetch_with_retry(url)
-        
-        if not html:
-            return properties
+        monitor = self.monitors[source]
+        if not monitor.breaker.allow():
+            monitor.skipped += 1
+            return PageResult([])
+        start = time.perf_counter()
+        trial = monitor.breaker.state == 'half_open'
+        result = await self._fetch_and_parse(monitor.adapter, zip_code, previous, trial)
+        monitor.record_page(time.perf_counter() - start, ok=result is not None)
+        return result if result is not None else PageResult([])
 
+    async def _fetch_and_parse(self, adapter: SourceAdapter, zip_code: str, previous: Optional[PageState],
+                               trial: bool = False) -> Optional[PageResult]:
+        """
+        _scrape_page without the breaker; None when the page could not be fetched
+
+        trial marks the breaker's half-open trial, which has to reach the source.
+        """
+        source = adapter.name
+        url = adapter.url(zip_code)
+        if self.snapshots is None:
+            html = await self._fetch_page(source, zip_code, url, trial)
+            if not html:
+                return None
+            return PageResult(await self._parse(adapter, html, zip_code))
+
+        page = await self._fetch_page_conditional(source, zip_code, url, previous, trial)
+        if page.not_modified and previous is not None:
+            self.change_stats['pages_not_modified'] += 1
+            return PageResult(previous.listings, previous.content_hash)
+        if not page.html:
+            return None
+
+        content_hash = page_hash(page.html)
+        etag = page.etag or (previous.etag if previous else None)
+        last_modified = page.last_modified or (previous.last_modified if previous else None)
+        if previous is not None and previous.content_hash == content_hash:
+            self.change_stats['pages_unchanged'] += 1
+            state = None
+            if (etag, last_modified) != (previous.etag, previous.last_modified):
+                state = previous._replace(etag=etag, last_modified=last_modified)
+            return PageResult(previous.listings, content_hash, state)
+
+        self.change_stats['pages_parsed'] += 1
+        listings = await self._parse(adapter, page.html, zip_code)
+        return PageResult(listings, content_hash, PageState(content_hash, listings, etag, last_modified))
+
+    async def _parse(self, adapter: SourceAdapter, html: str, zip_code: str) -> List[Listing]:
+        """
+        Run the source's parser on the CPU executor, counting pages it fails on
+        """
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            script_tags = soup.find_all('script')
-            
-            for script in script_tags:
-                if script.string and 'RF.reactBootstrap' in script.string:
-                    data_match = re.search(r'JSONData: ({.*})', script.string)
-                    if data_match:
-                        data = json.loads(data_match.group(1))
-                        if 'homes' in data:
-                            for property in data['homes']:
-                                try:
-                                    prop_data = {
-                                        'address': property['address'],
-                                        'zip_code': zip_code,
-                                        'price': property['price'],
-                                        'square_feet': property.get('sqFt', 0),
-                                        'days_on_market': property.get('daysOnMarket', 0),
-                                        'price_drops': property.get('priceDrops', 0),
-                                        'property_type': property.get('propertyType', '').lower(),
-                                        'listing_agent': property.get('listingAgent', ''),
-                                        'tax_assessed_value': property.get('taxAssessedValue', 0),
-                                        'owner_status': 'unknown',
-                                        'pre_foreclosure': False,
-                                    }
-                                    properties.append(prop_data)
-                                except Exception as e:
-                                    logger.error(f"Error parsing Redfin property data: {str(e)}")
-                                    continue
-                    break
+            with metrics.track('parse', adapter.name):
+                listings = await run_cpu(adapter.parser, html, zip_code)
         except Exception as e:
-            logger.error(f"Error scraping Redfin: {str(e)}")
-        
-        return properties
+            metrics.PARSE_FAILURES.inc(adapter.name, type(e).__name__)
+            raise
+        if not listings:
+            # Parsers log and skip what they cannot read, so a page with no listings is the visible symptom
+            metrics.PARSE_FAILURES.inc(adapter.name, 'empty')
+        return listings
 
-    async def scrape_realtor(self, zip_code: str) -> List[Dict[Any, Any]]:
+    async def scrape_source(self, source: str, zip_code: str) -> List[Listing]:
         """
-        Scrape property data from Realtor.com
+        Scrape property data for one ZIP from one source
         """
-        properties = []
-        url = f"https://www.realtor.com/realestateandhomes-search/{zip_code}"
-        html = await self._fetch_with_retry(url)
-        
-        if not html:
-            return properties
+        return (await self._scrape_page(source, zip_code)).listings
 
+    @metrics.timed('merge')
+    def _merge_property_data(self, properties: List[Listing], sources: Sequence[str] = None) -> List[Listing]:
+        """
+        Merge and deduplicate property data from different sources
+
+        Listings are matched within their ZIP code on a normalized address
+        (see addresses.AddressIndex), so "St"/"Street", "Apt 4B"/"#4B" and a
+        missing state or ZIP do not split a property. The first listing seen
+        keeps its address; each merged listing records its sources under
+        provenance. Merged listings are copies, so the input is left as it was.
+        """
+        index = AddressIndex()
+        merged: List[Listing] = []
+
+        for i, prop in enumerate(properties):
+            position, match = index.assign(prop.zip_code, prop.address, len(merged))
+            entry = {'source': sources[i] if sources else None, 'address': prop.address, 'match': match}
+            if match == 'new':
+                prop = prop.copy()
+                prop.provenance = [entry]
+                merged.append(prop)
+                continue
+
+            target = merged[position]
+            target.provenance.append(entry)
+            # Update with more complete information
+            for field, value, current in zip(PARSED_FIELDS, parsed_values(prop), parsed_values(target)):
+                if value and not current:
+                    setattr(target, field, value)
+
+            # Use the lower price if available
+            if prop.price < target.price:
+                target.price = prop.price
+
+            # Use the higher days on market if available
+            if prop.days_on_market > target.days_on_market:
+                target.days_on_market = prop.days_on_market
+
+            # Combine price drops
+            target.price_drops = max(target.price_drops, prop.price_drops)
+
+        return merged
+
+    def sources(self) -> List[str]:
+        return list(self.monitors)
+
+    def source_health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-source circuit breaker state, page success rate and latency
+        """
+        return {name: monitor.report() for name, monitor in self.monitors.items()}
+
+    def host_throughput(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-host request counts, throughput and latency since this scraper was created
+        """
+        return self.limiters.report()
+
+    async def load_previous(self, zip_codes: List[str]) -> Dict[str, PageState]:
+        """
+        Last known page and merge states for zip_codes (empty without a snapshot store)
+        """
+        if self.snapshots is None:
+            return {}
+        keys = [f"{source}:{zip_code}" for zip_code in zip_codes for source in self.monitors]
+        return await self.snapshots.load(keys + [f"merged:{zip_code}" for zip_code in zip_codes])
+
+    async def iter_pages(self, zip_codes: List[str], previous: Dict[str, PageState]) -> AsyncIterator[Tuple[str, str, PageResult]]:
+        """
+        Yield (zip_code, source, PageResult) for every page as soon as it finishes
+        """
+        # Fan out every (zip, source) job at once; the per-host limiters in
+        # _fetch_with_retry bound concurrency and pace requests to each site.
+        pending = {
+            asyncio.ensure_future(self._scrape_page(source, zip_code, previous.get(f"{source}:{zip_code}"))): (zip_code, source)
+            for zip_code in zip_codes for source in self.monitors
+        }
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            script_tags = soup.find_all('script', type='application/json')
-            
-            for script in script_tags:
-                if script.string and '"props":' in script.string:
-                    data = json.loads(script.string)
-                    if 'props' in data and 'pageProps' in data['props']:
-                        properties_data = data['props']['pageProps'].get('properties', [])
-                        for property in properties_data:
-                            try:
-                                prop_data = {
-                                    'address': property['location']['address']['line'] + ', ' + property['location']['address']['city'],
-                                    'zip_code': zip_code,
-                                    'price': property['list_price'],
-                                    'square_feet': property.get('description', {}).get('sqft', 0),
-                                    'days_on_market': property.get('list_date_days', 0),
-                                    'price_drops': len(property.get('price_history', [])) - 1,
-                                    'property_type': property.get('type', '').lower(),
-                                    'listing_agent': property.get('listing', {}).get('agent', {}).get('name', ''),
-                                    'tax_assessed_value': property.get('tax_history', [{}])[0].get('assessment', {}).get('total', 0),
-                                    'owner_status': 'unknown',
-                                    'pre_foreclosure': property.get('flags', {}).get('is_foreclosure', False),
-                                }
-                                properties.append(prop_data)
-                            except Exception as e:
-                                logger.error(f"Error parsing Realtor.com property data: {str(e)}")
-                                continue
-                    break
-        except Exception as e:
-            logger.error(f"Error scraping Realtor.com: {str(e)}")
-        
-        return properties
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    zip_code, source = pending.pop(task)
+                    if task.exception() is not None:
+                        logger.error(f"Error during scraping: {str(task.exception())}")
+                        yield zip_code, source, PageResult([])
+                    else:
+                        yield zip_code, source, task.result()
+        finally:
+            # The consumer stopped early (e.g. a client disconnected mid-stream)
+            for task in pending:
+                task.cancel()
 
-    def _merge_property_data(self, properties: List[Dict[Any, Any]]) -> List[Dict[Any, Any]]:
+    async def finish_pages(self, zip_pages: Dict[str, Dict[str, PageResult]], previous: Dict[str, PageState]) -> List[Listing]:
         """
-        Merge and deduplicate property data from different sources
+        Merge each ZIP's pages in source order and save the new page/merge states
         """
-        merged = {}
-        
-        for prop in properties:
-            address = prop['address'].lower()
-            if address not in merged:
-                merged[address] = prop
-            else:
-                # Update with more complete information
-                for key, value in prop.items():
-                    if not merged[address][key] and value:
-                        merged[address][key] = value
-                
-                # Use the lower price if available
-                if prop['price'] < merged[address]['price']:
-                    merged[address]['price'] = prop['price']
-                
-                # Use the higher days on market if available
-                if prop['days_on_market'] > merged[address]['days_on_market']:
-                    merged[address]['days_on_market'] = prop['days_on_market']
-                
-                # Combine price drops
-                merged[address]['price_drops'] = max(
-                    merged[address]['price_drops'],
-                    prop['price_drops']
-                )
-        
-        return list(merged.values())
-
-    async def scrape_all_sources(self, zip_codes: List[str]) -> List[Dict[Any, Any]]:
+        new_states: Dict[str, PageState] = {
+            f"{source}:{zip_code}": page.state
+            for zip_code, pages in zip_pages.items() for source, page in pages.items() if page.state is not None
+        }
+
+        # Merge and deduplicate properties per zip code
+        all_properties = []
+        for zip_code, by_source in zip_pages.items():
+            # Source order, not completion order, so merges are deterministic
+            pages = [by_source.get(source, PageResult([])) for source in self.monitors]
+            signature = None
+            if self.snapshots is not None and all(page.content_hash for page in pages):
+                # Same page contents (and merge rules) as last time means the same merge output
+                signature = combined_hash([MERGE_VERSION, *(page.content_hash for page in pages)])
+                prior = previous.get(f"merged:{zip_code}")
+                if prior is not None and prior.content_hash == signature:
+                    self.change_stats['merges_skipped'] += 1
+                    all_properties.extend(prior.listings)
+                    continue
+            merged = self._merge_property_data(
+                [p for page in pages for p in page.listings],
+                [source for source, page in zip(self.monitors, pages) for _ in page.listings]
+            )
+            if signature is not None:
+                # Stored merge output keeps its fingerprints, so a skipped merge skips hashing too
+                add_fingerprints(merged)
+                new_states[f"merged:{zip_code}"] = PageState(signature, merged)
+            all_properties.extend(merged)
+
+        if self.snapshots is not None:
+            await self.snapshots.save(new_states)
+            logger.info(f"Change detection: {self.change_stats}")
+        logger.info(f"Scrape throughput by host: {self.host_throughput()}")
+        logger.info(f"Source health: {self.source_health()}")
+        return all_properties
+
+    async def scrape_all_sources(self, zip_codes: List[str]) -> List[Listing]:
         """
         Scrape property data from all sources for given zip codes
         """
-        all_properties = []
-        
-        for zip_code in zip_codes:
-            tasks = [
-                self.scrape_zillow(zip_code),
-                self.scrape_redfin(zip_code),
-                self.scrape_realtor(zip_code)
-            ]
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            zip_properties = []
-            for result in results:
-                if isinstance(result, list):
-                    zip_properties.extend(result)
-                else:
-                    logger.error(f"Error during scraping: {str(result)}")
-            
-            # Merge and deduplicate properties for this zip code
-            merged_properties = self._merge_property_data(zip_properties)
-            all_properties.extend(merged_properties)
-            
-            # Add a small delay between zip codes to avoid rate limiting
-            await asyncio.sleep(random.uniform(1, 3))
-        
-        return all_properties
\ No newline at end of file
+        zip_codes = list(dict.fromkeys(zip_codes))
+        previous = await self.load_previous(zip_codes)
+        zip_pages: Dict[str, Dict[str, PageResult]] = {zip_code: {} for zip_code in zip_codes}
+        async for zip_code, source, page in self.iter_pages(zip_codes, previous):
+            zip_pages[zip_code][source] = page
+        return await self.finish_pages(zip_pages, previous)
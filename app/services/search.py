@@ -0,0 +1,166 @@
+import base64
+import json
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Property
+from .listings import Listing
+
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "100"))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "1000"))
+
+SEARCH_COLUMNS = (
+    'id', 'address', 'zip_code', 'property_type', 'price', 'square_feet', 'days_on_market', 'price_drops',
+    'owner_status', 'tax_assessed_value', 'listing_agent', 'motivation_score', 'suggested_offer',
+    'estimated_roi', 'updated_at', 'drop_count', 'drop_pct', 'drop_velocity', 'last_drop_at',
+)
+
+# Stored-mode sort orders, all descending with id breaking ties; "last_drop"
+# is most recent drop first
+SORT_COLUMNS = {
+    'motivation_score': Property.motivation_score,
+    'drop_count': Property.drop_count,
+    'drop_pct': Property.drop_pct,
+    'drop_velocity': Property.drop_velocity,
+    'last_drop': Property.last_drop_at,
+}
+DEFAULT_SORT = 'motivation_score'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value: Any, property_id: int, sort: str = DEFAULT_SORT) -> str:
+    """
+    Opaque keyset cursor for the last row of a page
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    # Score-ordered cursors keep their original two-element form
+    key = [value, property_id] if sort == DEFAULT_SORT else [sort, value, property_id]
+    raw = json.dumps(key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str = DEFAULT_SORT) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+        cursor_sort, value, property_id = key if len(key) == 3 else [DEFAULT_SORT, *key]
+        if cursor_sort != sort:
+            raise ValueError(f"cursor is for sort={cursor_sort}")
+        # Ids are 64-bit primary keys; anything else would fail in the query instead of here
+        if isinstance(property_id, bool) or not isinstance(property_id, int) or not 0 <= property_id < 2 ** 63:
+            raise ValueError(f"cursor id {property_id!r} is not a property id")
+        value = datetime.fromisoformat(value) if sort == 'last_drop' else float(value)
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"cursor value {value} is not finite")
+        return value, property_id
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def filter_listings(properties: List[Listing], filters) -> List[Listing]:
+    """
+    Apply a PropertyFilter's criteria to scraped listings in memory (live mode)
+    """
+    if filters.property_type:
+        properties = [p for p in properties if p.property_type == filters.property_type]
+    if filters.min_price:
+        properties = [p for p in properties if p.price >= filters.min_price]
+    if filters.max_price:
+        properties = [p for p in properties if p.price <= filters.max_price]
+    if filters.max_days_on_market:
+        properties = [p for p in properties if p.days_on_market <= filters.max_days_on_market]
+    return properties
+
+
+def _conditions(filters, after: Optional[Tuple[Any, int]]) -> List[Any]:
+    sort_column = SORT_COLUMNS[filters.sort]
+    # Rows without a sort value (unscored, or never dropped) have no place in a keyset walk on it
+    conditions = [sort_column.isnot(None)]
+    if filters.property_type:
+        conditions.append(Property.property_type == filters.property_type)
+    if filters.min_price:
+        conditions.append(Property.price >= filters.min_price)
+    if filters.max_price:
+        conditions.append(Property.price <= filters.max_price)
+    if filters.max_days_on_market:
+        conditions.append(Property.days_on_market <= filters.max_days_on_market)
+    if filters.min_drop_count:
+        conditions.append(Property.drop_count >= filters.min_drop_count)
+    if filters.min_drop_pct:
+        conditions.append(Property.drop_pct >= filters.min_drop_pct)
+    if filters.min_drop_velocity:
+        conditions.append(Property.drop_velocity >= filters.min_drop_velocity)
+    if filters.max_days_since_last_drop is not None:
+        conditions.append(
+            Property.last_drop_at >= datetime.utcnow() - timedelta(days=filters.max_days_since_last_drop)
+        )
+    if after is not None:
+        value, property_id = after
+        # The redundant <= bound gives the planner an index range to start from
+        conditions.append(sort_column <= value)
+        conditions.append(or_(
+            sort_column < value,
+            and_(sort_column == value, Property.id < property_id),
+        ))
+    return conditions
+
+
+def _page_query(zip_codes: List[str], filters, after: Optional[Tuple[Any, int]], limit: int):
+    """
+    Top `limit` rows across zip_codes in (sort column, id) descending order
+
+    The page's ids are picked first, straight off the ZIP's index for the sort
+    column (or ix_properties_zip_type_price when filtering), and only those
+    rows are read back from the table.
+    """
+    order = (SORT_COLUMNS[filters.sort].desc(), Property.id.desc())
+    page_ids = (
+        select(Property.id)
+        .where(Property.zip_code.in_(zip_codes), *_conditions(filters, after))
+        .order_by(*order)
+        .limit(limit)
+    )
+    return (
+        select(*[getattr(Property, column) for column in SEARCH_COLUMNS])
+        .where(Property.id.in_(page_ids.scalar_subquery()))
+        .order_by(*order)
+    )
+
+
+async def search_stored(db: AsyncSession, filters, limit: int = None, cursor: str = None) -> Dict[str, Any]:
+    """
+    Answer a PropertyFilter from the properties table, best motivation score first unless filters.sort says otherwise
+
+    Returns {"items": [...], "next_cursor": str | None}; pass next_cursor back
+    to get the following page. Items carry the price-history aggregates and
+    days_since_last_drop.
+    """
+    limit = min(limit or SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE)
+    after = decode_cursor(cursor, filters.sort) if cursor else None
+    zip_codes = list(dict.fromkeys(filters.zip_codes))
+
+    # One extra row tells us whether another page exists
+    result = await db.execute(_page_query(zip_codes, filters, after, limit + 1))
+    rows = [dict(row) for row in result.mappings()]
+
+    items = rows[:limit]
+    now = datetime.utcnow()
+    for item in items:
+        last_drop_at = item['last_drop_at']
+        item['days_since_last_drop'] = (
+            round((now - last_drop_at).total_seconds() / 86400, 1) if last_drop_at is not None else None
+        )
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last[SORT_COLUMNS[filters.sort].key], last['id'], filters.sort)
+    return {'items': items, 'next_cursor': next_cursor}
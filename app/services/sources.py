@@ -0,0 +1,177 @@
+import importlib
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import percentile
+from .parsers import parse_zillow, parse_redfin, parse_realtor
+
+logger = logging.getLogger(__name__)
+
+# Sources are scraped (and merged) in SCRAPER_SOURCES order; by default every
+# registered source in registration order. SCRAPER_SOURCE_PLUGINS names extra
+# modules to import, which add their own adapters with register_source.
+SOURCES_SETTING = os.getenv("SCRAPER_SOURCES", "")
+SOURCE_PLUGINS = os.getenv("SCRAPER_SOURCE_PLUGINS", "")
+
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("SCRAPER_REQUEST_TIMEOUT", "30"))  # seconds per HTTP request
+DEFAULT_BREAKER_FAILURES = int(os.getenv("SCRAPER_BREAKER_FAILURES", "5"))  # consecutive failures that open it
+DEFAULT_BREAKER_COOLDOWN = float(os.getenv("SCRAPER_BREAKER_COOLDOWN", "60"))  # seconds before a trial request
+
+
+def source_setting(source: str, name: str, default: float) -> float:
+    """
+    Read a per-source override such as SCRAPER_BREAKER_COOLDOWN_ZILLOW
+    """
+    value = os.getenv(f"SCRAPER_{name}_{source.upper()}")
+    return float(value) if value else default
+
+
+class SourceAdapter:
+    """
+    One listing site: its search URL per ZIP code and the parser for that page
+
+    parser must be a module-level function (html, zip_code) -> listings so it
+    can run in the CPU executor's worker processes. SCRAPER_URL_TEMPLATE_<NAME>
+    replaces url_template, e.g. to point a source at a local fixture server.
+    """
+
+    def __init__(self, name: str, url_template: str, parser: Callable[[str, str], List[Dict[Any, Any]]],
+                 timeout: float = None):
+        self.name = name
+        self.url_template = os.getenv(f"SCRAPER_URL_TEMPLATE_{name.upper()}", url_template)
+        self.parser = parser
+        self.timeout = timeout or source_setting(name, 'REQUEST_TIMEOUT', DEFAULT_REQUEST_TIMEOUT)
+
+    def url(self, zip_code: str) -> str:
+        return self.url_template.format(zip_code=zip_code)
+
+    def enabled(self) -> bool:
+        return os.getenv(f"SCRAPER_ENABLED_{self.name.upper()}", "true").lower() == "true"
+
+
+SOURCE_REGISTRY: Dict[str, SourceAdapter] = {}
+
+
+def register_source(adapter: SourceAdapter) -> SourceAdapter:
+    SOURCE_REGISTRY[adapter.name] = adapter
+    return adapter
+
+
+register_source(SourceAdapter('zillow', "https://www.zillow.com/homes/{zip_code}_rb/", parse_zillow))
+register_source(SourceAdapter('redfin', "https://www.redfin.com/zipcode/{zip_code}", parse_redfin))
+register_source(SourceAdapter('realtor', "https://www.realtor.com/realestateandhomes-search/{zip_code}", parse_realtor))
+
+_plugins_loaded = False
+
+
+def enabled_sources() -> List[SourceAdapter]:
+    """
+    The adapters to scrape, in merge order
+    """
+    global _plugins_loaded
+    if not _plugins_loaded:
+        for module in filter(None, (m.strip() for m in SOURCE_PLUGINS.split(','))):
+            importlib.import_module(module)
+        _plugins_loaded = True
+
+    names = [n.strip() for n in SOURCES_SETTING.split(',') if n.strip()] or list(SOURCE_REGISTRY)
+    adapters = []
+    for name in names:
+        if name not in SOURCE_REGISTRY:
+            logger.warning(f"Unknown source in SCRAPER_SOURCES: {name}")
+        elif SOURCE_REGISTRY[name].enabled():
+            adapters.append(SOURCE_REGISTRY[name])
+    return adapters
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a failing source for a cooldown period
+
+    After failure_threshold consecutive failures the breaker opens and
+    allow() refuses requests. Once the cooldown has passed it lets a single
+    trial request through; success closes it, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._trial_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.state == 'closed':
+            return True
+        now = time.monotonic()
+        if self.state == 'open' and now - self.opened_at >= self.cooldown:
+            self.state = 'half_open'
+            self._trial_started = None
+        if self.state == 'half_open':
+            # One trial at a time; a trial that never reported back is replaced after a cooldown
+            if self._trial_started is None or now - self._trial_started >= self.cooldown:
+                self._trial_started = now
+                return True
+        return False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._trial_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            self._trial_started = None
+
+
+class SourceMonitor:
+    """
+    Circuit breaker plus page-level health and latency for one source
+    """
+
+    def __init__(self, adapter: SourceAdapter):
+        self.adapter = adapter
+        self.breaker = CircuitBreaker(
+            source_setting(adapter.name, 'BREAKER_FAILURES', DEFAULT_BREAKER_FAILURES),
+            source_setting(adapter.name, 'BREAKER_COOLDOWN', DEFAULT_BREAKER_COOLDOWN),
+        )
+        self.pages = 0
+        self.failed = 0
+        self.skipped = 0  # pages not fetched because the breaker was open
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self._latencies: deque = deque(maxlen=1000)
+
+    def record_page(self, seconds: float, ok: bool):
+        self.pages += 1
+        self._latencies.append(seconds)
+        if ok:
+            self.last_success_at = time.time()
+        else:
+            self.failed += 1
+
+    def report(self) -> Dict[str, Any]:
+        latencies = list(self._latencies)
+        return {
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'times_opened': self.breaker.times_opened,
+            'pages': self.pages,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'success_rate': round(1 - self.failed / self.pages, 3) if self.pages else None,
+            'latency_p50': percentile(latencies, 50),
+            'latency_p95': percentile(latencies, 95),
+            'latency_p99': percentile(latencies, 99),
+            'last_error': self.last_error,
+            'last_success_at': self.last_success_at,
+        }
@@ -0,0 +1,73 @@
+"""
+Benchmark the comps index: build time, single top-k latency and bulk comp stats at scale.
+
+    python -m benchmarks.bench_comps --listings 2000000 --zips 1000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.services.comps import CompsIndex
+
+PROPERTY_TYPES = ['single_family', 'condo', 'townhouse', 'multi_family']
+
+
+def make_listings(n: int, zips: int, seed: int):
+    rng = np.random.default_rng(seed)
+    zip_codes = np.char.zfill(rng.integers(0, zips, n).astype(str), 5)
+    property_types = np.asarray(PROPERTY_TYPES)[rng.integers(0, len(PROPERTY_TYPES), n)]
+    square_feet = rng.integers(500, 4500, n).astype(float)
+    prices = square_feet * rng.uniform(150, 900, n)
+    addresses = np.char.add('listing-', np.arange(n).astype(str))
+    return zip_codes, property_types, square_feet, prices, addresses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--listings', type=int, default=2_000_000)
+    parser.add_argument('--zips', type=int, default=1000)
+    parser.add_argument('--queries', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    zip_codes, property_types, square_feet, prices, addresses = make_listings(args.listings, args.zips, args.seed)
+
+    start = time.perf_counter()
+    index = CompsIndex(zip_codes, property_types, square_feet, prices, addresses)
+    build_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.integers(0, args.listings, args.queries)
+    queries = [
+        {'zip_code': str(zip_codes[i]), 'property_type': str(property_types[i]),
+         'square_feet': float(square_feet[i]), 'address': str(addresses[i])}
+        for i in picks.tolist()
+    ]
+
+    single = []
+    for q in queries[:2000]:
+        t = time.perf_counter()
+        index.top_k(q['zip_code'], q['property_type'], q['square_feet'], exclude_address=q['address'])
+        single.append(time.perf_counter() - t)
+    single.sort()
+
+    start = time.perf_counter()
+    stats = index.comp_stats(queries)
+    bulk_s = time.perf_counter() - start
+
+    print(json.dumps({
+        'listings': len(index),
+        'build_seconds': round(build_s, 3),
+        'top_k_p50_ms': round(single[len(single) // 2] * 1000, 4),
+        'top_k_p99_ms': round(single[int(len(single) * 0.99)] * 1000, 4),
+        'bulk_queries': len(queries),
+        'bulk_seconds': round(bulk_s, 3),
+        'bulk_queries_per_second': round(len(queries) / bulk_s),
+        'rows_with_comps': int(np.count_nonzero(stats['comp_count'])),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
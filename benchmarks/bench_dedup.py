@@ -0,0 +1,155 @@
+"""
+Benchmark cross-source dedup: match accuracy on the labeled address pairs and merge throughput at scale.
+
+    python -m benchmarks.bench_dedup --listings 100000 --zips 1000
+
+Synthetic listings are properties seen on one to three sites, each site
+formatting the address its own way (suffix spelled out or not, Unit/#/Apt,
+realtor without state and ZIP), with a fraction of street-name typos. The
+old merge keyed on the lowercased address is run on the same input for
+comparison.
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from app.services.addresses import AddressIndex, normalize_address
+from app.services.listings import Listing
+from app.services.scraper import PropertyScraper
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+STREETS = ['Park', 'Newark', 'Grand', 'Clinton', 'Washington', 'Willow', 'Garden', 'Bloomfield', 'Hudson', 'Adams',
+           'Jefferson', 'Madison', 'Monroe', 'Jackson', 'Harrison', 'Maple', 'Oak', 'Cedar', 'Pine', 'Elm',
+           'Lincoln', 'Franklin', 'Highland', 'Riverside', 'Sunset', 'Lake', 'Hill', 'Church', 'Mill', 'Spring']
+SUFFIXES = [('St', 'Street'), ('Ave', 'Avenue'), ('Rd', 'Road'), ('Pl', 'Place'), ('Blvd', 'Boulevard'), ('Dr', 'Drive')]
+
+
+def legacy_merge(properties):
+    merged = {}
+    for prop in properties:
+        address = prop['address'].lower()
+        if address not in merged:
+            merged[address] = prop
+        else:
+            for key, value in prop.items():
+                if not merged[address][key] and value:
+                    merged[address][key] = value
+            merged[address]['price'] = min(merged[address]['price'], prop['price'])
+            merged[address]['days_on_market'] = max(merged[address]['days_on_market'], prop['days_on_market'])
+            merged[address]['price_drops'] = max(merged[address]['price_drops'], prop['price_drops'])
+    return list(merged.values())
+
+
+def make_listings(n: int, zips: int, typo_rate: float, seed: int):
+    """
+    About n listings in source order and the number of distinct properties behind them
+    """
+    rng = random.Random(seed)
+    by_source = {'zillow': [], 'redfin': [], 'realtor': []}
+    seen = set()
+    properties = 0
+    while sum(len(v) for v in by_source.values()) < n:
+        zip_code = f"{rng.randrange(zips):05d}"
+        number = rng.randrange(1, 2000)
+        street = rng.choice(STREETS)
+        short, long = rng.choice(SUFFIXES)
+        unit = f"{rng.randrange(1, 8)}{rng.choice('ABCD')}" if rng.random() < 0.3 else ''
+        if (zip_code, number, street, short, unit) in seen:
+            continue
+        seen.add((zip_code, number, street, short, unit))
+        properties += 1
+        city = f"Town-{zip_code}"
+        listing = {
+            'zip_code': zip_code, 'price': float(rng.randrange(200, 3000) * 1000), 'square_feet': rng.randrange(500, 4000),
+            'days_on_market': rng.randrange(0, 200), 'price_drops': rng.randrange(0, 4), 'property_type': 'condo',
+            'listing_agent': '', 'tax_assessed_value': 0, 'owner_status': 'unknown', 'pre_foreclosure': False,
+        }
+        for source in rng.sample(list(by_source), rng.randint(1, 3)):
+            name = street
+            if rng.random() < typo_rate and len(name) > 4:
+                i = rng.randrange(1, len(name) - 1)
+                name = name[:i] + name[i + 1:]
+            if source == 'zillow':
+                address = f"{number} {name} {short}{' Unit ' + unit if unit else ''}, {city}, NJ {zip_code}"
+            elif source == 'redfin':
+                address = f"{number} {name} {long}{' #' + unit if unit else ''}, {city}, NJ {zip_code}"
+            else:
+                address = f"{number} {name} {short}{' Apt ' + unit if unit else ''}, {city}"
+            by_source[source].append(dict(listing, address=address))
+    listings, sources = [], []
+    for source, items in by_source.items():
+        listings += items
+        sources += [source] * len(items)
+    return listings, sources, properties
+
+
+def label_accuracy() -> dict:
+    pairs = json.loads((FIXTURES / 'address_pairs.json').read_text())
+    counts = {'true_match': 0, 'false_match': 0, 'true_distinct': 0, 'missed_match': 0}
+    errors = []
+    for pair in pairs:
+        index = AddressIndex()
+        index.assign(pair['zip_code'], pair['a'], 'a')
+        matched = index.assign(pair.get('zip_code_b', pair['zip_code']), pair['b'], 'b')[1] != 'new'
+        if matched and pair['same']:
+            counts['true_match'] += 1
+        elif matched:
+            counts['false_match'] += 1
+            errors.append(pair['note'])
+        elif pair['same']:
+            counts['missed_match'] += 1
+            errors.append(pair['note'])
+        else:
+            counts['true_distinct'] += 1
+    matched = counts['true_match'] + counts['false_match']
+    expected = counts['true_match'] + counts['missed_match']
+    return {
+        'pairs': len(pairs),
+        **counts,
+        'precision': round(counts['true_match'] / matched, 3) if matched else None,
+        'recall': round(counts['true_match'] / expected, 3) if expected else None,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--listings', type=int, default=100_000)
+    parser.add_argument('--zips', type=int, default=1000)
+    parser.add_argument('--typos', type=float, default=0.02, help='fraction of listings with a street-name typo')
+    parser.add_argument('--seed', type=int, default=17)
+    args = parser.parse_args()
+
+    listings, sources, properties = make_listings(args.listings, args.zips, args.typos, args.seed)
+    results = {'labeled': label_accuracy(), 'listings': len(listings), 'properties': properties}
+
+    start = time.perf_counter()
+    legacy = legacy_merge([dict(p) for p in listings])
+    legacy_s = time.perf_counter() - start
+
+    normalize_address.cache_clear()
+    start = time.perf_counter()
+    merged = PropertyScraper._merge_property_data(None, [Listing.from_dict(p) for p in listings], sources)
+    merge_s = time.perf_counter() - start
+
+    results['legacy'] = {
+        'seconds': round(legacy_s, 3),
+        'listings_per_s': round(len(listings) / legacy_s),
+        'merged': len(legacy),
+        'duplicates_left': len(legacy) - properties,
+    }
+    results['normalized'] = {
+        'seconds': round(merge_s, 3),
+        'listings_per_s': round(len(listings) / merge_s),
+        'merged': len(merged),
+        'duplicates_left': len(merged) - properties,
+        'fuzzy_matches': sum(entry['match'] == 'fuzzy' for p in merged for entry in p.provenance),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Measure latency of light requests while a heavy /api/search runs, per CPU executor mode.
+
+    python -m benchmarks.bench_event_loop --zips 300
+
+Each mode runs in a fresh interpreter with PROPAI_EXECUTOR set; "inline" is the
+previous behaviour where parsing and scoring run on the event loop.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures"
+MODES = ['inline', 'thread', 'process']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def measure(zips: int, interval: float) -> dict:
+    import httpx
+    from app.main import app
+    from app.database import engine, init_db
+    from app.services.scraper import PropertyScraper
+    from app.services.executor import get_executor, shutdown_executor
+
+    pages = {source: (FIXTURES / f"{source}_07030.html").read_text() for source in ('zillow', 'redfin', 'realtor')}
+
+    async def replay_page(source, zip_code, url, trial=False):
+        await asyncio.sleep(0.005)
+        return pages[source]
+
+    scraper = PropertyScraper()
+    scraper._fetch_page = replay_page
+    app.state.scraper = scraper
+    await init_db()
+    get_executor()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up worker processes and imports before timing anything
+        await client.post("/api/search", json={"zip_codes": ["07030"]})
+
+        latencies = []
+        done = asyncio.Event()
+
+        async def light_requests():
+            # Latency is taken from each request's scheduled send time, so time
+            # spent waiting for a blocked event loop is counted, not omitted.
+            scheduled = time.perf_counter()
+            while not done.is_set():
+                scheduled += interval
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/")
+                latencies.append(time.perf_counter() - scheduled)
+
+        pinger = asyncio.create_task(light_requests())
+        start = time.perf_counter()
+        response = await client.post("/api/search", json={"zip_codes": [f"{i:05d}" for i in range(zips)]})
+        heavy_seconds = time.perf_counter() - start
+        done.set()
+        await pinger
+
+    shutdown_executor()
+    await engine.dispose()
+    return {
+        'heavy_search_seconds': round(heavy_seconds, 3),
+        'listings': len(response.json()),
+        'light_requests': len(latencies),
+        'light_p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'light_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'light_max_ms': round(max(latencies) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--zips', type=int, default=300)
+    parser.add_argument('--interval', type=float, default=0.005, help="pause between light requests")
+    parser.add_argument('--modes', default=",".join(MODES))
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(measure(args.zips, args.interval))))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='propai-loop-')
+    results = {}
+    for mode in args.modes.split(','):
+        env = dict(os.environ, PROPAI_EXECUTOR=mode, SCRAPER_RATE_PER_HOST="100000", SCRAPER_CACHE_TTL="0",
+                   DATABASE_URL=f"sqlite:///{os.path.join(workdir, mode + '.db')}")
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_event_loop', '--worker',
+             '--zips', str(args.zips), '--interval', str(args.interval)],
+            env=env, capture_output=True, text=True, check=True
+        )
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
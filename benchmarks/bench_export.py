@@ -0,0 +1,130 @@
+"""
+Compare export formats on a scratch SQLite database: write time, file size and read-back time.
+
+    python -m benchmarks.bench_export --rows 200000
+
+"Read" means loading the export into typed columns the way an analytics job
+would; for CSV that includes stripping the $ and % formatting.
+"""
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+
+async def seed_database(rows: int, seed: int):
+    from app.database import engine, init_db
+    from app.services.listings import Listing
+    from app.services.persistence import upsert_properties
+
+    await init_db()
+    rng = random.Random(seed)
+    batch = []
+    for i in range(rows):
+        price = rng.uniform(100_000, 2_000_000)
+        batch.append(Listing(
+            address=f"{i} Benchmark Ave, Hoboken, NJ 07030",
+            zip_code=f"{rng.randint(7000, 7999):05d}",
+            property_type=rng.choice(['single_family', 'condo', 'townhouse']),
+            price=price,
+            square_feet=rng.uniform(500, 4000),
+            days_on_market=rng.randint(0, 300),
+            price_drops=rng.randint(0, 4),
+            owner_status=rng.choice(['absentee', 'owner-occupied', 'unknown']),
+            tax_assessed_value=price * rng.uniform(0.7, 1.2),
+            listing_agent=rng.choice(['Compass', 'Keller Williams', '']),
+            motivation_score=float(rng.choice([0, 15, 20, 35, 45, 60])),
+            suggested_offer=price * 0.85,
+            estimated_roi=rng.uniform(-20, 40),
+        ))
+        if len(batch) == 10_000:
+            await upsert_properties(engine, batch)
+            batch = []
+    if batch:
+        await upsert_properties(engine, batch)
+
+
+def read_csv(data: bytes):
+    import pandas as pd
+
+    df = pd.read_csv(io.BytesIO(data))
+    for column in ('List Price', 'Suggested Offer', 'Tax Assessed Value'):
+        df[column] = df[column].str.replace('[$,]', '', regex=True).astype(float)
+    df['Estimated ROI %'] = df['Estimated ROI %'].str.rstrip('%').astype(float)
+    return len(df)
+
+
+def read_csv_gz(data: bytes):
+    return read_csv(gzip.decompress(data))
+
+
+def read_parquet(data: bytes):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(io.BytesIO(data)).num_rows
+
+
+def read_arrow(data: bytes):
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(data).read_all().num_rows
+
+
+READERS = {'csv': read_csv, 'csv.gz': read_csv_gz, 'parquet': read_parquet, 'arrow': read_arrow}
+
+
+async def collect(chunks) -> bytes:
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+    return b''.join(parts)
+
+
+async def run(args) -> dict:
+    from app.database import AsyncSessionLocal, engine
+    from app.services.data_export import DataExporter
+
+    await seed_database(args.rows, args.seed)
+
+    results = {}
+    for name in READERS:
+        start = time.perf_counter()
+        data = await collect(DataExporter.stream_export(AsyncSessionLocal, name))
+        write_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = READERS[name](data)
+        read_s = time.perf_counter() - start
+
+        results[name] = {
+            'rows': rows,
+            'bytes': len(data),
+            'write_seconds': round(write_s, 3),
+            'write_rows_per_second': round(rows / write_s),
+            'read_seconds': round(read_s, 3),
+            'read_rows_per_second': round(rows / read_s),
+        }
+    # Pooled aiosqlite connections run on non-daemon threads
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='propai-export-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare the script-tag extractor against the previous BeautifulSoup path on the saved fixture pages.
+
+    python -m benchmarks.bench_extractor --scale 10 --repeat 20
+"""
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from app.services.extractor import extract_script_json, find_script, decode_json_after
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def legacy_zillow(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup.find_all('script', type='application/json'):
+        if script.string and 'searchPageState' in script.string:
+            return json.loads(script.string)
+
+
+def legacy_redfin(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup.find_all('script'):
+        if script.string and 'RF.reactBootstrap' in script.string:
+            data_match = re.search(r'JSONData: ({.*})', script.string)
+            if data_match:
+                return json.loads(data_match.group(1))
+            return None
+
+
+def legacy_realtor(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup.find_all('script', type='application/json'):
+        if script.string and '"props":' in script.string:
+            return json.loads(script.string)
+
+
+def fast_zillow(html):
+    return extract_script_json(html, 'searchPageState', 'application/json')
+
+
+def fast_redfin(html):
+    script = find_script(html, 'RF.reactBootstrap')
+    return decode_json_after(script, 'JSONData:') if script else None
+
+
+def fast_realtor(html):
+    return extract_script_json(html, '"props":', 'application/json')
+
+
+CASES = {
+    'zillow': (legacy_zillow, fast_zillow),
+    'redfin': (legacy_redfin, fast_redfin),
+    'realtor': (legacy_realtor, fast_realtor),
+}
+
+
+def load_page(source: str, scale: int) -> str:
+    html = (FIXTURES / f"{source}_07030.html").read_text()
+    if scale <= 1:
+        return html
+    # Inflate the page with extra markup ahead of the payload to mimic multi-megabyte live pages
+    body_at = html.index('<body>') + len('<body>')
+    padding = html[body_at:html.index('<script', body_at)]
+    return html[:body_at] + padding * scale + html[body_at:]
+
+
+def best_of(fn, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(html)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=10, help="page inflation factor")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    results = {}
+    for source, (legacy, fast) in CASES.items():
+        html = load_page(source, args.scale)
+        if legacy(html) != fast(html):
+            raise SystemExit(f"{source}: extractor output differs from BeautifulSoup path")
+        legacy_s = best_of(legacy, html, args.repeat)
+        fast_s = best_of(fast, html, args.repeat)
+        results[source] = {
+            'page_bytes': len(html),
+            'beautifulsoup_ms': round(legacy_s * 1000, 3),
+            'extractor_ms': round(fast_s * 1000, 3),
+            'speedup': round(legacy_s / fast_s, 1),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
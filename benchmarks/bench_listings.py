@@ -0,0 +1,217 @@
+"""
+Compare listing dicts with Listing records and ListingBatch columns: memory, pickling and pipeline throughput.
+
+    python -m benchmarks.bench_listings --zips 2000
+
+Listings come from the fixture pages for --zips ZIP codes, three sources
+each. The dict path runs the merge, scoring and persist-row code as it was
+when every listing was a dict; the record path runs the current code on
+the same listings. Reported per representation:
+
+- memory: traced bytes to hold every merged, scored listing
+- ipc: pickled size and pickle+unpickle time for parse results coming back
+  from a worker, and for a scoring round trip (the whole dicts out and back,
+  against only the scoring columns out and the scores back)
+- snapshot: JSON size and dumps+loads time of a stored page state
+- merge, score, persist_rows: listings per second
+
+Parse results come back from workers as Listing records: they pickle
+smaller than the same page as dicts or as a ListingBatch, and a batch would
+also pay from_listings and to_listings on either side. Columns only pay off
+for the scoring round trip, where a few columns go out and scores come back.
+
+The record path is slower than the dict path for score and persist_rows
+(at --zips 300, roughly 0.65x and 0.5x the dict rate). Scoring builds a
+ListingBatch from attribute reads, and property_rows also computes each
+row's storage key, which the dict path never did. Records win on memory,
+merge and IPC, not on those two stages.
+"""
+import argparse
+import gc
+import json
+import os
+import pickle
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.services.addresses import AddressIndex
+from app.services.comps import CompsIndex
+from app.services.listings import PARSED_FIELDS, ListingBatch
+from app.services.persistence import PROPERTY_COLUMNS, property_rows
+from app.services.scoring import SCORE_COLUMNS, SCORE_INPUTS, PropertyScorer, apply_scores, score_listing_batch
+from app.services.scraper import PropertyScraper
+from app.services.sources import SOURCE_REGISTRY
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+def dict_merge(properties, sources):
+    """
+    _merge_property_data as it was on listing dicts
+    """
+    index = AddressIndex()
+    merged = []
+    for i, prop in enumerate(properties):
+        position, match = index.assign(prop.get('zip_code'), prop['address'], len(merged))
+        entry = {'source': sources[i], 'address': prop['address'], 'match': match}
+        if match == 'new':
+            prop['provenance'] = [entry]
+            merged.append(prop)
+            continue
+        target = merged[position]
+        target['provenance'].append(entry)
+        for key, value in prop.items():
+            if not target.get(key) and value:
+                target[key] = value
+        if prop['price'] < target['price']:
+            target['price'] = prop['price']
+        if prop['days_on_market'] > target['days_on_market']:
+            target['days_on_market'] = prop['days_on_market']
+        target['price_drops'] = max(target['price_drops'], prop['price_drops'])
+    return merged
+
+
+def dict_score(properties, comp_stats):
+    """
+    score_properties as it was on listing dicts
+    """
+    columns = {name: [p.get(name, default) for p in properties] for name, default in SCORE_INPUTS}
+    scores = PropertyScorer(os.getenv('OPENAI_API_KEY')).score_batch(columns, comp_stats)
+    for name in SCORE_COLUMNS:
+        for property, value in zip(properties, scores[name].tolist()):
+            property[name] = value
+    return properties
+
+
+def traced_mb(build):
+    """
+    Bytes newly allocated (and still held) by build(), in MiB
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return round((after - before) / 2 ** 20, 2)
+
+
+def round_trip(value, repeat: int = 3) -> dict:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.loads(data)
+    return {'bytes': len(data), 'ms': round((time.perf_counter() - start) / repeat * 1000, 2)}
+
+
+def timed(fn, count: int):
+    """
+    fn()'s result and its time and throughput over count listings
+    """
+    start = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - start
+    return value, {'seconds': round(seconds, 3), 'listings_per_s': round(count / seconds)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--zips', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=500, help='listings per scoring batch, as EXECUTOR_BATCH_SIZE')
+    args = parser.parse_args()
+
+    templates = {source: (FIXTURES / f"{source}_07030.html").read_text() for source in SOURCE_REGISTRY}
+    pages, sources = [], []
+    for i in range(args.zips):
+        zip_code = f"{10000 + i:05d}"
+        for source, template in templates.items():
+            listings = SOURCE_REGISTRY[source].parser(
+                template.replace('07030', zip_code).replace('Hoboken', f'Hoboken-{zip_code}'), zip_code)
+            pages.append(listings)
+            sources += [source] * len(listings)
+    records = [listing for page in pages for listing in page]
+    dicts = [listing.to_dict() for listing in records]
+    results = {'zips': args.zips, 'listings': len(records)}
+
+    # The dict merge updated listings in place, so finish_pages handed it copies
+    merge = {}
+    merged_dicts, merge['dict'] = timed(lambda: dict_merge([dict(p) for p in dicts], sources), len(dicts))
+    merged_records, merge['record'] = timed(
+        lambda: PropertyScraper._merge_property_data(None, records, sources), len(records))
+    results['merged'] = len(merged_records)
+
+    comp_stats = CompsIndex.from_properties(merged_records).comp_stats(merged_records)
+
+    def batches(n):
+        return [(i, min(i + args.batch, n)) for i in range(0, n, args.batch)]
+
+    def stats(start, end):
+        return {name: column[start:end] for name, column in comp_stats.items()}
+
+    def score_records():
+        fields = [name for name, _ in SCORE_INPUTS]
+        for start, end in batches(len(merged_records)):
+            chunk = merged_records[start:end]
+            apply_scores(chunk, score_listing_batch(ListingBatch.from_listings(chunk, fields), stats(start, end)))
+
+    score = {
+        'dict': timed(lambda: [dict_score(merged_dicts[s:e], stats(s, e)) for s, e in batches(len(merged_dicts))],
+                      len(merged_dicts))[1],
+        'record': timed(score_records, len(merged_records))[1],
+    }
+    assert all(d['motivation_score'] == r.motivation_score and d['suggested_offer'] == r.suggested_offer
+               for d, r in zip(merged_dicts, merged_records)), 'dict and record scores differ'
+
+    persist_rows = {
+        'dict': timed(lambda: list({p['address']: {column: p.get(column) for column in PROPERTY_COLUMNS}
+                                    for p in merged_dicts if p.get('address')}.values()), len(merged_dicts))[1],
+        'record': timed(lambda: property_rows(merged_records), len(merged_records))[1],
+    }
+
+    memory = {
+        'dict_mb': traced_mb(lambda: [dict(p) for p in merged_dicts]),
+        'record_mb': traced_mb(lambda: [p.copy() for p in merged_records]),
+        'batch_mb': traced_mb(lambda: ListingBatch.from_listings(merged_records)),
+    }
+
+    page = max(pages, key=len)
+    chunk = merged_records[:args.batch]
+    chunk_dicts = merged_dicts[:args.batch]
+    scoring_fields = [name for name, _ in SCORE_INPUTS]
+    scores = score_listing_batch(ListingBatch.from_listings(chunk, scoring_fields))
+    ipc = {
+        'parse_page': {
+            'dict': round_trip([p.to_dict() for p in page]),
+            'record': round_trip(page),
+            'batch': round_trip(ListingBatch.from_listings(page, PARSED_FIELDS)),
+        },
+        'score_batch': {
+            # Old path: the batch of dicts to the worker and back with scores added
+            'dict': {key: 2 * value for key, value in round_trip(chunk_dicts).items()},
+            'batch': {key: a + b for (key, a), b in zip(
+                round_trip(ListingBatch.from_listings(chunk, scoring_fields)).items(), round_trip(scores).values())},
+        },
+    }
+
+    merged_page = merged_records[:60]
+
+    def json_trip(value):
+        start = time.perf_counter()
+        text = json.dumps(value, separators=(',', ':'))
+        json.loads(text)
+        return {'bytes': len(text), 'ms': round((time.perf_counter() - start) * 1000, 2)}
+
+    snapshot = {
+        'dict': json_trip([p.to_dict() for p in merged_page]),
+        'batch': json_trip(ListingBatch.from_listings(merged_page).to_columns()),
+    }
+
+    results.update({'memory': memory, 'ipc': ipc, 'snapshot': snapshot, 'merge': merge, 'score': score,
+                    'persist_rows': persist_rows})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark outreach generation for a lead campaign against a local stub LLM server.
+
+    python -m benchmarks.bench_outreach --leads 5000 --latency 0.5 --concurrency 32
+
+The stub answers /v1/chat/completions after --latency seconds (jittered) and
+fails --error-rate of calls with 429. The old path, one uncached call per
+lead, is timed on --baseline leads and extrapolated; the bulk generator then
+runs the whole campaign cold and again warm (every prompt cached).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+
+async def stub_server(port: int, latency: float, error_rate: float, seed: int):
+    from aiohttp import web
+
+    rng = random.Random(seed)
+
+    async def completions(request):
+        body = await request.json()
+        await asyncio.sleep(latency * rng.uniform(0.5, 1.5))
+        if rng.random() < error_rate:
+            return web.json_response({'error': {'message': 'Rate limit reached', 'type': 'rate_limit'}}, status=429)
+        prompt = body['messages'][-1]['content']
+        return web.json_response({
+            'id': 'stub', 'object': 'chat.completion', 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': f"Hello! We'd like to make a cash offer. ({len(prompt)})"}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': 120, 'total_tokens': len(prompt) // 4 + 120},
+        })
+
+    app = web.Application()
+    app.router.add_post('/v1/chat/completions', completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner
+
+
+def make_leads(n: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        {'id': i, 'address': f"{rng.randrange(1, 2000)} Park Ave Unit {i}, Hoboken, NJ 07030",
+         'days_on_market': rng.randrange(0, 200), 'price': float(rng.randrange(300, 3000) * 1000),
+         'price_drops': rng.randrange(0, 4)}
+        for i in range(n)
+    ]
+
+
+async def run(args) -> dict:
+    from app.database import engine, init_db
+    from app.services.outreach import OutreachGenerator
+    from app.services.scoring import PropertyScorer
+
+    runner = await stub_server(args.port, args.latency, args.error_rate, args.seed)
+    await init_db()
+    leads = make_leads(args.leads, args.seed)
+    results = {'leads': len(leads)}
+    try:
+        scorer = PropertyScorer('stub-key')
+        start = time.perf_counter()
+        done = 0
+        for lead in leads[:args.baseline]:
+            try:
+                await scorer.generate_outreach_message(lead)
+                done += 1
+            except Exception:
+                pass
+        elapsed = time.perf_counter() - start
+        results['sequential'] = {
+            'leads': args.baseline,
+            'succeeded': done,
+            'seconds': round(elapsed, 3),
+            'projected_campaign_seconds': round(elapsed / max(1, args.baseline) * len(leads), 1),
+        }
+
+        generator = await OutreachGenerator(engine, api_key='stub-key', concurrency=args.concurrency).start()
+        try:
+            for label in ('cold', 'warm'):
+                start = time.perf_counter()
+                batch = await generator.generate_many(leads)
+                elapsed = time.perf_counter() - start
+                results[label] = {
+                    'seconds': round(elapsed, 3),
+                    'leads_per_s': round(len(leads) / elapsed, 1),
+                    'cached': sum(r['cached'] for r in batch),
+                    'failed': sum(1 for r in batch if r['error']),
+                }
+            results['stats'] = generator.report()
+        finally:
+            await generator.close()
+    finally:
+        await runner.cleanup()
+        await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--leads', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.5, help='mean stub response time in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='fraction of calls answered with 429')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--baseline', type=int, default=20, help='leads run one at a time, uncached')
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--seed', type=int, default=19)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='propai-outreach-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    # The openai client reads its base URL at import
+    os.environ['OPENAI_API_BASE'] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault('OUTREACH_RETRY_BASE', '0.2')
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
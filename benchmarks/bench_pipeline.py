@@ -0,0 +1,281 @@
+"""
+Benchmark the whole scrape -> merge -> score -> persist -> export pipeline offline, against the local fixture server.
+
+    python -m benchmarks.bench_pipeline --zips 200 --latency 0.05 --output baseline.json
+    python -m benchmarks.bench_pipeline --zips 200 --latency 0.05 --baseline baseline.json
+
+Stages run in order on the same data:
+
+- scrape: PropertyScraper.scrape_all_sources over HTTP, every page fetched and parsed
+- parse: the source parsers alone, on the same pages
+- merge: _merge_property_data on the parsed listings
+- score: comps plus score_properties, in executor-sized batches
+- persist: upsert_properties into a scratch SQLite database
+- export: DataExporter.stream_export in each available format
+
+Each stage reports its time, throughput and, where there is a per-item
+latency, p50/p95/p99. rss_peak_mb is the process high-water mark after the
+stage; --trace-memory adds each stage's own peak Python allocations
+(traced_peak_mb), which slows every stage down. --rate-limited, --errors and
+--hangs inject failures into the scrape; with --hangs, lower
+SCRAPER_REQUEST_TIMEOUT so a run does not wait 30s per hung request.
+
+--repeat runs the pipeline that many times, each in a fresh interpreter and
+database, and reports the median of every figure.
+
+With --baseline, every throughput, latency, time and memory figure is
+compared to the saved run and the process exits 1 if any is more than
+--tolerance worse, so CI can fail on a regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from benchmarks.fixture_server import FixtureServer
+
+# Metric names are judged by suffix: throughput should go up, everything else down
+HIGHER_IS_BETTER = ('_per_s',)
+LOWER_IS_BETTER = ('seconds', '_ms', 'peak_mb')
+# Smaller absolute changes are timer and allocator noise, not regressions
+NOISE_FLOOR = {'seconds': 0.005, '_ms': 5.0, 'peak_mb': 5.0}
+
+
+def latency_ms(values) -> dict:
+    from app.services.metrics import percentile
+
+    ms = [v * 1000 for v in values]
+    return {f"latency_p{p}_ms": percentile(ms, p) for p in (50, 95, 99)}
+
+
+@contextmanager
+def stage(results: dict, name: str, trace_memory: bool):
+    """
+    Time a stage and record its memory high-water marks into results[name]
+    """
+    entry = results.setdefault(name, {})
+    if trace_memory:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    yield entry
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    if trace_memory:
+        entry['traced_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+    # ru_maxrss is in KiB on Linux
+    entry['rss_peak_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def run(args, server: FixtureServer) -> dict:
+    from app.database import AsyncSessionLocal, engine, init_db
+    from app.services.comps import CompsIndex
+    from app.services.data_export import DataExporter
+    from app.services.executor import EXECUTOR_BATCH_SIZE, run_cpu, shutdown_executor
+    from app.services.persistence import upsert_properties
+    from app.services.scoring import score_properties
+    from app.services.scraper import PropertyScraper
+    from app.services.sources import SOURCE_REGISTRY
+
+    zip_codes = [f"{10000 + i:05d}" for i in range(args.zips)]
+    results = {}
+    await init_db()
+    await server.start()
+    scraper = await PropertyScraper().start()
+    # Start the parse workers and their imports before anything is timed
+    for source in scraper.monitors:
+        await run_cpu(SOURCE_REGISTRY[source].parser, server.page(source, '00000'), '00000')
+    try:
+        with stage(results, 'scrape', args.trace_memory) as entry:
+            scraped = await scraper.scrape_all_sources(zip_codes)
+        health = scraper.source_health()
+        pages = sum(h['pages'] for h in health.values())
+        entry.update({
+            'pages': pages,
+            'pages_per_s': round(pages / entry['seconds'], 1),
+            'listings': len(scraped),
+            'sources': {
+                source: {
+                    'pages': h['pages'], 'failed': h['failed'], 'skipped': h['skipped'], 'state': h['state'],
+                    **{f"{key}_ms": round(h[key] * 1000, 1) if h[key] is not None else None
+                       for key in ('latency_p50', 'latency_p95', 'latency_p99')},
+                }
+                for source, h in health.items()
+            },
+            'server': server.stats,
+        })
+    finally:
+        await scraper.close()
+        await server.close()
+
+    sources = list(scraper.monitors)
+    with stage(results, 'parse', args.trace_memory) as entry:
+        listings, listing_sources, timings = [], [], []
+        for zip_code in zip_codes:
+            for source in sources:
+                html = server.page(source, zip_code)
+                start = time.perf_counter()
+                parsed = SOURCE_REGISTRY[source].parser(html, zip_code)
+                timings.append(time.perf_counter() - start)
+                listings += parsed
+                listing_sources += [source] * len(parsed)
+    entry.update({'pages': len(timings), 'listings': len(listings), **latency_ms(timings)})
+    entry['pages_per_s'] = round(len(timings) / entry['seconds'], 1)
+
+    with stage(results, 'merge', args.trace_memory) as entry:
+        merged = scraper._merge_property_data(listings, listing_sources)
+    entry.update({
+        'listings': len(listings),
+        'merged': len(merged),
+        'listings_per_s': round(len(listings) / entry['seconds']),
+    })
+
+    with stage(results, 'score', args.trace_memory) as entry:
+        comp_stats = CompsIndex.from_properties(merged).comp_stats(merged)
+        timings = []
+        for i in range(0, len(merged), EXECUTOR_BATCH_SIZE):
+            start = time.perf_counter()
+            score_properties(merged[i:i + EXECUTOR_BATCH_SIZE],
+                             {name: column[i:i + EXECUTOR_BATCH_SIZE] for name, column in comp_stats.items()})
+            timings.append(time.perf_counter() - start)
+    entry.update({'listings': len(merged), 'batches': len(timings), **latency_ms(timings)})
+    entry['listings_per_s'] = round(len(merged) / entry['seconds'])
+
+    with stage(results, 'persist', args.trace_memory) as entry:
+        await upsert_properties(engine, merged)
+    entry.update({'rows': len(merged), 'rows_per_s': round(len(merged) / entry['seconds'])})
+
+    results['export'] = {}
+    formats = ['csv', 'csv.gz'] + [f for f in ('parquet', 'arrow') if DataExporter.columnar_available(f)]
+    for export_format in formats:
+        with stage(results['export'], export_format, args.trace_memory) as entry:
+            size, gaps = 0, []
+            last = time.perf_counter()
+            async for chunk in DataExporter.stream_export(AsyncSessionLocal, export_format):
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+                size += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        entry.update({
+            'bytes': size,
+            'chunks': len(gaps),
+            'first_chunk_ms': round(gaps[0] * 1000, 1) if gaps else None,
+            **latency_ms(gaps),
+        })
+        entry['rows_per_s'] = round(len(merged) / entry['seconds'])
+
+    shutdown_executor()
+    # Pooled aiosqlite connections run on non-daemon threads
+    await engine.dispose()
+    return results
+
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def median_results(runs: list) -> dict:
+    """
+    The first run with every number replaced by its median across runs
+    """
+    def merge(values):
+        first = values[0]
+        if isinstance(first, dict):
+            return {key: merge([v[key] for v in values]) for key in first}
+        if isinstance(first, (int, float)) and not isinstance(first, bool) and all(v is not None for v in values):
+            return statistics.median(values)
+        return first
+
+    return merge(runs)
+
+
+def run_repeated(args) -> dict:
+    command = [sys.executable, '-m', 'benchmarks.bench_pipeline', '--zips', str(args.zips), '--latency', str(args.latency),
+               '--rate-limited', str(args.rate_limited), '--errors', str(args.errors), '--hangs', str(args.hangs),
+               '--port', str(args.port), '--seed', str(args.seed)] + (['--trace-memory'] if args.trace_memory else [])
+    runs = [json.loads(subprocess.run(command, capture_output=True, check=True, text=True).stdout)['stages']
+            for _ in range(args.repeat)]
+    return median_results(runs)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> dict:
+    """
+    Relative change of each comparable metric against the baseline, and those worse than tolerance
+    """
+    current, previous = flatten(results['stages']), flatten(baseline['stages'])
+    changes, regressions = {}, []
+    for key, value in current.items():
+        old = previous.get(key)
+        name = key.rsplit('.', 1)[-1]
+        if not old:
+            continue
+        if name.endswith(HIGHER_IS_BETTER):
+            worse = (old - value) / old
+        elif name.endswith(LOWER_IS_BETTER):
+            floor = next(floor for suffix, floor in NOISE_FLOOR.items() if name.endswith(suffix))
+            worse = (value - old) / old if value - old > floor else 0.0
+        else:
+            continue
+        changes[key] = {'baseline': old, 'current': value, 'change': round((value - old) / old, 3)}
+        if worse > tolerance:
+            regressions.append(key)
+    comparison = {'tolerance': tolerance, 'regressions': regressions, 'metrics': changes}
+    if baseline.get('config') != results['config']:
+        comparison['warning'] = 'baseline was run with different settings'
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--zips', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05, help='mean fixture server response time in seconds')
+    parser.add_argument('--rate-limited', type=float, default=0.0, help='fraction of page requests answered with 429')
+    parser.add_argument('--errors', type=float, default=0.0, help='fraction of page requests answered with 500')
+    parser.add_argument('--hangs', type=float, default=0.0, help='fraction of page requests never answered')
+    parser.add_argument('--port', type=int, default=8810)
+    parser.add_argument('--seed', type=int, default=23)
+    parser.add_argument('--repeat', type=int, default=1, help='runs to take the median of')
+    parser.add_argument('--trace-memory', action='store_true', help='per-stage peak Python allocations (slower)')
+    parser.add_argument('--output', help='also write the results to this file')
+    parser.add_argument('--baseline', help='results file from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown before failing')
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in ('zips', 'latency', 'rate_limited', 'errors', 'hangs', 'seed', 'trace_memory')}
+    if args.repeat > 1:
+        results = {'config': config, 'repeat': args.repeat, 'stages': run_repeated(args)}
+    else:
+        server = FixtureServer(args.port, args.latency, args.rate_limited, args.errors, args.hangs, args.seed)
+        workdir = tempfile.mkdtemp(prefix='propai-pipeline-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ.update(server.environment())
+        os.environ.setdefault('SCRAPER_CACHE_TTL', '0')
+        os.environ.setdefault('SCRAPER_RATE_PER_HOST', '1000')
+        if args.trace_memory:
+            tracemalloc.start()
+        results = {'config': config, 'stages': asyncio.run(run(args, server))}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['comparison'] = compare(results, json.load(f), args.tolerance)
+    print(json.dumps(results, indent=2))
+    if results.get('comparison', {}).get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
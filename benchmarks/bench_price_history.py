@@ -0,0 +1,138 @@
+"""
+Benchmark price-history aggregates: write overhead, search sorted by them, and incremental/backfill parity.
+
+    python -m benchmarks.bench_price_history --rows 200000 --zips 500 --rounds 5
+
+On a scratch SQLite database, --rows listings are stored and then re-stored
+--rounds times with --changed of them at a new price (mostly drops), which
+writes history rows and updates the aggregates incrementally. Reported:
+
+- rounds: seconds and history rows per round
+- search: first-page latency of a stored search sorted by drop_pct and by
+  last drop, against the same ranking computed from price_history with
+  window functions at query time
+- mismatches: properties whose incrementally kept aggregates differ from a
+  backfill over their history; the script exits non-zero if there are any
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROPERTY_TYPES = ['single_family', 'condo', 'townhouse', 'multi_family']
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run(args) -> dict:
+    from sqlalchemy import func, select, update
+    from app.database import AsyncSessionLocal, engine, init_db
+    from app.models import Property
+    from app.schemas import PropertyFilter
+    from app.services.listings import Listing
+    from app.services.persistence import upsert_properties
+    from app.services.price_history import PRICE_STAT_COLUMNS, _history_aggregates, backfill_price_stats
+    from app.services.search import search_stored
+
+    await init_db()
+    rng = random.Random(args.seed)
+    listings = []
+    for i in range(args.rows):
+        price = rng.uniform(100_000, 2_000_000)
+        listings.append(Listing(
+            address=f"{i} Benchmark Ave", zip_code=f"{rng.randrange(args.zips):05d}",
+            property_type=rng.choice(PROPERTY_TYPES), price=price, square_feet=rng.uniform(500, 4000),
+            days_on_market=rng.randint(0, 300), price_drops=0, owner_status='owner-occupied',
+            tax_assessed_value=price, listing_agent='', motivation_score=float(rng.randrange(100)),
+            suggested_offer=price * 0.85, estimated_roi=rng.uniform(-20, 40),
+        ))
+    start = time.perf_counter()
+    history = await upsert_properties(engine, listings)
+    results = {'rows': args.rows, 'initial': {'seconds': round(time.perf_counter() - start, 3), 'history_rows': history}}
+
+    rounds = []
+    for _ in range(args.rounds):
+        for p in rng.sample(listings, args.changed):
+            p.price = round(p.price * (rng.uniform(0.9, 0.99) if rng.random() < 0.8 else rng.uniform(1.01, 1.05)), 2)
+        start = time.perf_counter()
+        history = await upsert_properties(engine, listings)
+        rounds.append({'seconds': round(time.perf_counter() - start, 3), 'history_rows': history})
+    results['rounds'] = rounds
+
+    async def timed(fn):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - start)
+        return {'p50_ms': round(percentile(samples, 50) * 1000, 2), 'p99_ms': round(percentile(samples, 99) * 1000, 2)}
+
+    zip_codes = [f"{z:05d}" for z in rng.sample(range(args.zips), min(args.query_zips, args.zips))]
+    search = {}
+    async with AsyncSessionLocal() as db:
+        for sort in ('drop_pct', 'last_drop'):
+            filters = PropertyFilter(zip_codes=zip_codes, mode='stored', sort=sort)
+            search[sort] = await timed(lambda: search_stored(db, filters, limit=args.page_size))
+
+        aggregates = _history_aggregates().subquery()
+        rescan_pct = (aggregates.c.first_price - Property.price) * 100 / aggregates.c.first_price
+
+        async def rescan():
+            stmt = (
+                select(Property.id, rescan_pct.label('drop_pct'))
+                .join(aggregates, aggregates.c.property_id == Property.id)
+                .where(Property.zip_code.in_(zip_codes), aggregates.c.drop_count > 0)
+                .order_by(rescan_pct.desc(), Property.id.desc())
+                .limit(args.page_size)
+            )
+            return (await db.execute(stmt)).all()
+
+        search['drop_pct_from_history'] = await timed(rescan)
+    results['search'] = search
+
+    # Clear the aggregates and rebuild them from history, then compare
+    stat_columns = [getattr(Property, column) for column in PRICE_STAT_COLUMNS]
+    async with engine.connect() as conn:
+        kept = {row[0]: tuple(row[1:]) for row in (await conn.execute(select(Property.id, *stat_columns))).all()}
+    async with engine.begin() as conn:
+        await conn.execute(update(Property).values({column: None for column in PRICE_STAT_COLUMNS}))
+        start = time.perf_counter()
+        filled = await conn.run_sync(backfill_price_stats)
+        results['backfill'] = {'seconds': round(time.perf_counter() - start, 3), 'properties': filled}
+    async with engine.connect() as conn:
+        rebuilt = {row[0]: tuple(row[1:]) for row in (await conn.execute(select(Property.id, *stat_columns))).all()}
+        results['dropped'] = await conn.scalar(select(func.count()).where(Property.drop_count > 0))
+    results['mismatches'] = sum(kept[property_id] != values for property_id, values in rebuilt.items())
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--zips', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--changed', type=int, default=2000, help='listings repriced per round')
+    parser.add_argument('--query-zips', type=int, default=100)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='propai-price-history-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if results['mismatches']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
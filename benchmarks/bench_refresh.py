@@ -0,0 +1,104 @@
+"""
+Benchmark repeat refreshes of many ZIPs with change detection: a cold pass, an unchanged pass and a pass with a few changed pages.
+
+    python -m benchmarks.bench_refresh --zips 200 --changed 0.01
+
+Pages are the saved fixtures with the ZIP code substituted, replayed without
+network. With --etag the replay answers revalidations with 304 Not Modified,
+otherwise every page body is re-sent and compared by hash.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+async def run(args) -> dict:
+    from app.database import AsyncSessionLocal, engine, init_db
+    from app.services.changes import SnapshotStore
+    from app.services.ingest import refresh_listings
+    from app.services.scraper import FetchedPage, PropertyScraper
+    from app.services import ingest
+
+    templates = {source: (FIXTURES / f"{source}_07030.html").read_text() for source in ('zillow', 'redfin', 'realtor')}
+    zip_codes = [f"{10000 + i:05d}" for i in range(args.zips)]
+    pages = {
+        # Realtor addresses carry no ZIP, so make the town unique too
+        (source, zip_code): template.replace('07030', zip_code).replace('Hoboken', f'Hoboken-{zip_code}')
+        for zip_code in zip_codes for source, template in templates.items()
+    }
+
+    async def replay(url, max_retries=3, validators=None, source=None):
+        source = next(s for s in templates if s in url)
+        zip_code = re.search(r'/(\d{5})', url).group(1)
+        body = pages[(source, zip_code)]
+        etag = f'"{hashlib.md5(body.encode()).hexdigest()}"' if args.etag else None
+        if etag and validators and validators.get('If-None-Match') == etag:
+            return FetchedPage(None, not_modified=True)
+        return FetchedPage(body, etag)
+
+    written = []
+    upsert = ingest.upsert_properties
+
+    async def counting_upsert(engine, properties, batch_size=None, **kwargs):
+        written.append(len(properties))
+        return await upsert(engine, properties, batch_size, **kwargs)
+
+    ingest.upsert_properties = counting_upsert
+
+    await init_db()
+    scraper = PropertyScraper(snapshots=SnapshotStore(engine))
+    scraper._fetch_response = replay
+    await scraper.start()
+
+    rng = random.Random(args.seed)
+    results = {}
+    try:
+        for label in ('cold', 'unchanged', 'changed'):
+            if label == 'changed':
+                for zip_code in rng.sample(zip_codes, max(1, int(len(zip_codes) * args.changed))):
+                    body = pages[('redfin', zip_code)]
+                    match = re.search(r'"price": (\d+)', body)
+                    pages[('redfin', zip_code)] = body[:match.start(1)] + str(int(match.group(1)) - 5000) + body[match.end(1):]
+            before = dict(scraper.change_stats)
+            written.clear()
+            start = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                listings = await refresh_listings(scraper, db, engine, zip_codes)
+            results[label] = {
+                'seconds': round(time.perf_counter() - start, 3),
+                'listings': len(listings),
+                'written': sum(written),
+                **{key: value - before[key] for key, value in scraper.change_stats.items()},
+            }
+    finally:
+        await scraper.close()
+        await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--zips', type=int, default=200)
+    parser.add_argument('--changed', type=float, default=0.01, help='fraction of ZIPs with one price change')
+    parser.add_argument('--etag', action='store_true')
+    parser.add_argument('--seed', type=int, default=13)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='propai-refresh-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault('SCRAPER_CACHE_TTL', '0')
+    os.environ.setdefault('SCRAPER_RATE_PER_HOST', '100000')
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
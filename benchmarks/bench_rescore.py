@@ -0,0 +1,134 @@
+"""
+Benchmark applying new scoring weights from property_features against recomputing scores from stored listings.
+
+    python -m benchmarks.bench_rescore --rows 200000 --zips 500 --sweep 20
+
+On a scratch SQLite database seeded with --rows scored properties and their
+features:
+
+- recompute: what new weights cost without the feature table, short of
+  re-scraping: read every stored listing, rebuild comps, score and write
+- apply: rescoring.apply_weights, one pass over property_features
+- sweep: rescoring.sweep_weights over --sweep weight sets, writing nothing
+
+Exits non-zero if any score written by apply differs from recompute's.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROPERTY_TYPES = ['single_family', 'condo', 'townhouse', 'multi_family']
+
+
+def make_listings(rows: int, zips: int, seed: int):
+    from app.services.listings import Listing
+
+    rng = random.Random(seed)
+    listings = []
+    for i in range(rows):
+        price = rng.uniform(100_000, 2_000_000)
+        listings.append(Listing(
+            address=f"{i} Benchmark Ave",
+            zip_code=f"{rng.randrange(zips):05d}",
+            property_type=rng.choice(PROPERTY_TYPES),
+            price=price,
+            square_feet=rng.uniform(500, 4000),
+            days_on_market=rng.randint(0, 300),
+            price_drops=rng.randint(0, 4),
+            owner_status=rng.choice(['absentee', 'owner-occupied']),
+            tax_assessed_value=price * rng.uniform(0.7, 1.2),
+            listing_agent='',
+            pre_foreclosure=rng.random() < 0.05,
+        ))
+    return listings
+
+
+async def run(args) -> dict:
+    from sqlalchemy import select
+    from app.database import engine, init_db
+    from app.models import Property
+    from app.services.comps import CompsIndex
+    from app.services.listings import Listing
+    from app.services.persistence import upsert_properties
+    from app.services.rescoring import apply_weights, sweep_weights
+    from app.services.scoring import DEFAULT_WEIGHTS, SCORE_COLUMNS, listing_features, score_properties
+
+    await init_db()
+    listings = make_listings(args.rows, args.zips, args.seed)
+    comp_stats = CompsIndex.from_properties(listings).comp_stats(listings)
+    score_properties(listings, comp_stats)
+    await upsert_properties(engine, listings, features=listing_features(listings, comp_stats))
+
+    rng = random.Random(args.seed + 1)
+    new_weights = DEFAULT_WEIGHTS.updated({'absentee_points': 35, 'price_drop_points': 5, 'offer_ratio': 0.8})
+    results = {'rows': args.rows}
+
+    # Recompute from the stored listings, as weights changes needed before
+    # (pre_foreclosure is not a properties column, so it comes from memory)
+    pre_foreclosure = {p.address: p.pre_foreclosure for p in listings}
+    start = time.perf_counter()
+    async with engine.connect() as conn:
+        stored = [Listing(**row, pre_foreclosure=pre_foreclosure[row['address']]) for row in (await conn.execute(
+            select(Property.address, Property.zip_code, Property.property_type, Property.price, Property.square_feet,
+                   Property.days_on_market, Property.price_drops, Property.owner_status, Property.tax_assessed_value,
+                   Property.listing_agent)
+        )).mappings()]
+        comps = await CompsIndex.from_db(conn)
+    score_properties(stored, comps.comp_stats(stored), new_weights)
+    await upsert_properties(engine, stored)
+    seconds = time.perf_counter() - start
+    results['recompute'] = {'seconds': round(seconds, 3), 'rows_per_s': round(len(stored) / seconds)}
+    expected = {p.address: tuple(getattr(p, name) for name in SCORE_COLUMNS) for p in stored}
+
+    # Start from the old scores again so apply has real changes to write
+    await upsert_properties(engine, listings)
+    applied = await apply_weights(engine, new_weights)
+    results['apply'] = {'seconds': applied['seconds'], 'rows_per_s': round(applied['rescored'] / applied['seconds'])}
+
+    async with engine.connect() as conn:
+        written = (await conn.execute(select(Property.address, *[getattr(Property, n) for n in SCORE_COLUMNS]))).all()
+    results['mismatches'] = sum(tuple(row[1:]) != expected[row.address] for row in written)
+
+    weight_sets = [
+        DEFAULT_WEIGHTS.updated({
+            'absentee_points': rng.choice([15, 25, 35]),
+            'pre_foreclosure_points': rng.choice([20, 30, 45]),
+            'price_drop_points': rng.choice([5, 10, 15]),
+            'long_listing_days': rng.choice([60, 90, 120]),
+        })
+        for _ in range(args.sweep)
+    ]
+    swept = await sweep_weights(engine, weight_sets, top=20)
+    results['sweep'] = {
+        'weight_sets': args.sweep,
+        'seconds': swept['seconds'],
+        'ms_per_set': round(swept['seconds'] / max(1, args.sweep) * 1000, 1),
+    }
+    results['apply_speedup'] = round(results['recompute']['seconds'] / results['apply']['seconds'], 1)
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--zips', type=int, default=500)
+    parser.add_argument('--sweep', type=int, default=20, help='weight sets in the what-if sweep')
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='propai-rescore-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if results['mismatches']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
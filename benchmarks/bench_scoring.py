@@ -0,0 +1,96 @@
+"""
+Check PropertyScorer.score_batch against the scalar scoring methods and time both.
+
+    python -m benchmarks.bench_scoring --rows 500000
+
+Exits non-zero if any vectorized result differs from the scalar result.
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.scoring import PropertyScorer, SCORE_COLUMNS, comp_stats_from_lists
+
+
+def make_rows(n: int, seed: int):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        sqft = rng.choice([0, 0, rng.randint(400, 5000), rng.uniform(400, 5000)])
+        price = rng.choice([0, rng.randint(50_000, 2_000_000), rng.uniform(50_000, 2_000_000)])
+        rows.append({
+            'price': price,
+            'square_feet': sqft,
+            'days_on_market': rng.randint(0, 400),
+            'price_drops': rng.choice([-1, 0, 0, 1, 2, 3, 5]),
+            'tax_assessed_value': rng.choice([0, rng.uniform(30_000, 2_500_000)]),
+            'owner_status': rng.choice(['absentee', 'Absentee', 'owner-occupied', 'unknown', '']),
+            'pre_foreclosure': rng.choice([False, False, False, True]),
+        })
+    return rows
+
+
+def make_comps(rows, seed: int, share: float = 0.3):
+    rng = random.Random(seed + 1)
+    comps = []
+    for _ in rows:
+        if rng.random() < share:
+            comps.append([
+                {'price': rng.uniform(50_000, 2_000_000), 'square_feet': rng.choice([0, rng.uniform(400, 5000)])}
+                for _ in range(rng.randint(1, 8))
+            ])
+        else:
+            comps.append([])
+    return comps
+
+
+def scalar_scores(scorer, rows, comps):
+    out = {name: np.empty(len(rows)) for name in SCORE_COLUMNS}
+    for i, (row, row_comps) in enumerate(zip(rows, comps)):
+        out['motivation_score'][i] = scorer.calculate_motivation_score(row)
+        out['suggested_offer'][i] = scorer.calculate_suggested_offer(row, row_comps)
+        out['estimated_roi'][i] = scorer.estimate_roi(row, row_comps)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.seed)
+    comps = make_comps(rows, args.seed)
+    frame = pd.DataFrame(rows)
+    scorer = PropertyScorer(None)
+
+    start = time.perf_counter()
+    expected = scalar_scores(scorer, rows, comps)
+    scalar_s = time.perf_counter() - start
+
+    stats = comp_stats_from_lists(comps)
+    start = time.perf_counter()
+    actual = scorer.score_batch(frame, stats)
+    batch_s = time.perf_counter() - start
+
+    mismatches = {
+        name: int(np.count_nonzero(expected[name] != actual[name]))
+        for name in SCORE_COLUMNS
+    }
+    print(json.dumps({
+        'rows': args.rows,
+        'scalar_seconds': round(scalar_s, 3),
+        'score_batch_seconds': round(batch_s, 3),
+        'speedup': round(scalar_s / batch_s, 1),
+        'mismatches': mismatches,
+    }, indent=2))
+    if any(mismatches.values()):
+        raise SystemExit("score_batch differs from the scalar scoring methods")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark stored-mode search: first-page and deep-page latency across many ZIPs on a scratch SQLite database.
+
+    python -m benchmarks.bench_search --rows 500000 --zips 1000 --query-zips 300
+
+The "naive" column is a single zip_code IN (...) ORDER BY motivation_score
+query, for comparison with the per-ZIP index walk used by search_stored.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+PROPERTY_TYPES = ['single_family', 'condo', 'townhouse', 'multi_family']
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def seed_database(rows: int, zips: int, seed: int):
+    from app.database import engine, init_db
+    from app.services.listings import Listing
+    from app.services.persistence import upsert_properties
+
+    await init_db()
+    rng = random.Random(seed)
+    batch = []
+    for i in range(rows):
+        price = rng.uniform(100_000, 2_000_000)
+        batch.append(Listing(
+            address=f"{i} Benchmark Ave",
+            zip_code=f"{rng.randrange(zips):05d}",
+            property_type=rng.choice(PROPERTY_TYPES),
+            price=price,
+            square_feet=rng.uniform(500, 4000),
+            days_on_market=rng.randint(0, 300),
+            price_drops=rng.randint(0, 4),
+            owner_status=rng.choice(['absentee', 'owner-occupied']),
+            tax_assessed_value=price * rng.uniform(0.7, 1.2),
+            listing_agent='',
+            motivation_score=float(rng.choice([0, 15, 20, 35, 45, 60, 65, 80])),
+            suggested_offer=price * 0.85,
+            estimated_roi=rng.uniform(-20, 40),
+        ))
+        if len(batch) == 20_000:
+            await upsert_properties(engine, batch)
+            batch = []
+    if batch:
+        await upsert_properties(engine, batch)
+
+
+async def run(args) -> dict:
+    from sqlalchemy import select
+    from app.database import AsyncSessionLocal, engine
+    from app.models import Property
+    from app.schemas import PropertyFilter
+    from app.services.search import search_stored
+
+    await seed_database(args.rows, args.zips, args.seed)
+    rng = random.Random(args.seed + 1)
+
+    async def timed(fn, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await fn()
+            samples.append(time.perf_counter() - start)
+        return {'p50_ms': round(percentile(samples, 50) * 1000, 2), 'p99_ms': round(percentile(samples, 99) * 1000, 2)}
+
+    results = {}
+    async with AsyncSessionLocal() as db:
+        for label, extra in (('score_only', {}), ('filtered', {'property_type': 'condo', 'max_price': 900_000})):
+            filters = PropertyFilter(
+                zip_codes=[f"{z:05d}" for z in rng.sample(range(args.zips), args.query_zips)], **extra
+            )
+
+            async def first_page():
+                return await search_stored(db, filters, limit=args.page_size)
+
+            cursors = []
+            page = await first_page()
+            for _ in range(args.pages):
+                if not page['next_cursor']:
+                    break
+                cursors.append(page['next_cursor'])
+                page = await search_stored(db, filters, limit=args.page_size, cursor=page['next_cursor'])
+
+            async def deep_page():
+                return await search_stored(db, filters, limit=args.page_size, cursor=cursors[-1])
+
+            async def naive():
+                stmt = select(Property).where(Property.zip_code.in_(filters.zip_codes))
+                if extra:
+                    stmt = stmt.where(Property.property_type == extra['property_type'], Property.price <= extra['max_price'])
+                stmt = stmt.order_by(Property.motivation_score.desc(), Property.id.desc()).limit(args.page_size)
+                return (await db.execute(stmt)).all()
+
+            results[label] = {
+                'first_page': await timed(first_page, args.repeat),
+                f'page_{len(cursors) + 1}': await timed(deep_page, args.repeat) if cursors else None,
+                'naive_first_page': await timed(naive, max(1, args.repeat // 5)),
+            }
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--zips', type=int, default=1000)
+    parser.add_argument('--query-zips', type=int, default=300)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='propai-search-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
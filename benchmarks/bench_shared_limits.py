@@ -0,0 +1,146 @@
+"""
+Check that several scraper processes share one per-host rate limit and page cache with SCRAPER_COORDINATION=sqlite.
+
+    python -m benchmarks.bench_shared_limits --workers 4 --rate 4 --burst 2 --zips 8
+
+Starts benchmarks/fixture_server.py, then runs --workers scraper processes
+at once against it, like uvicorn workers on one machine, first with
+SCRAPER_COORDINATION=local and then with sqlite. Two phases per mode:
+
+- rate: each worker scrapes its own --zips ZIPs, so nothing is shared but
+  the rate limit
+- dedup: every worker scrapes the same --zips ZIPs at the same moment
+
+For each source the fixture server's arrival times give the peak number of
+requests in any --window seconds, against the limit burst + rate * window,
+and the request counts per page give how many pages were fetched more than
+once. Exits non-zero if, with sqlite, any source goes over the limit (one
+request of slack for timing jitter) or any page is fetched twice.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fixture_server import FixtureServer
+
+
+async def worker(zip_codes, start_at: float):
+    from app.services.scraper import PropertyScraper
+
+    async with PropertyScraper() as scraper:
+        # Every worker has imported and connected by now; start together
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        started = time.perf_counter()
+        listings = await scraper.scrape_all_sources(zip_codes)
+        print(json.dumps({
+            'listings': len(listings),
+            'seconds': round(time.perf_counter() - started, 3),
+            'cache': scraper.cache.stats(),
+        }))
+
+
+def peak_in_window(arrivals, window: float) -> int:
+    arrivals = sorted(arrivals)
+    peak, start = 0, 0
+    for end, arrived in enumerate(arrivals):
+        while arrived - arrivals[start] >= window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+async def run_phase(args, server: FixtureServer, mode: str, phase: str, zip_sets, workdir: str) -> dict:
+    for arrivals in server.arrivals.values():
+        arrivals.clear()
+    server.page_requests.clear()
+
+    env = dict(os.environ)
+    env.update(server.environment())
+    env.update({
+        'SCRAPER_COORDINATION': mode,
+        # Fresh files per phase, so no phase starts with another's cached pages
+        'SCRAPER_COORDINATION_PATH': os.path.join(workdir, f"{mode}-{phase}-coordination.db"),
+        'SCRAPER_CACHE_PATH': os.path.join(workdir, f"{mode}-{phase}-cache.db"),
+        'SCRAPER_CACHE_TTL': '300',
+        'SCRAPER_RATE_PER_HOST': str(args.rate),
+        'SCRAPER_BURST_PER_HOST': str(args.burst),
+        'PROPAI_EXECUTOR': 'inline',
+        'METRICS_ENABLED': 'false',
+    })
+    start_at = time.time() + args.startup
+    processes = [
+        await asyncio.create_subprocess_exec(
+            sys.executable, '-m', 'benchmarks.bench_shared_limits', '--worker', json.dumps(zip_codes),
+            '--start-at', str(start_at), env=env, stdout=asyncio.subprocess.PIPE,
+        )
+        for zip_codes in zip_sets
+    ]
+    outputs = [await process.communicate() for process in processes]
+    if any(process.returncode for process in processes):
+        raise RuntimeError(f"A {mode} worker failed")
+    workers = [json.loads(stdout.decode().strip().splitlines()[-1]) for stdout, _ in outputs]
+
+    limit = args.burst + args.rate * args.window
+    sources = {}
+    for source, arrivals in server.arrivals.items():
+        span = max(arrivals) - min(arrivals) if len(arrivals) > 1 else 0.0
+        sources[source] = {
+            'requests': len(arrivals),
+            'requests_per_s': round((len(arrivals) - 1) / span, 2) if span else None,
+            f'peak_in_{args.window:g}s': peak_in_window(arrivals, args.window),
+            'limit': limit,
+        }
+    return {
+        'sources': sources,
+        'pages_fetched_twice': sum(count - 1 for count in server.page_requests.values() if count > 1),
+        'over_limit': any(s[f'peak_in_{args.window:g}s'] > limit + 1 for s in sources.values()),
+        'worker_seconds': max(w['seconds'] for w in workers),
+        'shared_waits': sum(w['cache']['shared_waits'] for w in workers),
+    }
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix='propai-shared-')
+    own = [[f"{20000 + w * args.zips + i:05d}" for i in range(args.zips)] for w in range(args.workers)]
+    same = [[f"{30000 + i:05d}" for i in range(args.zips)]] * args.workers
+    results = {'workers': args.workers, 'rate': args.rate, 'burst': args.burst}
+    async with FixtureServer(args.port, latency=args.latency) as server:
+        for mode in ('local', 'sqlite'):
+            results[mode] = {
+                'rate': await run_phase(args, server, mode, 'rate', own, workdir),
+                'dedup': await run_phase(args, server, mode, 'dedup', same, workdir),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=4.0, help='SCRAPER_RATE_PER_HOST')
+    parser.add_argument('--burst', type=float, default=2.0, help='SCRAPER_BURST_PER_HOST')
+    parser.add_argument('--zips', type=int, default=8, help='ZIPs per worker')
+    parser.add_argument('--window', type=float, default=2.0, help='seconds per rate window')
+    parser.add_argument('--latency', type=float, default=0.05, help='fixture server response time')
+    parser.add_argument('--startup', type=float, default=5.0, help='seconds allowed for workers to start')
+    parser.add_argument('--port', type=int, default=8830)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(worker(json.loads(args.worker), args.start_at))
+        return
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    sqlite = results['sqlite']
+    if sqlite['rate']['over_limit'] or sqlite['dedup']['over_limit'] or sqlite['dedup']['pages_fetched_twice']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
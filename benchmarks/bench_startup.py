@@ -0,0 +1,136 @@
+"""
+Measure cold start: import time of app.main, and time from process start to the first HTTP response.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --binary dist/PropAIScout
+
+Every run is a fresh interpreter against a fresh SQLite file. "imports" is
+the wall time of `import app.main`, plus the heaviest modules from
+python -X importtime. "first_response" starts uvicorn and polls GET / until
+it answers. It runs twice: once creating the schema during startup, and once
+after a separate `python -m app.migrate` migration step with
+DB_INIT_ON_STARTUP=false. --binary times a PyInstaller build
+the same way, from launch to first response on --port.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Reported individually from -X importtime when they are loaded at startup
+WATCHED = ['fastapi', 'uvicorn', 'sqlalchemy', 'aiohttp', 'pydantic', 'numpy', 'pandas', 'pyarrow', 'openai',
+           'bs4', 'fake_useragent']
+
+
+def fresh_env(workdir: str, **extra) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+               SCHEDULER_ENABLED='false', PYTHONDONTWRITEBYTECODE='1', **extra)
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    return env
+
+
+def import_time(runs: int) -> dict:
+    seconds = []
+    modules = {}
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp(prefix='propai-startup-')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             'import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)'],
+            cwd=ROOT, env=fresh_env(workdir), capture_output=True, text=True, check=True,
+        )
+        seconds.append(float(result.stdout.strip()))
+        # "import time: self [us] | cumulative | imported package", indented by nesting depth
+        for match in re.finditer(r'import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)', result.stderr):
+            name = match.group(3)
+            if name in WATCHED or name.startswith('app'):
+                modules.setdefault(name, []).append(int(match.group(1)) / 1e6)
+    return {
+        'seconds': round(statistics.median(seconds), 3),
+        'runs': [round(s, 3) for s in seconds],
+        'loaded_at_import': {
+            name: round(statistics.median(values), 3)
+            for name, values in sorted(modules.items(), key=lambda item: -statistics.median(item[1]))
+            if name in WATCHED or statistics.median(values) >= 0.005
+        },
+        'not_loaded': [name for name in WATCHED if name not in modules],
+    }
+
+
+def wait_for_response(process: subprocess.Popen, url: str, timeout: float) -> float:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError(f"no response from {url} within {timeout}s")
+
+
+def first_response(command, port: int, env: dict, timeout: float) -> float:
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return wait_for_response(process, f"http://127.0.0.1:{port}/", timeout) - start
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def server_start(runs: int, port: int, timeout: float) -> dict:
+    command = [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning']
+    results = {}
+    for label in ('schema_at_startup', 'migrated_beforehand'):
+        seconds = []
+        for _ in range(runs):
+            workdir = tempfile.mkdtemp(prefix='propai-startup-')
+            env = fresh_env(workdir)
+            if label == 'migrated_beforehand':
+                subprocess.run([sys.executable, '-m', 'app.migrate'], cwd=ROOT, env=env, check=True,
+                               capture_output=True)
+                env['DB_INIT_ON_STARTUP'] = 'false'
+            seconds.append(first_response(command, port, env, timeout))
+        results[label] = {'seconds': round(statistics.median(seconds), 3), 'runs': [round(s, 3) for s in seconds]}
+    return results
+
+
+def binary_start(binary: str, runs: int, port: int, timeout: float) -> dict:
+    seconds = []
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp(prefix='propai-startup-')
+        seconds.append(first_response([os.path.abspath(binary)], port, fresh_env(workdir, PORT=str(port)), timeout))
+    return {'seconds': round(statistics.median(seconds), 3), 'runs': [round(s, 3) for s in seconds]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8797)
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for a server to answer')
+    parser.add_argument('--binary', help='packaged executable to time as well')
+    args = parser.parse_args()
+
+    results = {
+        'imports': import_time(args.runs),
+        'first_response': server_start(args.runs, args.port, args.timeout),
+    }
+    if args.binary:
+        results['binary_first_response'] = binary_start(args.binary, args.runs, args.port, args.timeout)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
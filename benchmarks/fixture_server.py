@@ -0,0 +1,150 @@
+"""
+Local stand-in for the listing sites, serving the recorded pages in benchmarks/fixtures.
+
+    python -m benchmarks.fixture_server --latency 0.2 --rate-limited 0.05 --errors 0.01
+
+Each source listens on its own port, so the scraper's per-host limits and
+connection pools behave as they do against the real sites. A page is the
+saved 07030 fixture with the requested ZIP substituted. Responses are delayed
+by --latency seconds (jittered), and a seeded fraction is answered with 429,
+500 or not at all (--hangs). Run on its own, it prints the
+SCRAPER_URL_TEMPLATE_* settings that point the app at it.
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+# Same paths as the real sites, so URL templates only differ by host
+SOURCE_PATHS = {
+    'zillow': '/homes/{zip_code}_rb/',
+    'redfin': '/zipcode/{zip_code}',
+    'realtor': '/realestateandhomes-search/{zip_code}',
+}
+
+
+class FixtureServer:
+    """
+    Serves fixture pages for each source on consecutive ports from base_port
+    """
+
+    def __init__(self, base_port: int = 8810, latency: float = 0.0, rate_limited: float = 0.0, errors: float = 0.0,
+                 hangs: float = 0.0, seed: int = 0, sources: Sequence[str] = tuple(SOURCE_PATHS)):
+        self.ports = {source: base_port + i for i, source in enumerate(sources)}
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.errors = errors
+        self.hangs = hangs
+        self.templates = {source: (FIXTURES / f"{source}_07030.html").read_text() for source in sources}
+        self.stats = {source: {'requests': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0, 'hangs': 0} for source in sources}
+        # Arrival times (time.monotonic()) per source and request counts per (source, zip_code)
+        self.arrivals: Dict[str, List[float]] = {source: [] for source in sources}
+        self.page_requests: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._runners = []
+        self._closing = asyncio.Event()
+
+    def url_template(self, source: str) -> str:
+        return f"http://127.0.0.1:{self.ports[source]}{SOURCE_PATHS[source]}"
+
+    def environment(self) -> Dict[str, str]:
+        """
+        Settings that point the scraper's sources at this server
+        """
+        return {f"SCRAPER_URL_TEMPLATE_{source.upper()}": self.url_template(source) for source in self.ports}
+
+    def page(self, source: str, zip_code: str) -> str:
+        # Realtor addresses carry no ZIP, so make the town unique too
+        return self.templates[source].replace('07030', zip_code).replace('Hoboken', f'Hoboken-{zip_code}')
+
+    def _handler(self, source: str):
+        from aiohttp import web
+
+        stats = self.stats[source]
+        arrivals = self.arrivals[source]
+
+        async def handle(request):
+            stats['requests'] += 1
+            arrivals.append(time.monotonic())
+            match = re.search(r'(\d{5})', request.path)
+            if match is None:
+                raise web.HTTPNotFound()
+            self.page_requests[source, match.group(1)] += 1
+            roll = self._rng.random()
+            if self.latency:
+                await asyncio.sleep(self.latency * self._rng.uniform(0.5, 1.5))
+            if roll < self.hangs:
+                stats['hangs'] += 1
+                await self._closing.wait()
+                raise web.HTTPServiceUnavailable()
+            roll -= self.hangs
+            if roll < self.rate_limited:
+                stats['rate_limited'] += 1
+                return web.Response(status=429, text='Too Many Requests')
+            roll -= self.rate_limited
+            if roll < self.errors:
+                stats['errors'] += 1
+                return web.Response(status=500, text='Internal Server Error')
+            stats['ok'] += 1
+            return web.Response(text=self.page(source, match.group(1)), content_type='text/html')
+
+        return handle
+
+    async def start(self):
+        from aiohttp import web
+
+        for source, port in self.ports.items():
+            app = web.Application()
+            app.router.add_get('/{tail:.*}', self._handler(source))
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, '127.0.0.1', port).start()
+            self._runners.append(runner)
+        return self
+
+    async def close(self):
+        # Release hanging requests so shutdown does not wait on them
+        self._closing.set()
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+async def serve(args):
+    server = await FixtureServer(args.port, args.latency, args.rate_limited, args.errors, args.hangs, args.seed).start()
+    for name, value in server.environment().items():
+        print(f"{name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8810, help='first port; sources use consecutive ports')
+    parser.add_argument('--latency', type=float, default=0.0, help='mean response time in seconds')
+    parser.add_argument('--rate-limited', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--errors', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--hangs', type=float, default=0.0, help='fraction of requests never answered')
+    parser.add_argument('--seed', type=int, default=0)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import PyInstaller.__main__
 import os
 import shutil
+import sys
 
 def build_app():
     # Clean previous builds
@@ -13,14 +14,20 @@ def build_app():
     print("Building Frontend...")
     os.system('cd frontend && npm run build')
 
-    # Backend build command
+    # Backend build command. --onefile unpacks the whole bundle into a temp
+    # directory on every launch; --onedir (python build_app.py --onedir)
+    # starts much faster and suits containers and autoscaling.
     print("Building Backend...")
+    onedir = '--onedir' in sys.argv
     PyInstaller.__main__.run([
-        'backend/app/main.py',
+        'start.py',
         '--name=PropAIScout',
-        '--onefile',
-        '--add-data=backend/app/services:services',
+        '--onedir' if onedir else '--onefile',
         '--add-data=frontend/build:frontend/build',
+        # Loaded by name at runtime, so analysis cannot see them
+        '--hidden-import=aiosqlite',
+        '--hidden-import=sqlalchemy.dialects.sqlite.aiosqlite',
+        '--collect-data=fake_useragent',
         '--hidden-import=uvicorn.logging',
         '--hidden-import=uvicorn.loops',
         '--hidden-import=uvicorn.loops.auto',
@@ -34,6 +41,8 @@ def build_app():
     ])
 
     # Copy configuration files
-    shutil.copy('backend/app/.env', 'dist/.env')
+    env_file = 'backend/app/.env' if os.path.exists('backend/app/.env') else '.env'
+    if os.path.exists(env_file):
+        shutil.copy(env_file, 'dist/.env')
     
     print("Build completed! Executable is in the dist folder.")
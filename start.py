@@ -1,4 +1,5 @@
-from backend.app.main import app
+from app.main import app
+import multiprocessing
 import uvicorn
 import os
 from dotenv import load_dotenv
@@ -10,4 +11,7 @@ load_dotenv()
 os.environ["RAPIDAPI_KEY"] = "71aba9fbb6mshf14840260f6b5c7p17980fjsn318cf304588e"
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Executor worker processes re-launch this executable when frozen
+    multiprocessing.freeze_support()
+    # reload needs an import string, which a packaged binary cannot use
+    uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", "8000")))
\ No newline at end of file
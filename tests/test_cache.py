@@ -0,0 +1,26 @@
+import asyncio
+
+from app.services import metrics
+from app.services.cache import PageCache
+
+
+def test_page_cache_lookups_are_published_in_metrics():
+    async def lookups():
+        page_cache = PageCache(ttl=60)
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return '<html></html>'
+
+        await asyncio.gather(*(page_cache.get_or_fetch('zillow:07030', fetch) for _ in range(3)))
+        await page_cache.get_or_fetch('zillow:07030', fetch)
+        return page_cache.stats()
+
+    before = dict(metrics.CACHE_LOOKUPS._series)
+    stats = asyncio.run(lookups())
+    counted = {result: metrics.CACHE_LOOKUPS._series.get((result,), 0) - before.get((result,), 0)
+               for result in ('hit', 'miss', 'coalesced')}
+    assert counted == {'hit': stats['hits'], 'miss': stats['misses'], 'coalesced': stats['coalesced']} == \
+        {'hit': 1, 'miss': 1, 'coalesced': 2}
+    assert 'propai_page_cache_lookups_total{result="hit"}' in metrics.render()
+    assert metrics.CACHE_IN_FLIGHT._series.get((), 0) == 0
@@ -0,0 +1,80 @@
+import asyncio
+import random
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Property  # noqa: F401  registers the tables on Base.metadata
+from app.services.comps import CompsIndex
+from app.services.listings import Listing
+from app.services.persistence import upsert_properties
+
+
+def listing(address, square_feet, price, zip_code='07030', property_type='condo'):
+    return Listing(address=address, zip_code=zip_code, price=price, square_feet=square_feet, days_on_market=10,
+                   price_drops=0, property_type=property_type)
+
+
+def test_stored_listing_spelled_differently_is_replaced_by_the_fresh_one(tmp_path):
+    stored = [listing('12 Main Street', 1000, 400000.0)] + [
+        listing(f"{i} Park Ave", 950 + i * 20, 380000.0 + i * 1000) for i in range(1, 6)
+    ]
+    fresh = listing('12 Main St', 1000, 450000.0)
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'comps.db'}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await upsert_properties(engine, stored)
+            async with async_sessionmaker(engine)() as db:
+                return await CompsIndex.from_db(db, ['07030'], extra=[fresh])
+        finally:
+            await engine.dispose()
+
+    index = asyncio.run(main())
+    # The stored "Street" row is dropped for the fresh "St" listing rather than indexed twice
+    assert len(index) == len(stored)
+    assert sorted(index.price.tolist()) == sorted([450000.0] + [p.price for p in stored[1:]])
+
+    # Neither spelling is a comp for the other
+    comps = index.top_k('07030', 'condo', 1000, k=10, exclude_address='12 Main Street')
+    assert [comp['address'] for comp in comps if 'Main' in comp['address']] == []
+    stats = index.comp_stats([fresh], k=10, min_comps=1)
+    assert stats['comp_count'].tolist() == [5.0]
+    assert stats['comp_price_sum'].tolist() == [sum(p.price for p in stored[1:])]
+
+
+def test_top_k_returns_the_nearest_by_square_feet(tmp_path):
+    rng = random.Random(7)
+    properties = [
+        listing(f"{i} Park Ave", rng.randrange(500, 3000), rng.randrange(200, 900) * 1000.0,
+                zip_code=rng.choice(['07030', '07310']), property_type=rng.choice(['condo', 'Single Family']))
+        for i in range(400)
+    ]
+    index = CompsIndex.from_properties(properties)
+
+    for subject in properties[:50]:
+        for k in (1, 5, 12):
+            comps = index.top_k(subject.zip_code, subject.property_type, subject.square_feet, k=k,
+                                exclude_address=subject.address)
+            group = [
+                p for p in properties
+                if p.zip_code == subject.zip_code and p.property_type == subject.property_type
+                and p.address != subject.address and abs(p.square_feet - subject.square_feet) <= subject.square_feet * 0.25
+            ]
+            expected = sorted(abs(p.square_feet - subject.square_feet) for p in group)[:k]
+            distances = [abs(comp['square_feet'] - subject.square_feet) for comp in comps]
+            assert distances == expected
+            assert subject.address not in [comp['address'] for comp in comps]
+
+
+def test_property_types_and_zips_do_not_mix():
+    index = CompsIndex.from_properties([
+        listing('1 Park Ave', 1000, 400000.0),
+        listing('2 Park Ave', 1010, 410000.0, property_type='single-family'),
+        listing('3 Park Ave', 1020, 420000.0, zip_code='07310'),
+    ])
+    assert [comp['address'] for comp in index.top_k('07030', 'Single Family', 1000)] == ['2 Park Ave']
+    assert [comp['address'] for comp in index.top_k('07310', 'condo', 1000)] == ['3 Park Ave']
+    assert index.top_k('10001', 'condo', 1000) == []
@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+import time
+
+from app.services import cache
+from app.services.cache import PageCache, SQLiteCacheBackend
+from app.services.coordination import SharedState, SharedTokenBucket
+
+WORKERS = 4
+RATE = 20.0
+BURST = 2.0
+
+
+def take_tokens(path, count, start_at):
+    """
+    One worker process: draw count tokens from the shared bucket, returning when each was granted
+    """
+    async def main():
+        state = SharedState(path)
+        bucket = SharedTokenBucket(state, 'listings.example.com', RATE, BURST)
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        granted = []
+        for _ in range(count):
+            await bucket.acquire()
+            granted.append(time.time())
+        state.close()
+        return granted
+
+    return asyncio.run(main())
+
+
+def hold_leases(path, until, hold):
+    """
+    One worker process: keep claiming the same lease until `until`, returning the (start, end) of each hold
+    """
+    state = SharedState(path)
+    held = []
+    while time.time() < until:
+        if state.try_lease('zillow:07030', ttl=30):
+            start = time.time()
+            time.sleep(hold)
+            held.append((start, time.time()))
+            state.release('zillow:07030')
+        time.sleep(0.001)
+    state.close()
+    return held
+
+
+def run_workers(target, argument_sets):
+    with multiprocessing.get_context('spawn').Pool(len(argument_sets)) as pool:
+        return pool.starmap(target, argument_sets)
+
+
+def peak_in_window(times, window):
+    times = sorted(times)
+    peak, start = 0, 0
+    for end, at in enumerate(times):
+        while at - times[start] >= window:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+
+def test_rate_limit_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / 'coordination.db')
+    SharedState(path).close()
+    per_worker = 10
+    start_at = time.time() + 5
+    granted = [at for times in run_workers(take_tokens, [(path, per_worker, start_at)] * WORKERS) for at in times]
+
+    total = WORKERS * per_worker
+    window = 0.5
+    # One token of slack for the time between a grant and its timestamp
+    assert peak_in_window(granted, window) <= BURST + RATE * window + 1
+    # Together the workers get no more than the one bucket's rate, not WORKERS times it
+    assert max(granted) - min(granted) >= (total - BURST) / RATE * 0.9
+
+
+def test_a_lease_is_held_by_one_process_at_a_time(tmp_path):
+    path = str(tmp_path / 'coordination.db')
+    SharedState(path).close()
+    until = time.time() + 5 + 1.5
+    holds = run_workers(hold_leases, [(path, until, 0.02)] * WORKERS)
+
+    intervals = sorted(interval for worker in holds for interval in worker)
+    assert sum(1 for worker in holds if worker) > 1
+    for (_, previous_end), (start, _) in zip(intervals, intervals[1:]):
+        assert start >= previous_end
+
+
+def test_lease_is_renewed_while_a_slow_fetch_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'LEASE_TTL', 0.3)
+    path = str(tmp_path / 'coordination.db')
+    holder, other = SharedState(path), SharedState(path)
+    backend = SQLiteCacheBackend(str(tmp_path / 'cache.db'))
+    page_cache = PageCache(backend, ttl=60, shared=holder)
+
+    async def slow_fetch():
+        # Several lease TTLs, as with a 429 backoff and retries
+        claimed = []
+        for _ in range(5):
+            await asyncio.sleep(0.25)
+            claimed.append(other.try_lease('zillow:07030', ttl=0.3))
+        return 'page', claimed
+
+    async def main():
+        return await page_cache.get_or_fetch('zillow:07030', slow_fetch, store=lambda fetched: fetched[0])
+
+    try:
+        _, claimed = asyncio.run(main())
+        assert claimed == [False] * 5
+        assert not other.lease_held('zillow:07030')
+    finally:
+        backend.close()
+        holder.close()
+        other.close()
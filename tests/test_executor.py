@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services import executor
+
+
+def die_once(marker, value):
+    """
+    Kill the worker process the first time it runs for marker, then return value
+    """
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return value
+
+
+def die(value):
+    os._exit(1)
+
+
+def double(values):
+    return [value * 2 for value in values]
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(executor, 'EXECUTOR_KIND', 'process')
+    monkeypatch.setattr(executor, 'EXECUTOR_WORKERS', 2)
+    monkeypatch.setattr(executor, '_executor', None)
+    yield
+    executor.shutdown_executor()
+
+
+def test_a_broken_pool_is_replaced_and_the_call_retried(tmp_path, process_pool, caplog):
+    async def main():
+        first = executor.get_executor()
+        result = await executor.run_cpu(die_once, str(tmp_path / 'died'), 42)
+        return first, result
+
+    with caplog.at_level(logging.ERROR, logger='app.services.executor'):
+        first, result = asyncio.run(main())
+    assert result == 42
+    assert executor.get_executor() is not first
+    assert 'Process pool broke' in caplog.text
+
+
+def test_concurrent_batches_share_one_replacement_pool(tmp_path, process_pool, caplog):
+    async def main():
+        return await asyncio.gather(*(executor.run_cpu(die_once, str(tmp_path / 'died'), i) for i in range(4)))
+
+    with caplog.at_level(logging.ERROR, logger='app.services.executor'):
+        assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert caplog.text.count('Process pool broke') == 1
+
+
+def test_a_call_that_keeps_killing_its_worker_fails_after_one_retry(process_pool, caplog):
+    async def main():
+        with pytest.raises(BrokenProcessPool):
+            await executor.run_cpu(die, 1)
+        # Both pools that call broke were replaced, so the next call runs normally
+        return await executor.map_batched(double, [1, 2, 3], batch_size=2)
+
+    with caplog.at_level(logging.ERROR, logger='app.services.executor'):
+        assert asyncio.run(main()) == [2, 4, 6]
+    # Once for the call and once for its retry; map_batched found a working pool
+    assert caplog.text.count('Process pool broke') == 2
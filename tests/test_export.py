@@ -0,0 +1,52 @@
+import asyncio
+import io
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import Property  # noqa: F401  registers the tables on Base.metadata
+from app.services.data_export import DataExporter
+from app.services.listings import Listing
+from app.services.persistence import upsert_properties
+
+
+def export(tmp_path, export_format):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'export.db'}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await upsert_properties(engine, [
+                Listing(address=f"{i} Park Ave", zip_code='07030', price=100000.0 + i, square_feet=900, days_on_market=i,
+                        price_drops=0, property_type='condo', motivation_score=float(i))
+                for i in range(25)
+            ])
+            chunks = DataExporter.stream_export(async_sessionmaker(engine), export_format, chunk_size=10)
+            return b''.join([chunk async for chunk in chunks])
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_columnar_exports_read_back(tmp_path, export_format):
+    data = export(tmp_path, export_format)
+    if export_format == 'parquet':
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_stream(data).read_all()
+    assert table.num_rows == 25
+    assert table.column('price').type == pa.float64()
+    assert sorted(table.column('days_on_market').to_pylist()) == list(range(25))
+
+
+def test_parquet_is_unavailable_without_its_pyarrow_module(monkeypatch):
+    # None in sys.modules makes the import raise ImportError
+    monkeypatch.setitem(sys.modules, 'pyarrow.parquet', None)
+    assert DataExporter.columnar_available('arrow')
+    assert not DataExporter.columnar_available('parquet')
@@ -0,0 +1,83 @@
+import json
+import logging
+
+import pytest
+
+from app.services.extractor import decode_json_after, extract_script_json, find_script
+from app.services.parsers import parse_realtor, parse_redfin, parse_zillow
+from benchmarks.bench_extractor import CASES, load_page
+
+PARSERS = {'zillow': parse_zillow, 'redfin': parse_redfin, 'realtor': parse_realtor}
+
+
+@pytest.mark.parametrize('scale', [1, 10])
+@pytest.mark.parametrize('source', sorted(CASES))
+def test_fixture_pages_decode_as_the_beautifulsoup_parser_did(source, scale):
+    legacy, fast = CASES[source]
+    html = load_page(source, scale)
+    data = fast(html)
+    assert data is not None
+    assert data == legacy(html)
+
+
+@pytest.mark.parametrize('source', sorted(CASES))
+def test_fixture_pages_parse_to_listings(source):
+    listings = PARSERS[source](load_page(source, 1), '07030')
+    assert listings and all(listing.address and listing.price for listing in listings)
+
+
+def test_marker_outside_a_script_body_is_skipped():
+    html = (
+        '<p>searchPageState</p>'
+        '<script type="text/javascript">var searchPageState = 1;</script>'
+        '<script data-kind="searchPageState" type="application/json">{"not": "it"}</script>'
+        "<script type='application/json'>{\"searchPageState\": {\"ok\": true}}</script>"
+    )
+    assert find_script(html, 'searchPageState') == 'var searchPageState = 1;'
+    assert extract_script_json(html, 'searchPageState', 'application/json') == {'searchPageState': {'ok': True}}
+
+
+def test_type_attribute_spellings():
+    for tag in ('<script type=application/json>', '<script  TYPE = "Application/JSON" >', "<script id=x type='application/json'>"):
+        assert extract_script_json(f'{tag}{{"props": 1}}</script>', '"props":', 'application/json') == {'props': 1}
+
+
+def test_missing_script_or_marker_gives_none():
+    assert find_script('<html><body>no scripts</body></html>', 'searchPageState') is None
+    assert find_script('<script>var other = 1;</script>', 'searchPageState') is None
+    assert extract_script_json('<script type="text/javascript">{"props": 1}</script>', '"props":', 'application/json') is None
+    assert decode_json_after('RF.reactBootstrap({})', 'JSONData:') is None
+
+
+def test_truncated_page_has_no_script():
+    # The page was cut off before the script closed
+    html = '<html><script type="application/json">{"searchPageState": {"cat1": '
+    assert find_script(html, 'searchPageState') is None
+    assert parse_zillow(html, '07030') == []
+
+
+def test_braces_and_quotes_inside_strings():
+    script = 'RF.reactBootstrap({JSONData: {"homes": [{"address": "1 {Main} St", "note": "say \\"}\\" twice"}]}, other: {"x": 1}});'
+    assert decode_json_after(script, 'JSONData:') == {'homes': [{'address': '1 {Main} St', 'note': 'say "}" twice'}]}
+
+
+@pytest.mark.parametrize('text', [
+    'JSONData: {"homes": [{"address": "1 Main St"',
+    'JSONData: {"homes": [1, 2,]}',
+    'JSONData: undefined',
+    'JSONData:',
+])
+def test_malformed_or_truncated_json_raises(text):
+    with pytest.raises(json.JSONDecodeError):
+        decode_json_after(text, 'JSONData:')
+
+
+@pytest.mark.parametrize('source, html', [
+    ('zillow', '<script type="application/json">{"searchPageState": {"cat1": </script>'),
+    ('redfin', '<script>RF.reactBootstrap({JSONData: {"homes": [{"address": </script>'),
+    ('realtor', '<script type="application/json">{"props": {"pageProps": [</script>'),
+])
+def test_parsers_log_and_skip_malformed_json(source, html, caplog):
+    with caplog.at_level(logging.ERROR, logger='app.services.parsers'):
+        assert PARSERS[source](html, '07030') == []
+    assert caplog.records
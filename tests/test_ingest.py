@@ -0,0 +1,68 @@
+import asyncio
+import sqlite3
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.models import PropertyFeatures  # noqa: F401  registers the tables on Base.metadata
+from app.services import executor, ingest
+from app.services.listings import Listing
+
+
+def listings(days):
+    return [
+        Listing(address=f"{i} Park Ave", zip_code='07030', price=300000.0 + i * 1000, square_feet=1000 + i * 10,
+                days_on_market=days + i, price_drops=i % 3, property_type='condo', tax_assessed_value=320000,
+                owner_status='absentee' if i % 2 else 'owner')
+        for i in range(10)
+    ]
+
+
+def refresh_twice(tmp_path, monkeypatch, first, second):
+    """
+    Refresh the listings for `first` days on market, then again for `second`; returns the listings rescored each time
+    """
+    monkeypatch.setattr(executor, 'EXECUTOR_KIND', 'inline')
+    rescored = []
+    score_listings = ingest.score_listings
+
+    async def counting(batch, comp_stats, weights):
+        rescored[-1] += len(batch)
+        return await score_listings(batch, comp_stats, weights)
+
+    monkeypatch.setattr(ingest, 'score_listings', counting)
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ingest.db'}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            for days in (first, second):
+                rescored.append(0)
+                async with async_sessionmaker(engine)() as db:
+                    await ingest.score_and_persist(db, engine, ['07030'], listings(days))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+    return rescored
+
+
+def stored_days(tmp_path):
+    with sqlite3.connect(tmp_path / 'ingest.db') as conn:
+        properties = conn.execute("SELECT days_on_market FROM properties ORDER BY days_on_market").fetchall()
+        features = conn.execute("SELECT days_on_market FROM property_features ORDER BY days_on_market").fetchall()
+    return [days for days, in properties], [days for days, in features]
+
+
+def test_a_day_later_only_the_day_count_is_written(tmp_path, monkeypatch):
+    assert refresh_twice(tmp_path, monkeypatch, 10, 11) == [10, 0]
+    properties, features = stored_days(tmp_path)
+    assert properties == list(range(11, 21))
+    assert features == [float(days) for days in range(11, 21)]
+
+
+def test_crossing_the_long_listing_threshold_rescores(tmp_path, monkeypatch):
+    # Listings at 81..90 days are not long listings; a day later the one at 91 is
+    assert refresh_twice(tmp_path, monkeypatch, 81, 82) == [10, 1]
+    assert stored_days(tmp_path)[0] == list(range(82, 92))
@@ -0,0 +1,127 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import Base
+from app.models import RefreshJob
+from app.services.jobs import JobQueue
+
+
+def run(tmp_path, scenario, engines=1):
+    """
+    Run scenario(*engines) against a fresh refresh_jobs table, one engine per simulated process
+    """
+    async def main():
+        opened = [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}") for _ in range(engines)]
+        try:
+            async with opened[0].begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            return await scenario(*opened)
+        finally:
+            for engine in opened:
+                await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def jobs(tmp_path):
+    with sqlite3.connect(tmp_path / 'jobs.db') as conn:
+        return conn.execute("SELECT zip_code, priority, status, attempts FROM refresh_jobs ORDER BY id").fetchall()
+
+
+async def make_due(engine):
+    async with engine.begin() as conn:
+        await conn.execute(update(RefreshJob).values(run_after=datetime.utcnow() - timedelta(seconds=1)))
+
+
+def test_a_zip_is_queued_once_while_active(tmp_path):
+    async def scenario(engine):
+        queue = JobQueue(engine)
+        queued = [await queue.enqueue('07030'), await queue.enqueue('07030'), await queue.enqueue('10001')]
+        job = await queue.claim()
+        # Running still counts as active
+        queued.append(await queue.enqueue(job.zip_code))
+        await queue.complete(job, listings=12)
+        queued.append(await queue.enqueue(job.zip_code))
+        return queued
+
+    assert run(tmp_path, scenario) == [True, False, True, False, True]
+    assert [(zip_code, status) for zip_code, _, status, _ in jobs(tmp_path)] == [
+        ('07030', 'done'), ('10001', 'queued'), ('07030', 'queued'),
+    ]
+
+
+def test_the_partial_unique_index_rejects_a_second_active_job(tmp_path):
+    run(tmp_path, lambda engine: JobQueue(engine).enqueue('07030'))
+    with sqlite3.connect(tmp_path / 'jobs.db') as conn:
+        conn.execute("INSERT INTO refresh_jobs (zip_code, status) VALUES ('07030', 'done')")
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO refresh_jobs (zip_code, status) VALUES ('07030', 'running')")
+
+
+def test_concurrent_enqueues_from_two_processes_collapse(tmp_path):
+    async def scenario(first, second):
+        queues = [JobQueue(first), JobQueue(second)]
+        return await asyncio.gather(*(queues[i % 2].enqueue('07030') for i in range(6)))
+
+    assert sorted(run(tmp_path, scenario, engines=2)) == [False] * 5 + [True]
+    assert len(jobs(tmp_path)) == 1
+
+
+def test_re_enqueue_only_raises_priority(tmp_path):
+    async def scenario(engine):
+        queue = JobQueue(engine)
+        await queue.enqueue('07030', priority=0)
+        await queue.enqueue('10001', priority=3)
+        await queue.enqueue('07030', priority=5)
+        await queue.enqueue('07030', priority=1)
+        return [(await queue.claim()).zip_code, (await queue.claim()).zip_code]
+
+    assert run(tmp_path, scenario) == ['07030', '10001']
+    assert [priority for _, priority, _, _ in jobs(tmp_path)] == [5, 3]
+
+
+def test_each_job_is_claimed_by_one_worker(tmp_path):
+    async def scenario(first, second):
+        queues = [JobQueue(first), JobQueue(second)]
+        for i in range(5):
+            await queues[0].enqueue(f"0703{i}")
+        return await asyncio.gather(*(queues[i % 2].claim() for i in range(12)))
+
+    claimed = [job for job in run(tmp_path, scenario, engines=2) if job is not None]
+    assert sorted(job.zip_code for job in claimed) == [f"0703{i}" for i in range(5)]
+    assert all(job.attempt == 1 for job in claimed)
+    assert {status for _, _, status, _ in jobs(tmp_path)} == {'running'}
+
+
+def test_failures_back_off_until_max_attempts(tmp_path):
+    async def scenario(engine):
+        queue = JobQueue(engine, max_attempts=3, retry_base=10, retry_max=15)
+        await queue.enqueue('07030')
+        delays, statuses = [], []
+        for _ in range(3):
+            await make_due(engine)
+            job = await queue.claim()
+            before = datetime.utcnow()
+            await queue.fail(job, 'TimeoutError: no response')
+            # Not due again until its backoff has passed
+            statuses.append((job.attempt, await queue.claim()))
+            with sqlite3.connect(tmp_path / 'jobs.db') as conn:
+                status, run_after = conn.execute("SELECT status, run_after FROM refresh_jobs").fetchone()
+            if status == 'queued':
+                delays.append((datetime.fromisoformat(run_after) - before).total_seconds())
+        return delays, statuses
+
+    delays, statuses = run(tmp_path, scenario)
+    assert statuses == [(1, None), (2, None), (3, None)]
+    # 10s then 20s capped at 15s, each jittered by up to 20%
+    assert 8 - 0.1 <= delays[0] <= 12 + 0.1
+    assert 12 - 0.1 <= delays[1] <= 18 + 0.1
+    assert len(delays) == 2
+    with sqlite3.connect(tmp_path / 'jobs.db') as conn:
+        assert conn.execute("SELECT status, attempts, error FROM refresh_jobs").fetchone() == (
+            'failed', 3, 'TimeoutError: no response')
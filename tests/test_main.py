@@ -0,0 +1,28 @@
+import logging
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services import executor
+
+
+def test_a_failed_user_agent_preload_is_logged_before_shutdown(caplog, monkeypatch):
+    def broken():
+        raise OSError('no data file')
+
+    monkeypatch.setattr(main, 'get_user_agent', broken)
+    monkeypatch.setattr(main, 'DB_INIT_ON_STARTUP', False)
+    monkeypatch.setattr(main, 'SCHEDULER_ENABLED', False)
+    monkeypatch.setattr(executor, 'EXECUTOR_KIND', 'inline')
+
+    with caplog.at_level(logging.ERROR, logger='app.main'):
+        with TestClient(main.app) as client:
+            assert client.get('/').status_code == 200
+            # The preload runs on a worker thread; its done-callback logs on the loop
+            deadline = time.monotonic() + 5
+            while 'no data file' not in caplog.text and time.monotonic() < deadline:
+                time.sleep(0.01)
+            logged_while_running = caplog.text
+    assert 'Preloading the user-agent list failed' in logged_while_running
+    assert 'no data file' in logged_while_running
@@ -0,0 +1,22 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize('module', ['app.migrate', 'app.database'])
+def test_migrate_creates_schema_on_fresh_sqlite(tmp_path, module):
+    path = tmp_path / 'fresh.db'
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}")
+    subprocess.run([sys.executable, '-m', module], cwd=ROOT, env=env, check=True, capture_output=True, timeout=60)
+
+    with sqlite3.connect(path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'properties', 'price_history', 'property_features', 'page_snapshots', 'refresh_jobs'} <= tables
+    assert 'ix_price_history_property_date' in indexes
@@ -0,0 +1,186 @@
+import asyncio
+
+import openai
+import pytest
+from aiohttp import web
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import Base
+from app.models import OutreachMessage  # noqa: F401  registers the tables on Base.metadata
+from app.services import outreach
+from app.services.outreach import OutreachGenerator
+
+
+def lead(i):
+    return {'id': i, 'address': f"{i} Park Ave, Hoboken, NJ 07030", 'days_on_market': 30, 'price': 500000.0,
+            'price_drops': 1}
+
+
+class StubLLM:
+    """
+    A local chat completions server, as in benchmarks/bench_outreach.py
+
+    Records every request, its client port and the peak number in flight.
+    Each entry of `script` answers one request with (status, delay); once it
+    runs out, requests succeed after `latency` seconds.
+    """
+
+    def __init__(self, monkeypatch, latency=0.02):
+        self.monkeypatch = monkeypatch
+        self.latency = latency
+        self.script = []
+        self.requests = []
+        self.client_ports = set()
+        self.active = 0
+        self.peak = 0
+        self._runner = None
+
+    async def _completions(self, request):
+        body = await request.json()
+        self.requests.append({'authorization': request.headers.get('Authorization'), 'body': body})
+        self.client_ports.add(request.transport.get_extra_info('peername')[1])
+        status, delay = self.script.pop(0) if self.script else (200, self.latency)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.active -= 1
+        if status != 200:
+            return web.json_response({'error': {'message': f"stub error {status}", 'type': 'stub'}}, status=status)
+        return web.json_response({
+            'id': 'stub', 'object': 'chat.completion', 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': f"Offer for {body['messages'][-1]['content'][:60]}"}}],
+            'usage': {'prompt_tokens': 50, 'completion_tokens': 20, 'total_tokens': 70},
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', self._completions)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.monkeypatch.setattr(openai, 'api_base', f"http://127.0.0.1:{port}/v1")
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(outreach, 'OUTREACH_RETRY_BASE', 0)
+    return StubLLM(monkeypatch)
+
+
+def run(tmp_path, llm, scenario, **options):
+    """
+    Run scenario(generator, engine) against the stub server with a started generator; returns its result
+    """
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'outreach.db'}")
+        await llm.start()
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            generator = await OutreachGenerator(engine, api_key='test', **options).start()
+            try:
+                return await scenario(generator, engine)
+            finally:
+                await generator.close()
+        finally:
+            await llm.stop()
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_are_capped_on_the_shared_session(tmp_path, llm):
+    async def scenario(generator, engine):
+        return await generator.generate_many([lead(i) for i in range(12)])
+
+    results = run(tmp_path, llm, scenario, concurrency=3)
+    assert [result['error'] for result in results] == [None] * 12
+    assert [result['property_id'] for result in results] == list(range(12))
+    assert len(llm.requests) == 12
+    assert llm.peak == 3
+    assert {request['authorization'] for request in llm.requests} == {'Bearer test'}
+    # Every call went through the generator's pooled session, so no more connections than slots were opened
+    assert len(llm.client_ports) <= 3
+
+
+def test_rate_limits_and_server_errors_are_retried(tmp_path, llm):
+    llm.script = [(429, 0), (503, 0)]
+
+    async def scenario(generator, engine):
+        return generator, await generator.generate_many([lead(1)])
+
+    generator, results = run(tmp_path, llm, scenario, max_retries=2)
+    assert results[0]['error'] is None and results[0]['message']
+    assert len(llm.requests) == 3
+    assert generator.stats['retries'] == 2
+    assert generator.stats['failures'] == 0
+
+
+def test_a_call_that_times_out_is_retried(tmp_path, llm):
+    llm.script = [(200, 1.0)]
+
+    async def scenario(generator, engine):
+        return generator, await generator.generate_many([lead(1)])
+
+    generator, results = run(tmp_path, llm, scenario, timeout=0.2, max_retries=1)
+    assert results[0]['error'] is None and results[0]['message']
+    assert len(llm.requests) == 2
+    assert generator.stats['timeouts'] == 1
+
+
+def test_a_call_that_keeps_failing_reports_its_error(tmp_path, llm):
+    llm.script = [(429, 0)] * 3
+
+    async def scenario(generator, engine):
+        failed = await generator.generate_many([lead(1)])
+        # The failure is not cached, so the next request for it calls again
+        return generator, failed + await generator.generate_many([lead(1)])
+
+    generator, results = run(tmp_path, llm, scenario, max_retries=2)
+    assert results[0]['message'] is None and results[0]['error'].startswith('RateLimitError')
+    assert results[1]['error'] is None and results[1]['message']
+    assert len(llm.requests) == 4
+    assert generator.stats['failures'] == 1
+
+
+def test_bad_requests_are_not_retried(tmp_path, llm):
+    llm.script = [(400, 0)]
+
+    async def scenario(generator, engine):
+        return await generator.generate_many([lead(1)])
+
+    results = run(tmp_path, llm, scenario, max_retries=2)
+    assert results[0]['error'].startswith('InvalidRequestError')
+    assert len(llm.requests) == 1
+
+
+def test_cached_prompt_skips_the_llm_call(tmp_path, llm):
+    async def scenario(generator, engine):
+        first = await generator.generate_many([lead(1)])
+        # A new generator, as after a restart: the message comes from outreach_messages
+        restarted = OutreachGenerator(engine, api_key='test')
+        return first, await restarted.generate_many([lead(1)]), restarted
+
+    first, second, restarted = run(tmp_path, llm, scenario)
+    assert len(llm.requests) == 1
+    assert second[0]['cached'] and not first[0]['cached']
+    assert second[0]['message'] == first[0]['message']
+    assert restarted.stats['cache_hits'] == 1 and restarted.stats['api_calls'] == 0
+
+
+def test_identical_prompts_share_one_call(tmp_path, llm):
+    async def scenario(generator, engine):
+        return generator, await generator.generate_many([lead(1), lead(1), lead(1)])
+
+    generator, results = run(tmp_path, llm, scenario)
+    assert len(llm.requests) == 1
+    assert len({result['message'] for result in results}) == 1
+    assert generator.stats['deduplicated'] == 2
@@ -0,0 +1,145 @@
+import asyncio
+import sqlite3
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import Base
+from app.models import PriceHistory, Property  # noqa: F401  registers the tables on Base.metadata
+from app.services.listings import Listing
+from app.services.persistence import backfill_address_keys, remove_duplicates, upsert_properties
+
+
+def listing(address, price, zip_code='07030', **fields):
+    return Listing(address=address, zip_code=zip_code, price=price, square_feet=1000, days_on_market=10,
+                   price_drops=0, property_type='condo', **fields)
+
+
+async def _run(path, steps):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        for step in steps:
+            await step(engine)
+    finally:
+        await engine.dispose()
+
+
+def run(path, *steps):
+    asyncio.run(_run(path, steps))
+
+
+def stored(path):
+    with sqlite3.connect(path) as conn:
+        properties = conn.execute(
+            "SELECT id, address, address_key, price, first_price, drop_count FROM properties"
+        ).fetchall()
+        history = conn.execute("SELECT property_id, price FROM price_history ORDER BY date, id").fetchall()
+    return properties, history
+
+
+def test_spelling_flip_updates_one_row_and_keeps_history(tmp_path):
+    path = tmp_path / 'flip.db'
+    run(
+        path,
+        lambda engine: upsert_properties(engine, [listing('660 Grand St Apt 4B, Hoboken, NJ 07030', 500000)]),
+        lambda engine: upsert_properties(engine, [listing('660 Grand Street #4B, Hoboken', 480000)]),
+    )
+
+    properties, history = stored(path)
+    assert len(properties) == 1
+    property_id, address, key, price, first_price, drop_count = properties[0]
+    assert address == '660 Grand Street #4B, Hoboken'
+    assert key == '07030|660 grand st #4b'
+    assert (price, first_price, drop_count) == (480000, 500000, 1)
+    assert history == [(property_id, 500000), (property_id, 480000)]
+
+
+def test_same_key_in_another_zip_is_another_property(tmp_path):
+    path = tmp_path / 'zips.db'
+    run(path, lambda engine: upsert_properties(engine, [
+        listing('12 Main St', 300000, zip_code='07030'),
+        listing('12 Main St', 310000, zip_code='07302'),
+    ]))
+
+    properties, _ = stored(path)
+    assert len(properties) == 2
+
+
+def test_fuzzy_alias_is_folded_into_the_merged_row_with_its_history(tmp_path):
+    path = tmp_path / 'alias.db'
+    merged = listing('660 Grand St Apt 4B', 470000, provenance=[
+        {'source': 'zillow', 'address': '660 Grand St Apt 4B', 'match': 'new'},
+        {'source': 'redfin', 'address': '660 Grnd St Apt 4B', 'match': 'fuzzy'},
+    ])
+    run(
+        path,
+        lambda engine: upsert_properties(engine, [listing('660 Grand St Apt 4B', 500000)]),
+        lambda engine: upsert_properties(engine, [listing('660 Grnd St Apt 4B', 490000)]),
+        lambda engine: remove_duplicates(engine, [merged]),
+        lambda engine: upsert_properties(engine, [merged]),
+    )
+
+    properties, history = stored(path)
+    assert len(properties) == 1
+    property_id, address, _, price, first_price, drop_count = properties[0]
+    assert address == '660 Grand St Apt 4B'
+    assert (price, first_price, drop_count) == (470000, 500000, 2)
+    assert [price for _, price in history] == [500000, 490000, 470000]
+    assert {owner for owner, _ in history} == {property_id}
+
+
+def test_alias_without_a_merged_row_is_rekeyed_in_place(tmp_path):
+    path = tmp_path / 'rekey.db'
+    merged = listing('660 Grand St Apt 4B', 490000, provenance=[
+        {'source': 'zillow', 'address': '660 Grand St Apt 4B', 'match': 'new'},
+        {'source': 'redfin', 'address': '660 Grnd St Apt 4B', 'match': 'fuzzy'},
+    ])
+    run(
+        path,
+        lambda engine: upsert_properties(engine, [listing('660 Grnd St Apt 4B', 490000)]),
+        lambda engine: remove_duplicates(engine, [merged]),
+    )
+
+    properties, history = stored(path)
+    assert [(address, key) for _, address, key, *_ in properties] == [('660 Grand St Apt 4B', '07030|660 grand st #4b')]
+    assert len(history) == 1
+
+
+def test_backfill_folds_legacy_rows_that_share_a_key(tmp_path):
+    path = tmp_path / 'legacy.db'
+    run(path)
+    # As stored when the raw address was the unique key: one row per spelling, no address_key
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP INDEX ix_properties_address")
+        conn.execute("CREATE UNIQUE INDEX ix_properties_address ON properties (address)")
+        for address, price, updated_at, history in [
+            ('660 Grand St Apt 4B', 480000, '2026-03-01', [(500000, '2026-01-01'), (480000, '2026-02-01')]),
+            ('660 Grand Street #4B', 470000, '2026-04-01', [(520000, '2025-12-01'), (470000, '2026-04-01')]),
+        ]:
+            property_id = conn.execute(
+                "INSERT INTO properties (address, zip_code, price, created_at, updated_at) VALUES (?, '07030', ?, ?, ?)",
+                (address, price, updated_at, updated_at)
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO price_history (property_id, price, date) VALUES (?, ?, ?)",
+                [(property_id, old_price, date) for old_price, date in history]
+            )
+
+    async def backfill(engine):
+        async with engine.begin() as conn:
+            await conn.run_sync(backfill_address_keys)
+
+    run(path, backfill)
+
+    properties, history = stored(path)
+    assert len(properties) == 1
+    property_id, address, key, price, first_price, drop_count = properties[0]
+    # The most recently updated spelling is kept, with every spelling's history
+    assert (address, key, price) == ('660 Grand Street #4B', '07030|660 grand st #4b', 470000)
+    assert (first_price, drop_count) == (520000, 3)
+    assert [old_price for _, old_price in history] == [520000, 500000, 480000, 470000]
+    assert {owner for owner, _ in history} == {property_id}
+    with sqlite3.connect(path) as conn:
+        unique = conn.execute("SELECT [unique] FROM pragma_index_list('properties') WHERE name = 'ix_properties_address'")
+        assert unique.fetchone() == (0,)
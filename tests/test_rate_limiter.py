@@ -0,0 +1,177 @@
+import asyncio
+import heapq
+import itertools
+import types
+
+import pytest
+
+from app.services import rate_limiter
+from app.services.rate_limiter import HostLimiter, HostLimiterRegistry, TokenBucket
+
+
+class FakeClock:
+    """
+    Virtual time for the rate limiter: sleeps return as soon as every other task is waiting too
+
+    run() lets the loop settle, then jumps the clock to the earliest sleeper's
+    wake-up time, so a test of minutes of pacing finishes immediately and
+    timings are exact.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self._sleepers = []
+        self._order = itertools.count()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        woken = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + seconds, next(self._order), woken))
+        await woken
+
+    async def _settle(self):
+        for _ in range(20):
+            await asyncio.sleep(0)
+
+    def run(self, coro):
+        async def main():
+            task = asyncio.ensure_future(coro)
+            while True:
+                await self._settle()
+                if task.done() or not self._sleepers:
+                    return await task
+                wake_at = self._sleepers[0][0]
+                self.now = wake_at
+                while self._sleepers and self._sleepers[0][0] <= wake_at:
+                    heapq.heappop(self._sleepers)[2].set_result(None)
+
+        return asyncio.run(main())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(rate_limiter, 'asyncio', types.SimpleNamespace(
+        Lock=asyncio.Lock, Semaphore=asyncio.Semaphore, sleep=clock.sleep))
+    return clock
+
+
+def grant_times(clock, bucket, count, before=None):
+    async def main():
+        async def take():
+            await bucket.acquire()
+            return clock.now
+
+        tasks = [asyncio.ensure_future(take()) for _ in range(count)]
+        if before is not None:
+            await before()
+        return await asyncio.gather(*tasks)
+
+    return clock.run(main())
+
+
+def test_bucket_allows_a_burst_then_paces_at_its_rate(clock):
+    times = grant_times(clock, TokenBucket(rate=2, capacity=4), 10)
+    assert times == [0.0] * 4 + [0.5, 1.0, 1.5, 2.0, 2.5, 3.0]
+
+
+def test_bucket_refills_while_idle_but_not_past_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    grant_times(clock, bucket, 3)
+    clock.now = 100.0
+    assert grant_times(clock, bucket, 5) == [100.0] * 3 + [100.5, 101.0]
+
+
+def test_backoff_holds_back_the_next_token(clock):
+    bucket = TokenBucket(rate=2, capacity=4)
+
+    async def throttled():
+        await bucket.backoff(5)
+
+    times = grant_times(clock, bucket, 3)
+    assert times == [0.0] * 3
+    times = grant_times(clock, bucket, 2, before=throttled)
+    # The tasks only queue once the test yields, after the 429 has been recorded
+    assert times == [5.0, 5.5]
+
+
+def test_backoff_delays_a_request_already_waiting(clock):
+    bucket = TokenBucket(rate=2, capacity=4)
+    grant_times(clock, bucket, 4)
+
+    async def throttled_later():
+        # The fifth request is asleep until 0.5 when the host answers 429 at 0.2
+        await clock.sleep(0.2)
+        await bucket.backoff(3)
+
+    assert grant_times(clock, bucket, 2, before=throttled_later) == [3.2, 3.7]
+
+
+def test_backoff_never_shortens_an_existing_wait(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+
+    async def two_backoffs():
+        await bucket.backoff(10)
+        await bucket.backoff(2)
+
+    assert grant_times(clock, bucket, 1, before=two_backoffs) == [10.0]
+
+
+def hold_slots(clock, limiters, hold):
+    """
+    Hold one slot of each limiter in `limiters` (repeats allowed) for `hold` seconds; returns (peaks, finish times)
+    """
+    peaks = {}
+
+    async def request(limiter):
+        async with limiter.slot() as stats:
+            peaks[limiter.host] = max(peaks.get(limiter.host, 0), stats.in_flight)
+            await clock.sleep(hold)
+        return limiter.host, clock.now
+
+    async def main():
+        return await asyncio.gather(*(request(limiter) for limiter in limiters))
+
+    return peaks, clock.run(main())
+
+
+def test_concurrency_is_capped_per_host(clock):
+    limiter = HostLimiter('www.zillow.com', max_concurrency=2, rate=1000, burst=1000)
+    peaks, finished = hold_slots(clock, [limiter] * 6, hold=1.0)
+    assert peaks == {'www.zillow.com': 2}
+    assert sorted(at for _, at in finished) == [1.0, 1.0, 2.0, 2.0, 3.0, 3.0]
+    stats = limiter.stats.to_dict()
+    assert stats['requests'] == 6 and stats['in_flight'] == 0
+    assert stats['elapsed_seconds'] == 3.0 and stats['avg_latency_seconds'] == 1.0
+
+
+def test_a_busy_host_does_not_hold_up_another(clock):
+    registry = HostLimiterRegistry(max_concurrency=1, rate=1000, burst=1000)
+    zillow, redfin = registry.get('www.zillow.com'), registry.get('www.redfin.com')
+    assert registry.get('www.zillow.com') is zillow
+    peaks, finished = hold_slots(clock, [zillow, zillow, zillow, redfin], hold=1.0)
+    assert peaks == {'www.zillow.com': 1, 'www.redfin.com': 1}
+    assert sorted(at for host, at in finished if host == 'www.zillow.com') == [1.0, 2.0, 3.0]
+    assert [at for host, at in finished if host == 'www.redfin.com'] == [1.0]
+
+
+def test_rate_paces_requests_below_the_concurrency_cap(clock):
+    limiter = HostLimiter('www.realtor.com', max_concurrency=4, rate=2, burst=1)
+    _, finished = hold_slots(clock, [limiter] * 4, hold=0.1)
+    # One token at a time at 2/s: starts at 0, 0.5, 1.0 and 1.5
+    assert sorted(at for _, at in finished) == pytest.approx([0.1, 0.6, 1.1, 1.6])
+
+
+def test_per_host_settings_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv('SCRAPER_RATE_ZILLOW', '0.5')
+    monkeypatch.setenv('SCRAPER_MAX_CONCURRENCY_ZILLOW', '1')
+    zillow, redfin = HostLimiter('www.zillow.com'), HostLimiter('www.redfin.com')
+    assert (zillow.rate, zillow.max_concurrency) == (0.5, 1)
+    assert (redfin.rate, redfin.max_concurrency) == (rate_limiter.DEFAULT_RATE_PER_HOST,
+                                                     rate_limiter.DEFAULT_MAX_CONCURRENCY_PER_HOST)
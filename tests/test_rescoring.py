@@ -0,0 +1,63 @@
+import asyncio
+import sqlite3
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import Base
+from app.models import PropertyFeatures  # noqa: F401  registers the tables on Base.metadata
+from app.services.listings import Listing
+from app.services.persistence import upsert_properties
+from app.services.rescoring import backfill_features, sweep_weights
+from app.services.scoring import ScoringWeights
+
+WEIGHT_SETS = [ScoringWeights(), ScoringWeights(absentee_points=40, price_drop_points=15)]
+
+
+def listings():
+    return [
+        Listing(address=f"{i} Park Ave", zip_code='07030', price=300000.0 + i * 1000, square_feet=1000 + i * 10,
+                days_on_market=i * 7, price_drops=i % 3, property_type='condo', tax_assessed_value=320000,
+                owner_status='absentee' if i % 2 else 'owner')
+        for i in range(20)
+    ]
+
+
+def run(tmp_path, scenario):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rescore.db'}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            # Stored without features, as before property_features existed
+            await upsert_properties(engine, listings())
+            return await scenario(engine)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def feature_rows(tmp_path):
+    with sqlite3.connect(tmp_path / 'rescore.db') as conn:
+        return conn.execute("SELECT COUNT(*) FROM property_features").fetchone()[0]
+
+
+def without_timing(swept):
+    return {key: value for key, value in swept.items() if key != 'seconds'}
+
+
+def test_sweep_writes_nothing(tmp_path):
+    swept = run(tmp_path, lambda engine: sweep_weights(engine, WEIGHT_SETS, top=5))
+    assert swept['properties'] == 20
+    assert feature_rows(tmp_path) == 0
+
+
+def test_sweep_scores_unstored_features_as_stored_ones(tmp_path):
+    async def scenario(engine):
+        in_memory = await sweep_weights(engine, WEIGHT_SETS, top=5)
+        await backfill_features(engine)
+        return in_memory, await sweep_weights(engine, WEIGHT_SETS, top=5)
+
+    in_memory, stored = run(tmp_path, scenario)
+    assert feature_rows(tmp_path) == 20
+    assert without_timing(in_memory) == without_timing(stored)
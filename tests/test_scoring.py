@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.services.listings import Listing, ListingBatch
+from app.services.scoring import (
+    SCORE_COLUMNS, SCORE_INPUTS, PropertyScorer, ScoringWeights, comp_stats_from_lists, feature_columns,
+    score_features, score_properties,
+)
+
+LISTINGS = [
+    {'price': 250000, 'square_feet': 1200, 'days_on_market': 120, 'price_drops': 1, 'tax_assessed_value': 300000,
+     'owner_status': 'Absentee', 'pre_foreclosure': True},
+    {'price': 410000.0, 'square_feet': 1850.5, 'days_on_market': 12, 'price_drops': 3, 'tax_assessed_value': 390000,
+     'owner_status': 'owner', 'pre_foreclosure': False},
+    {'price': 0, 'square_feet': 0, 'days_on_market': 0, 'price_drops': 0, 'tax_assessed_value': 0,
+     'owner_status': '', 'pre_foreclosure': False},
+    # Sources leave fields out; these columns mix None with numbers
+    {'price': 180000, 'square_feet': None, 'days_on_market': None, 'price_drops': 2, 'tax_assessed_value': None,
+     'owner_status': None, 'pre_foreclosure': None},
+    {'price': None, 'square_feet': 900, 'days_on_market': 95, 'price_drops': None, 'tax_assessed_value': 150000,
+     'owner_status': 'absentee', 'pre_foreclosure': None},
+]
+
+COMPS = [
+    [{'price': 260000, 'square_feet': 1100}, {'price': 300000, 'square_feet': 1300}],
+    [],
+    [{'price': 200000, 'square_feet': 0}],
+    [{'price': 175000, 'square_feet': 1000}],
+    [],
+]
+
+WEIGHTS = [ScoringWeights(), ScoringWeights(absentee_points=40, offer_ratio=0.7, repair_cost_per_sqft=35)]
+
+
+def scalar_scores(scorer, data, comps):
+    return (
+        scorer.calculate_motivation_score(data),
+        scorer.calculate_suggested_offer(data, comps),
+        scorer.estimate_roi(data, comps),
+    )
+
+
+def input_columns(listings):
+    return {name: [listing[name] for listing in listings] for name, _ in SCORE_INPUTS}
+
+
+@pytest.mark.parametrize('weights', WEIGHTS)
+@pytest.mark.parametrize('with_comps', [False, True])
+def test_score_features_matches_scalar_methods(weights, with_comps):
+    scorer = PropertyScorer(None, weights)
+    comps = COMPS if with_comps else [[] for _ in LISTINGS]
+    features = feature_columns(input_columns(LISTINGS), comp_stats_from_lists(comps))
+    vector = score_features(features, weights)
+
+    for i, data in enumerate(LISTINGS):
+        assert tuple(vector[name][i] for name in SCORE_COLUMNS) == scalar_scores(scorer, data, comps[i])
+
+
+def test_missing_values_score_as_defaults_not_nan():
+    features = feature_columns(input_columns(LISTINGS))
+    for name in ('price', 'square_feet', 'days_on_market', 'price_drops'):
+        assert not np.isnan(features[name]).any()
+    scores = score_features(features)
+    for name in SCORE_COLUMNS:
+        assert not np.isnan(scores[name]).any()
+
+    # A None counts the same as the field being left out
+    assert scores['suggested_offer'][4] == 0.0
+    assert scores['estimated_roi'][4] == pytest.approx(-100.0)
+
+
+def test_score_properties_matches_scalar_methods_from_a_listing_batch():
+    scorer = PropertyScorer(None)
+    listings = score_properties([Listing(**data) for data in LISTINGS], comp_stats_from_lists(COMPS))
+
+    for listing, data, comps in zip(listings, LISTINGS, COMPS):
+        assert (listing.motivation_score, listing.suggested_offer, listing.estimated_roi) == \
+            scalar_scores(scorer, data, comps)
+
+
+def test_a_column_left_out_of_the_batch_uses_the_default():
+    batch = ListingBatch.from_listings([Listing(price=100000, square_feet=800)], [name for name, _ in SCORE_INPUTS])
+    assert 'tax_assessed_value' not in batch.columns
+
+    scores = PropertyScorer(None).score_batch({name: batch.column(name, default) for name, default in SCORE_INPUTS})
+    expected = scalar_scores(PropertyScorer(None), {'price': 100000, 'square_feet': 800}, [])
+    assert tuple(scores[name][0] for name in SCORE_COLUMNS) == expected
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from app.services.cache import PageCache
+from app.services.scraper import PropertyScraper
+from app.services.sources import SourceAdapter
+
+
+def scraper_with_cached_page():
+    """
+    A scraper with one source whose page for 07030 is already cached; returns it and the URLs it fetches
+    """
+    adapter = SourceAdapter('zillow', 'http://listings.test/{zip_code}', lambda html, zip_code: [])
+    scraper = PropertyScraper(cache=PageCache(ttl=300), sources=[adapter])
+    scraper.cache.backend.set('zillow:07030', '<html>cached</html>', time.time())
+    fetched = []
+
+    async def fetch(url, max_retries=3, source=None):
+        fetched.append(url)
+        scraper._record_outcome(scraper.monitors[source], None)
+        return '<html>fresh</html>'
+
+    async def parse(adapter, html, zip_code):
+        return []
+
+    scraper._fetch_with_retry = fetch
+    scraper._parse = parse
+    return scraper, fetched
+
+
+def open_breaker(scraper):
+    breaker = scraper.monitors['zillow'].breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.cooldown
+    return breaker
+
+
+def test_closed_breaker_reads_the_cache():
+    scraper, fetched = scraper_with_cached_page()
+    asyncio.run(scraper._scrape_page('zillow', '07030'))
+    assert fetched == []
+    assert scraper.cache.hits == 1
+
+
+def test_half_open_trial_skips_the_cache_and_closes_the_breaker():
+    scraper, fetched = scraper_with_cached_page()
+    breaker = open_breaker(scraper)
+
+    asyncio.run(scraper._scrape_page('zillow', '07030'))
+    assert fetched == ['http://listings.test/07030']
+    assert breaker.state == 'closed'
+    # The trial's page replaces the cached one
+    assert scraper.cache.backend.get('zillow:07030')[0] == '<html>fresh</html>'
@@ -0,0 +1,122 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import Base, get_db
+from app.main import app
+from app.models import Property  # noqa: F401  registers the tables on Base.metadata
+from app.routers.property import get_scraper
+from app.services.listings import Listing
+from app.services.persistence import upsert_properties
+from app.services.search import encode_cursor
+
+LISTINGS = 23
+
+
+@pytest.fixture
+def client(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'search.db'}"
+
+    async def seed():
+        engine = create_async_engine(url)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            # Scores repeat, so most pages end in the middle of a tie; one listing is unscored
+            await upsert_properties(engine, [
+                Listing(address=f"{i} Park Ave", zip_code='07030', price=300000.0 + i, square_feet=900,
+                        days_on_market=i, price_drops=0, property_type='condo',
+                        motivation_score=float(i % 4) if i else None)
+                for i in range(LISTINGS + 1)
+            ])
+        finally:
+            await engine.dispose()
+
+    asyncio.run(seed())
+    # Each TestClient request may run on its own event loop, so keep no pooled connections between them
+    engine = create_async_engine(url, poolclass=NullPool)
+
+    async def test_db():
+        async with async_sessionmaker(engine)() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = test_db
+    app.dependency_overrides[get_scraper] = lambda: None
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def search(client, **body):
+    return client.post('/api/search', json={'zip_codes': ['07030'], 'mode': 'stored', **body})
+
+
+def walk(client, limit, **body):
+    pages, cursor = [], None
+    while True:
+        response = search(client, limit=limit, cursor=cursor, **body)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('limit', [1, 3, 5, LISTINGS, 100])
+def test_walking_every_page_returns_each_row_once(client, limit):
+    pages = walk(client, limit)
+    rows = [row for page in pages for row in page]
+    assert len(rows) == LISTINGS
+    assert len({row['id'] for row in rows}) == LISTINGS
+    keys = [(row['motivation_score'], row['id']) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_walking_a_sort_where_every_row_ties(client):
+    # New listings all have drop_count 0, so only the id orders them
+    rows = [row for page in walk(client, 4, sort='drop_count') for row in page]
+    assert len({row['id'] for row in rows}) == LISTINGS + 1
+
+
+def raw_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor',
+    '!!!!',
+    'é',
+    raw_cursor({'score': 1}),
+    raw_cursor([1.0]),
+    raw_cursor([1.0, 2, 3, 4]),
+    raw_cursor(['high', 5]),
+    raw_cursor([[1.0], 5]),
+    raw_cursor([1.0, 'five']),
+    raw_cursor([1.0, None]),
+    raw_cursor([1.0, 10 ** 30]),
+    raw_cursor([float('nan'), 5]),
+    raw_cursor([1.0, float('inf')]),
+    raw_cursor(['last_drop', 'yesterday', 5]),
+    encode_cursor(2.0, 5)[:-3],
+])
+def test_malformed_or_tampered_cursor_is_a_400(client, cursor):
+    response = search(client, cursor=cursor)
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith('Invalid cursor')
+
+
+def test_cursor_from_another_sort_is_rejected(client):
+    cursor = search(client, limit=2, sort='drop_count').json()['next_cursor']
+    assert search(client, cursor=cursor, sort='drop_count').status_code == 200
+    assert search(client, cursor=cursor).status_code == 400
+    assert search(client, cursor=cursor, sort='drop_pct').status_code == 400
+    score_cursor = search(client, limit=2).json()['next_cursor']
+    assert search(client, cursor=score_cursor, sort='drop_count').status_code == 400
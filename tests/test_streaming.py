@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import Base
+from app.main import app
+from app.models import Property  # noqa: F401  registers the tables on Base.metadata
+from app.routers import property as property_router
+from app.services import executor
+from app.services.cache import PageCache
+from app.services.scraper import FetchedPage, PropertyScraper
+
+FIXTURES = Path(__file__).parent.parent / 'benchmarks' / 'fixtures'
+SOURCES = ('zillow', 'redfin', 'realtor')
+
+
+class ReplayedSources:
+    """
+    Answers a scraper's fetches with the saved fixture pages, each source after its own delay
+
+    A source whose delay is None never answers; cancelled lists the fetches
+    that were cancelled while waiting.
+    """
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.pages = {source: (FIXTURES / f"{source}_07030.html").read_text() for source in SOURCES}
+        self.cancelled = []
+
+    async def __call__(self, url, max_retries=3, validators=None, source=None):
+        try:
+            if self.delays[source] is None:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.delays[source])
+        except asyncio.CancelledError:
+            self.cancelled.append(source)
+            raise
+        return FetchedPage(self.pages[source])
+
+
+@pytest.fixture
+def stream_app(tmp_path, monkeypatch):
+    """
+    The app with a scraper on replayed pages and a temp database; returns (replay, sessions)
+
+    sessions counts the database sessions the stream opened and closed.
+    """
+    path = tmp_path / 'stream.db'
+    sqlite3.connect(path).close()
+    # Each TestClient request may run on its own event loop, so keep no pooled connections between them
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create())
+    factory = async_sessionmaker(engine)
+    sessions = {'opened': 0, 'closed': 0}
+
+    @contextlib.asynccontextmanager
+    async def tracked_session():
+        sessions['opened'] += 1
+        try:
+            async with factory() as db:
+                yield db
+        finally:
+            sessions['closed'] += 1
+
+    replay = ReplayedSources({'zillow': 0, 'redfin': 0.05, 'realtor': 0.1})
+    scraper = PropertyScraper(cache=PageCache(ttl=300))
+    scraper._fetch_response = replay
+
+    monkeypatch.setattr(executor, 'EXECUTOR_KIND', 'inline')
+    monkeypatch.setattr(property_router, 'AsyncSessionLocal', tracked_session)
+    monkeypatch.setattr(property_router, 'engine', engine)
+    app.dependency_overrides[property_router.get_scraper] = lambda: scraper
+    try:
+        yield replay, sessions
+    finally:
+        app.dependency_overrides.clear()
+
+
+def stream(accept=None, **params):
+    headers = {'Accept': accept} if accept else {}
+    with TestClient(app).stream('POST', '/api/search/stream', params=params, headers=headers,
+                                json={'zip_codes': ['07030']}) as response:
+        return response.status_code, response.headers['content-type'], response.read().decode()
+
+
+def check_events(events):
+    assert [event['event'] for event in events] == ['listings'] * 3 + ['summary']
+    # Pages arrive in the order their fetches finish
+    assert [event['source'] for event in events[:3]] == list(SOURCES)
+    assert all(event['zip_code'] == '07030' and event['listings'] for event in events[:3])
+    summary = events[-1]
+    assert summary['zip_codes'] == ['07030'] and summary['count'] == len(summary['listings']) > 0
+    scores = [listing['motivation_score'] for listing in summary['listings']]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_ndjson_sends_one_event_per_line(stream_app):
+    _, sessions = stream_app
+    status, content_type, body = stream()
+    assert status == 200 and content_type.startswith('application/x-ndjson')
+    assert body.endswith('\n')
+    check_events([json.loads(line) for line in body.splitlines()])
+    assert sessions == {'opened': 1, 'closed': 1}
+
+
+@pytest.mark.parametrize('params, accept', [({'format': 'sse'}, None), ({}, 'text/event-stream')])
+def test_sse_frames_each_event_with_its_name(stream_app, params, accept):
+    status, content_type, body = stream(accept, **params)
+    assert status == 200 and content_type.startswith('text/event-stream')
+    assert body.endswith('\n\n')
+    events = []
+    for frame in body[:-2].split('\n\n'):
+        name, data = frame.split('\n')
+        assert name.startswith('event: ') and data.startswith('data: ')
+        event = json.loads(data[len('data: '):])
+        assert event['event'] == name[len('event: '):]
+        events.append(event)
+    check_events(events)
+
+
+def test_unknown_format_is_a_400(stream_app):
+    assert stream(format='xml')[0] == 400
+
+
+def test_a_client_disconnect_stops_the_scrape_and_closes_the_session(stream_app, tmp_path):
+    """
+    TestClient only hands over a streamed body once the app has finished, so the disconnect is driven over ASGI
+    """
+    replay, sessions = stream_app
+    replay.delays = {'zillow': 0, 'redfin': None, 'realtor': None}
+    body = json.dumps({'zip_codes': ['07030']}).encode()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST', 'scheme': 'http',
+        'path': '/api/search/stream', 'raw_path': b'/api/search/stream', 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'test'), (b'content-type', b'application/json')],
+        'client': ('127.0.0.1', 50000), 'server': ('test', 80),
+    }
+
+    async def main():
+        first_event = asyncio.Event()
+        requested = False
+        chunks = []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            # The client goes away once it has the first page
+            await first_event.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body'):
+                chunks.append(message['body'])
+                first_event.set()
+
+        await asyncio.wait_for(app(scope, receive, send), 5)
+        # Let the cancelled fetch tasks run their handlers
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return chunks
+
+    chunks = asyncio.run(main())
+    assert [json.loads(chunk)['event'] for chunk in chunks] == ['listings']
+    assert sorted(replay.cancelled) == ['realtor', 'redfin']
+    assert sessions == {'opened': 1, 'closed': 1}
+    # Nothing was persisted for the abandoned refresh
+    with sqlite3.connect(tmp_path / 'stream.db') as conn:
+        assert conn.execute("SELECT COUNT(*) FROM properties").fetchone()[0] == 0